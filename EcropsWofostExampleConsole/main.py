@@ -4,8 +4,8 @@ import numpy as np
 import datetime
 
 from ecrops.ModelEngine import ModelEngine
+from ecrops.csvweather import load_csv_weather
 from ecrops.Printable import Printable
-from ecrops.wofost_util.util import wind10to2
 
 
 def repeat_fun(times, f, *args):
@@ -79,18 +79,14 @@ Co2Concentrations["1960"]=361 #co2 contentration in ppm for year 1960
 Co2Concentrations[str(year)]=400 #co2 contentration in ppm for year 'year'
 
 # read weather data from CSV file
-timeDependantVariables = np.genfromtxt('SampleWeatherSantaLucia1959-2019.csv', delimiter=';', skip_header=1, dtype=float)
-#changing unit of measure when necessary
-timeDependantVariables[:, 0] = timeDependantVariables[:, 0]  # tmax (C)
-timeDependantVariables[:, 1] = timeDependantVariables[:, 1]  # tmin (C)
-timeDependantVariables[:, 2] = timeDependantVariables[:, 2] * 1000  # rad (KJ => J)
-timeDependantVariables[:, 3] = timeDependantVariables[:, 3] / 10.  # rain (mm  =>  cm)
-timeDependantVariables[:, 5] = timeDependantVariables[:, 5]  # hum  (%)
-timeDependantVariables[:, 6] = timeDependantVariables[:, 6] / 10.  # E0 #cm (mm  =>  cm)
-timeDependantVariables[:, 7] = timeDependantVariables[:, 7] / 10.  # ES0 #cm (mm  =>  cm)
-timeDependantVariables[:, 8] = timeDependantVariables[:, 8] / 10.  # ET0 #cm (mm  =>  cm)
-
-timeDependantVariableColumn = {'TEMP_MAX': 0, 'TEMP_MIN': 1, 'IRRAD': 2, 'RAIN': 3,  'RH': 5, 'E0': 6, 'ES0': 7, 'ET0': 8}
+# columns of the weather data: tmax (C), tmin (C), rad (KJ), rain (mm), hum (%), E0, ES0, ET0 (mm). The columns are
+# checked against the header of the file, and the parsed values are cached next to the file for the next runs
+timeDependantVariables, timeDependantVariableColumn = load_csv_weather(
+    'SampleWeatherSantaLucia1959-2019.csv',
+    {'TEMP_MAX': 0, 'TEMP_MIN': 1, 'IRRAD': 2, 'RAIN': 3,  'RH': 5, 'E0': 6, 'ES0': 7, 'ET0': 8})
+#changing unit of measure as declared in the WeatherConversions section of the workflow (rad KJ => J, rain and
+#evapotranspiration mm => cm), once for the whole array
+timeDependantVariables = w.convertWeather(timeDependantVariables, timeDependantVariableColumn)
 
 # extract current year weather from weather array, from 1 Jan to 31 Dec of year
 firstYearInWeatherData = 1959 #first year in weather data file
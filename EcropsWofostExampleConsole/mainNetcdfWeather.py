@@ -5,7 +5,8 @@ import datetime
 #import the ecrops package
 from ecrops.ModelEngine import ModelEngine
 from ecrops.Printable import Printable
-from ecrops.wofost_util.util import wind10to2
+from ecrops.OutputSinks import CsvOutputSink
+from ecrops.netcdfweather import TiledNetCDFWeatherReader
 #import the netCDF4 package
 from netCDF4 import Dataset
 
@@ -70,74 +71,6 @@ def SaveOutputToNetCDF( o, outputFileName,w):
     print("NETCDF Output file (" + outFileName + ") written\n")
 
 
-def open_netcdf(fname):
-    """
-    Opens the specified netcdf file and returns its dataset.
-
-    :param fname:
-    :return: a netcdf4 Dataset
-    """
-    data = Dataset(fname, "r", format="NETCDF4")
-    return data
-
-
-def load_variable_data_from_NETCDF(year_from, year_to, netcdf_year_offset, filename, varname):
-    """
-    Read data for specific variable from input file
-    :param year_from: start year to extract
-    :param year_to: end year to extract
-    :param netcdf_year_offset: first year of data in netcdf
-    :param filename: absolute path of file to read
-    :param varname: variable name
-    :return: variable content
-    """
-    rootgrp = open_netcdf(filename)
-    variable=None
-    try:
-        from datetime import date
-        numberOfDaysBegin = (date(year_from, 1, 1) - date(netcdf_year_offset, 1, 1)).days
-        numberOfDaysEnd = (date(year_to, 12, 31) - date(netcdf_year_offset, 1, 1)).days + 1
-        variable = rootgrp.variables[varname][numberOfDaysBegin:numberOfDaysEnd]
-        rootgrp.close()
-    except Exception as e:
-        print(('Could not read weather data from netcdf'))
-        print(e)
-        print(('Could not read weather data from netcdf. Out of index. Probably year ' + str(year_from) + ' or ' + str(
-            year_to) + ' is not included in dataset or there was a memory error'))
-    return variable
-
-def load_weather_array_from_NETCDF(year_from, year_to, netcdf_year_offset, dimx, dimy, filename, variables):
-    """Loads weather data from NETCDF and save to an array (365 days per year, also for leap years)
-
-    :param year_from: start year to extract
-    :param year_to: end year to extract
-    :param netcdf_year_offset: first year of data in netcdf
-    :param dimx: size of the X coordinate
-    :param dimy: size of the Y coordinate
-    :param filename: absolute path of file to read
-    :param variables:names of the weather data variables in the netcdf file
-    :return: a numpy array containing weather data, of size dimY-dimX-numberOfdays
-    """
-
-    # return only the first (365 * number of year) days (also for leap years)
-    numberOfDays = 365 * ( year_to - year_from)
-    toret = np.empty((numberOfDays, dimx, dimy, len(variables)), dtype=np.float32)
-
-    i = 0
-    for wVar in variables:
-        # read variable data
-        print(('Reading meteo variables:' + str(year_from) +'_' + str(year_to) +'  offset=' + str(netcdf_year_offset) +' file=' + str(filename) +' variable=' + str(wVar)))
-        toret[:, :, :, i] = load_variable_data_from_NETCDF(year_from,
-                                                           year_to,
-                                                           netcdf_year_offset,
-                                                           filename,
-                                                           wVar)[0:numberOfDays, 0:dimx, 0:dimy]
-
-        i = i + 1
-
-    return toret.swapaxes(0, 2).swapaxes(1, 0)
-
-
 #initialize wofost by reading one of the available workflow files
 print('read workflow file')
 
@@ -163,6 +96,11 @@ runModes = w.getRunModeNames();
 w.ReturnDailyDetails = True
 #set PrintDailyDetails True to print the daily values in the console output
 w.PrintDailyDetails = True
+#write the daily values of all the grid cells to CSV files, with the cell indexes and the run mode as columns: the run
+#modes with different output variables are written to different files (e.g. DailyDetailsOutputFile_WaterLimited.csv).
+#The rows are buffered and written in blocks (ParquetOutputSink and NetCDFOutputSink write Parquet and NetCDF files)
+dailyDetailsSink = CsvOutputSink('DailyDetailsOutputFile.csv', unitColumns=['X', 'Y', 'RUN_MODE'])
+w.DailyDetailsSink = dailyDetailsSink
 
 
 # define basic input data (year, location data, crop)
@@ -190,32 +128,26 @@ Co2Concentrations["1959"]=360 #co2 contentration in ppm for year 1959
 Co2Concentrations["1960"]=361 #co2 contentration in ppm for year 1960
 Co2Concentrations[str(year)]=400 #co2 contentration in ppm for year 'year'
 
-# read weather data from a Netcdf file
+# read weather data from a Netcdf file, one tile of the grid at a time (the next tile is read while the cells of the
+# current one are simulated)
 filename='weatherSample_2003.nc'
-maxDIMXtoLoad = 9 #the sample netcdf file contains data for a 9x5 grid for 365 days (year 2003, from 1st Jan to 31st Dec)
-maxDIMYtoLoad = 5
 variables=['temperature_max','temperature_min','radiation','precipitation','windspeed','e0','es0','et0']
-weather_matrix = load_weather_array_from_NETCDF(year - 1, year, year, maxDIMXtoLoad, maxDIMYtoLoad,filename, variables )
+timeDependantVariableColumn = {'TEMP_MAX': 0, 'TEMP_MIN': 1, 'IRRAD': 2, 'RAIN': 3, 'WIND': 4, 'E0': 5, 'ES0': 6, 'ET0': 7}
+weatherReader = TiledNetCDFWeatherReader(filename, variables, days=365)
+#the sample netcdf file contains data for a 9x5 grid for 365 days (year 2003, from 1st Jan to 31st Dec)
+maxDIMXtoLoad, maxDIMYtoLoad = weatherReader.shape
 
 outputarray = []
 
-#for all the grid cells
-for x in range(maxDIMXtoLoad):
-    for y in range(maxDIMYtoLoad):
-        #from the array of weather data, read the weather of the single location to simulate
-        timeDependantVariables = weather_matrix[x,y,:]
-
-        #changing unit of measure when necessary
-        timeDependantVariables[:, 0] = timeDependantVariables[:, 0]  # tmax (C)
-        timeDependantVariables[:, 1] = timeDependantVariables[:, 1]  # tmin (C)
-        timeDependantVariables[:, 2] = timeDependantVariables[:, 2] * 1000  # rad (KJ => J)
-        timeDependantVariables[:, 3] = timeDependantVariables[:, 3] / 10.  # rain (mm  =>  cm)
-        timeDependantVariables[:, 4] = wind10to2(timeDependantVariables[:, 4])  # wind  (m/s)
-        timeDependantVariables[:, 5] = timeDependantVariables[:, 5] / 10.  # E0 #cm (mm  =>  cm)
-        timeDependantVariables[:, 6] = timeDependantVariables[:, 6] / 10.  # ES0 #cm (mm  =>  cm)
-        timeDependantVariables[:, 7] = timeDependantVariables[:, 7] / 10.  # ET0 #cm (mm  =>  cm)
-
-        timeDependantVariableColumn = {'TEMP_MAX': 0, 'TEMP_MIN': 1, 'IRRAD': 2, 'RAIN': 3, 'WIND': 4, 'E0': 5, 'ES0': 6, 'ET0': 7}
+#for all the tiles of the grid
+for tile in weatherReader:
+    #changing unit of measure as declared in the WeatherConversions section of the workflow (rad KJ => J, rain and
+    #evapotranspiration mm => cm, wind at 10 m => wind at 2 m), once for the whole tile
+    tile.data = w.convertWeather(tile.data, timeDependantVariableColumn)
+    #for all the grid cells of the tile
+    for x, y in tile.getCells():
+        #from the tile, read the weather of the single location to simulate
+        timeDependantVariables = tile.getCell(x, y)
 
         weather = timeDependantVariables
 
@@ -322,7 +254,7 @@ for x in range(maxDIMXtoLoad):
             repeat_fun(numberOfWeatherDays, w.executeStep, status, rm)
 
             # get the summary model output
-            runOutputSummary, runOutputDailyDetails = w.finalize(status, rm)
+            runOutputSummary, runOutputDailyDetails = w.finalize(status, rm, unit={'X': x, 'Y': y})
 
 
 
@@ -341,5 +273,7 @@ for x in range(maxDIMXtoLoad):
             print(runOutputSummary)
 
             print("\nEnd run " + rm + " mode")
+#write the remaining daily values and close the daily details file
+dailyDetailsSink.close()
 print("\nSaving the grid output to netcdf")
 SaveOutputToNetCDF(outputarray,'NetcdfOutputFile.nc',w)
\ No newline at end of file
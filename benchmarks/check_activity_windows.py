@@ -0,0 +1,62 @@
+"""
+Consistency check of the activity windows declared by the steps (see Step.activity_window).
+
+The check runs all the run modes of the sample workflows of the benchmark suite on the years of the Santa Lucia weather,
+calling the runstep of all the steps every day, and reports the steps whose declared window disagrees with their
+behaviour: the runstep changes the status out of the window, or the window changes between the evaluation of the
+engine and the call of the step (see WorkflowAnalyzer.checkActivityWindows).
+
+Usage (from any folder):
+
+    python check_activity_windows.py [--workflows ...] [--years 1980 2003]
+
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import sys
+
+import golden_outputs
+import run_benchmarks
+from ecrops.WorkflowAnalyzer import WorkflowAnalyzer
+
+
+def check_workflow(workflow, weather):
+    """Checks the activity windows of all the run modes of the workflow on the weather array
+    :return: dictionary run mode -> dictionary step class name -> list of problems
+    """
+    engine = golden_outputs.create_engine(workflow)
+    analyzer = WorkflowAnalyzer(engine)
+    results = {}
+    for rm in engine.getRunModeNames():
+        status, numberOfDays = golden_outputs.initialize(engine, workflow, weather)
+        problems = analyzer.checkActivityWindows(rm, status, numberOfDays)
+        results[rm] = {step.__class__.__name__: p for step, p in problems.items()}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ecrops activity windows consistency check')
+    parser.add_argument('--workflows', nargs='+', default=list(run_benchmarks.WORKFLOWS.keys()),
+                        choices=list(run_benchmarks.WORKFLOWS.keys()), help='workflows to run')
+    parser.add_argument('--years', type=int, nargs='+', default=golden_outputs.DEFAULT_YEARS,
+                        help='years of the Santa Lucia weather (1959-2018)')
+    args = parser.parse_args(argv)
+    weathers = run_benchmarks.load_csv_weather()
+    failures = 0
+    for workflow in args.workflows:
+        for year in args.years:
+            for rm, problems in check_workflow(workflow, weathers[year - 1959]).items():
+                if len(problems) == 0:
+                    print(workflow + ' ' + str(year) + ' ' + rm + ': OK')
+                    continue
+                failures += 1
+                print(workflow + ' ' + str(year) + ' ' + rm + ': INCONSISTENT')
+                for step, descriptions in problems.items():
+                    for description in descriptions:
+                        print('    ' + step + ': ' + description)
+    print(str(failures) + ' run mode(s) with inconsistent activity windows')
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
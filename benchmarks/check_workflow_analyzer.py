@@ -0,0 +1,99 @@
+"""
+Consistency check of the plans of the WorkflowAnalyzer (see ecrops.WorkflowAnalyzer).
+
+The check runs all the run modes of the sample workflows of the benchmark suite on the years of the Santa Lucia weather,
+once with all the steps and once with the optimized plan of the WorkflowAnalyzer (analyzed in the default strict mode,
+running the whole simulation to find the undeclared side effects of the steps), and compares the summary outputs and
+the daily details of the two runs with the tolerances of the golden outputs. Every workflow is run with the driving
+variables of the benchmark suite and with the CO2 effect enabled (C3 crop, 700 ppm), where the steps linking the CO2
+data to the assimilation and to the evapotranspiration declare no outputs but change the results.
+
+Usage (from any folder):
+
+    python check_workflow_analyzer.py [--workflows ...] [--years 2003] [--configurations default co2]
+
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import sys
+
+import golden_outputs
+import run_benchmarks
+from ecrops.WorkflowAnalyzer import WorkflowAnalyzer
+
+# driving variables overriding the ones of the benchmark suite: name -> dictionary of driving variables
+CONFIGURATIONS = {
+    'default': {},
+    'co2': {'ConsiderCo2Effect': True, 'Co2Concentrations': {str(run_benchmarks.YEAR): 700}, 'Crop': 1},
+}
+
+
+def run_run_mode(engine, workflow, weather, runMode, drivingVariables):
+    """Runs a run mode of the workflow on the weather array
+    :return: {'summary': {variable: value}, 'daily': {variable: [values]}}
+    """
+    status, numberOfDays = golden_outputs.initialize(engine, workflow, weather, drivingVariables)
+    for d in range(numberOfDays):
+        status = engine.executeStep(status, runMode)
+    summary, dailyDetails = engine.finalize(status, runMode)
+    names = engine.getOutputVariablesNames(runMode)
+    return {'summary': {n: golden_outputs.to_json_value(v) for n, v in zip(names, summary)},
+            'daily': {n: [golden_outputs.to_json_value(v) for v in values] for n, values in dailyDetails.items()}}
+
+
+def check_workflow(workflow, weather, drivingVariables, tolerances):
+    """Runs all the run modes of the workflow with all the steps and with the optimized plan
+    :return: dictionary run mode -> (plan, list of the divergent summary variables, first divergent day index or None,
+    list of (variable, value with all the steps, value with the plan) for that day)
+    """
+    results = {}
+    for rm in golden_outputs.create_engine(workflow).getRunModeNames():
+        engine = golden_outputs.create_engine(workflow)
+        reference = run_run_mode(engine, workflow, weather, rm, drivingVariables)
+        analyzer = WorkflowAnalyzer(engine)
+        status, numberOfDays = golden_outputs.initialize(engine, workflow, weather, drivingVariables)
+        plan = analyzer.analyze(rm, status=status, days=numberOfDays)
+        analyzer.applyPlan(plan)
+        optimized = run_run_mode(engine, workflow, weather, rm, drivingVariables)
+        results[rm] = (plan,) + golden_outputs.compare_run_mode(optimized, reference, tolerances)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ecrops WorkflowAnalyzer plans consistency check')
+    parser.add_argument('--workflows', nargs='+', default=list(run_benchmarks.WORKFLOWS.keys()),
+                        choices=list(run_benchmarks.WORKFLOWS.keys()), help='workflows to run')
+    parser.add_argument('--years', type=int, nargs='+', default=[run_benchmarks.YEAR],
+                        help='years of the Santa Lucia weather (1959-2018)')
+    parser.add_argument('--configurations', nargs='+', default=list(CONFIGURATIONS.keys()),
+                        choices=list(CONFIGURATIONS.keys()), help='driving variables of the units')
+    parser.add_argument('--abs', type=float, default=None, help='default absolute tolerance')
+    parser.add_argument('--rel', type=float, default=None, help='default relative tolerance')
+    args = parser.parse_args(argv)
+    tolerances = golden_outputs.load_tolerances(args)
+    weathers = run_benchmarks.load_csv_weather()
+    failures = 0
+    for workflow in args.workflows:
+        for year in args.years:
+            for configuration in args.configurations:
+                for rm, (plan, summaryDifferences, dayIndex, dayDifferences) in check_workflow(
+                        workflow, weathers[year - 1959], CONFIGURATIONS[configuration], tolerances).items():
+                    name = workflow + ' ' + str(year) + ' ' + configuration + ' ' + rm
+                    pruned = ', '.join(plan.getPrunedStepNames()) or 'no step'
+                    if len(summaryDifferences) == 0 and dayIndex is None:
+                        print(name + ': OK (pruned ' + pruned + ')')
+                        continue
+                    failures += 1
+                    print(name + ': DIVERGENT (pruned ' + pruned + ')')
+                    for variable, reference, value in summaryDifferences:
+                        print('    summary ' + variable + ': all the steps ' + str(reference) + ', plan ' + str(value))
+                    if dayIndex is not None:
+                        print('    first divergent day: day ' + str(dayIndex) + ' of the simulation')
+                        for variable, reference, value in dayDifferences:
+                            print('    ' + variable + ': all the steps ' + str(reference) + ', plan ' + str(value))
+    print(str(failures) + ' divergent run mode(s)')
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
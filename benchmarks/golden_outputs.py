@@ -0,0 +1,292 @@
+"""
+Golden outputs regression harness.
+
+The harness runs the sample workflows (all the run modes) of the benchmark suite on the years of the Santa Lucia
+weather and compares the summary outputs and the full daily details with the golden files stored in
+benchmarks/golden, using absolute and relative tolerances that can be set per output variable in
+benchmarks/golden/tolerances.json. For every run mode it reports the first divergent day, the divergent variables and
+the steps that wrote them in that day. The golden files are created (or regenerated, after an intended change of the
+results) with the regenerate command.
+
+Usage (from any folder):
+
+    python golden_outputs.py check [--workflows ...] [--years 1980 2003] [--starts sowing january]
+    python golden_outputs.py regenerate [--workflows ...] [--years 1980 2003] [--starts sowing january]
+
+Every workflow is run with the simulation starting two days before the sowing day of the benchmark suite (start case
+'sowing') and on 1 January (start case 'january'), so that the steps skipped before sowing by the pre-crop plan of
+the ModelEngine are covered by the golden files.
+
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import datetime
+import json
+import math
+import numbers
+import os
+import sys
+
+import run_benchmarks
+from ecrops.ModelEngine import ModelEngine
+
+GOLDEN_FOLDER = os.path.join(run_benchmarks.BENCHMARKS_FOLDER, 'golden')
+
+TOLERANCES_FILE = os.path.join(GOLDEN_FOLDER, 'tolerances.json')
+
+DEFAULT_YEARS = [1980, 2003]
+
+START_CASES = {'sowing': run_benchmarks.SOWING_DOY - 2, 'january': 0}
+"""Start cases of the simulations: name -> days from 1 January to the first day of the simulation"""
+
+DEFAULT_START_CASE = 'sowing'
+
+
+def get_golden_file(workflow, year, start=DEFAULT_START_CASE):
+    """Returns the path of the golden file of the workflow, weather year and start case"""
+    suffix = '' if start == DEFAULT_START_CASE else '_' + start
+    return os.path.join(GOLDEN_FOLDER, workflow + '_' + str(year) + suffix + '.json')
+
+
+def to_json_value(value):
+    """Converts a value of the outputs to a value that can be saved in JSON (dates become ISO strings)"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Number):
+        return float(value)
+    return str(value)
+
+
+def create_engine(workflow):
+    """Creates the ModelEngine of the workflow, returning the daily details"""
+    engine = ModelEngine(run_benchmarks.WORKFLOWS[workflow][0])
+    engine.ReturnDailyDetails = True
+    engine.PrintDailyDetails = False
+    return engine
+
+
+def initialize(engine, workflow, weather, drivingVariables=None, start=DEFAULT_START_CASE):
+    """Initializes a unit of the workflow on the weather array, as the benchmark suite does, with the simulation
+    starting as in the start case. The optional dictionary drivingVariables overrides the driving variables of the
+    benchmark suite (e.g. {'ConsiderCo2Effect': True})
+    :return: the status and the number of days to run
+    """
+    workflowFile, parametersFile, model = run_benchmarks.WORKFLOWS[workflow]
+    with open(os.path.join(run_benchmarks.BENCHMARKS_FOLDER, parametersFile)) as f:
+        parameters = json.load(f)
+    weather = run_benchmarks.convert_weather(weather, model)
+    numberOfDays = weather.shape[0]
+    first_day = datetime.datetime(run_benchmarks.YEAR, 1, 1)
+    simulation_start_day = first_day + datetime.timedelta(days=START_CASES[start])
+    simulation_end_day = simulation_start_day + datetime.timedelta(days=numberOfDays)
+    unitDrivingVariables = run_benchmarks.get_driving_variables(model, numberOfDays)
+    unitDrivingVariables.update(drivingVariables or {})
+    status = engine.initialize(weather, run_benchmarks.WEATHER_COLUMNS, unitDrivingVariables, parameters, first_day,
+                               simulation_start_day, simulation_end_day)
+    return status, numberOfDays
+
+
+def run_workflow(workflow, weather, start=DEFAULT_START_CASE):
+    """Runs all the run modes of the workflow on the weather array, starting as in the start case
+    :return: dictionary run mode -> {'summary': {variable: value}, 'daily': {variable: [values]}}
+    """
+    engine = create_engine(workflow)
+    results = {}
+    for rm in engine.getRunModeNames():
+        status, numberOfDays = initialize(engine, workflow, weather, start=start)
+        for d in range(numberOfDays):
+            status = engine.executeStep(status, rm)
+        summary, dailyDetails = engine.finalize(status, rm)
+        names = engine.getOutputVariablesNames(rm)
+        results[rm] = {'summary': {n: to_json_value(v) for n, v in zip(names, summary)},
+                       'daily': {n: [to_json_value(v) for v in values] for n, values in dailyDetails.items()}}
+    return results
+
+
+def load_tolerances(args):
+    """Returns the tolerances: the ones of the tolerances file, with the defaults overridden by the command line"""
+    tolerances = {'default': {'abs': 1e-5, 'rel': 1e-6}, 'variables': {}}
+    if os.path.exists(TOLERANCES_FILE):
+        with open(TOLERANCES_FILE) as f:
+            tolerances.update(json.load(f))
+    if args.abs is not None:
+        tolerances['default']['abs'] = args.abs
+    if args.rel is not None:
+        tolerances['default']['rel'] = args.rel
+    return tolerances
+
+
+def is_equal(value, golden, tolerance):
+    """Returns True if the value is equal to the golden value: numbers are equal if they are both integers or both
+    not integers (e.g. a crop state 0 instead of 0.0 is a divergence) and abs(value - golden) <= abs tolerance + rel
+    tolerance * abs(golden)"""
+    if isinstance(golden, numbers.Number) and not isinstance(golden, bool) and isinstance(value, numbers.Number):
+        if isinstance(golden, numbers.Integral) != isinstance(value, numbers.Integral):
+            return False
+        if math.isnan(golden) or math.isnan(value):
+            return math.isnan(golden) and math.isnan(value)
+        return abs(value - golden) <= tolerance['abs'] + tolerance['rel'] * abs(golden)
+    return value == golden
+
+
+def get_tolerance(tolerances, variable):
+    """Returns the tolerance of the output variable"""
+    tolerance = dict(tolerances['default'])
+    tolerance.update(tolerances['variables'].get(variable, {}))
+    return tolerance
+
+
+class WritingStepsProbe:
+    """
+    Finds the steps that change the values of some output variables in a day. It implements the methods of
+    StepRecorder called by the ModelEngine (see ModelEngine.callStepMethod), so it is attached to the engine as
+    its recorder: before and after every step call of the day it evaluates the output variables, and records the
+    step calls that changed them.
+    """
+
+    def __init__(self, engine, runMode, variables, day):
+        self.engine = engine
+        self.outputVariables = [o for o in engine.getOutputVariables(runMode) if o.name in variables]
+        self.day = day
+        self.writers = {o.name: [] for o in self.outputVariables}
+
+    def isRecorded(self, status, runMode, step):
+        return status.day == self.day
+
+    def captureInputs(self, status, runMode, step):
+        return [self.engine.getDailyOutputValue(o, status) for o in self.outputVariables]
+
+    def addRecord(self, status, runMode, step, method, inputs):
+        for o, before in zip(self.outputVariables, inputs):
+            after = self.engine.getDailyOutputValue(o, status)
+            if after != before:
+                self.writers[o.name].append(step.__class__.__name__ + '.' + method)
+
+
+def find_writing_steps(workflow, weather, runMode, dayIndex, variables, start=DEFAULT_START_CASE):
+    """Runs again the run mode until the day and returns, for every variable, the step calls that changed it in
+    that day"""
+    engine = create_engine(workflow)
+    status, numberOfDays = initialize(engine, workflow, weather, start=start)
+    probe = WritingStepsProbe(engine, runMode, variables, status.first_day + datetime.timedelta(days=dayIndex))
+    engine.recorder = probe
+    for d in range(dayIndex + 1):
+        status = engine.executeStep(status, runMode)
+    return probe.writers
+
+
+def compare_run_mode(results, golden, tolerances):
+    """Compares the results of a run mode with the golden ones
+    :return: a tuple (list of the divergent summary variables, first divergent day index or None, list of
+    (variable, golden value, value) for that day)"""
+    summaryDifferences = []
+    for name, goldenValue in golden['summary'].items():
+        value = results['summary'].get(name)
+        if not is_equal(value, goldenValue, get_tolerance(tolerances, name)):
+            summaryDifferences.append((name, goldenValue, value))
+
+    goldenDays = len(golden['daily'].get('DAY', []))
+    days = len(results['daily'].get('DAY', []))
+    for d in range(max(goldenDays, days)):
+        dayDifferences = []
+        for name, goldenValues in golden['daily'].items():
+            values = results['daily'].get(name, [])
+            goldenValue = goldenValues[d] if d < len(goldenValues) else None
+            value = values[d] if d < len(values) else None
+            if not is_equal(value, goldenValue, get_tolerance(tolerances, name)):
+                dayDifferences.append((name, goldenValue, value))
+        if len(dayDifferences) > 0:
+            return summaryDifferences, d, dayDifferences
+    return summaryDifferences, None, []
+
+
+def check(args):
+    """Runs the workflows and compares the outputs with the golden files. Returns 1 if some outputs diverge or a
+    golden file is missing, 0 otherwise"""
+    tolerances = load_tolerances(args)
+    weathers = run_benchmarks.load_csv_weather()
+    failures = 0
+    for workflow in args.workflows:
+        for year in args.years:
+            for start in args.starts:
+                failures += check_case(workflow, year, start, weathers[year - 1959], tolerances)
+    print(str(failures) + ' divergent run mode(s)')
+    return 1 if failures > 0 else 0
+
+
+def check_case(workflow, year, start, weather, tolerances):
+    """Runs the workflow in a weather year and start case and compares the outputs with the golden file. Returns the
+    number of divergent run modes (1 if the golden file is missing)"""
+    name = workflow + ' ' + str(year) + ('' if start == DEFAULT_START_CASE else ' ' + start)
+    goldenFile = get_golden_file(workflow, year, start)
+    if not os.path.exists(goldenFile):
+        print(name + ': missing golden file ' + goldenFile)
+        return 1
+    with open(goldenFile) as f:
+        golden = json.load(f)
+    results = run_workflow(workflow, weather, start)
+    failures = 0
+    for rm, goldenRunMode in golden['run_modes'].items():
+        if rm not in results:
+            print(name + ' ' + rm + ': run mode not found')
+            failures += 1
+            continue
+        summaryDifferences, dayIndex, dayDifferences = compare_run_mode(results[rm], goldenRunMode, tolerances)
+        if len(summaryDifferences) == 0 and dayIndex is None:
+            print(name + ' ' + rm + ': OK')
+            continue
+        failures += 1
+        print(name + ' ' + rm + ': DIVERGENT')
+        for variable, goldenValue, value in summaryDifferences:
+            print('    summary ' + variable + ': golden ' + str(goldenValue) + ', current ' + str(value))
+        if dayIndex is not None:
+            day = goldenRunMode['daily']['DAY'][dayIndex] if dayIndex < len(
+                goldenRunMode['daily']['DAY']) else str(dayIndex)
+            print('    first divergent day: ' + str(day) + ' (day ' + str(dayIndex) + ' of the simulation)')
+            writers = find_writing_steps(workflow, weather, rm, dayIndex, [v for v, g, c in dayDifferences], start)
+            for variable, goldenValue, value in dayDifferences:
+                print('    ' + variable + ': golden ' + str(goldenValue) + ', current ' + str(
+                    value) + ', written by ' + (', '.join(writers.get(variable, [])) or 'no step'))
+    return failures
+
+
+def regenerate(args):
+    """Runs the workflows and saves their outputs as the new golden files"""
+    if not os.path.exists(GOLDEN_FOLDER):
+        os.makedirs(GOLDEN_FOLDER)
+    weathers = run_benchmarks.load_csv_weather()
+    for workflow in args.workflows:
+        for year in args.years:
+            for start in args.starts:
+                results = run_workflow(workflow, weathers[year - 1959], start)
+                goldenFile = get_golden_file(workflow, year, start)
+                with open(goldenFile, 'w') as f:
+                    json.dump({'workflow': workflow, 'weather_year': year, 'start': start, 'run_modes': results}, f,
+                              indent=0)
+                print('Saved ' + goldenFile)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ecrops golden outputs regression harness')
+    parser.add_argument('command', choices=['check', 'regenerate'])
+    parser.add_argument('--workflows', nargs='+', default=list(run_benchmarks.WORKFLOWS.keys()),
+                        choices=list(run_benchmarks.WORKFLOWS.keys()), help='workflows to run')
+    parser.add_argument('--years', type=int, nargs='+', default=DEFAULT_YEARS,
+                        help='years of the Santa Lucia weather (1959-2018)')
+    parser.add_argument('--starts', nargs='+', default=list(START_CASES.keys()), choices=list(START_CASES.keys()),
+                        help='start cases of the simulations')
+    parser.add_argument('--abs', type=float, default=None, help='default absolute tolerance')
+    parser.add_argument('--rel', type=float, default=None, help='default relative tolerance')
+    args = parser.parse_args(argv)
+    if args.command == 'check':
+        return check(args)
+    return regenerate(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Regression checks of the modules of the engine that are not steps (weather conversions, weather loaders and stores,
+output sinks, step recorder, workflow analyzer), on small datasets built by the checks, stored in benchmarks/regression
+or taken from the benchmark workflows.
+
+Every check is a function raising an AssertionError when the module does not behave as expected; the checks are
+registered in CHECKS with their name.
+
+Usage (from any folder):
+
+    python regression_checks.py [--checks ...]
+
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import csv
+import datetime
+import os
+import sys
+import tempfile
+import traceback
+
+import numpy as np
+
+import golden_outputs
+import run_benchmarks
+from ecrops.OutputSinks import CsvOutputSink, OutputSink
+from ecrops.StepRecorder import StepRecorder, StepReplay
+from ecrops.WeatherConversions import WeatherConversionStage
+from ecrops.WorkflowAnalyzer import WorkflowAnalyzer
+from ecrops.csvweather import parse_csv_weather
+from ecrops.weatherstore import WeatherStore, write_weather_store
+
+REGRESSION_FOLDER = os.path.join(run_benchmarks.BENCHMARKS_FOLDER, 'regression')
+
+# conversions and columns of the weather arrays of the conversion checks
+CONVERSIONS = [('IRRAD', 'kJ/m2', 'J/m2', None), ('RAIN', 'mm', 'cm', None)]
+CONVERSION_COLUMNS = {'IRRAD': 0, 'RAIN': 1}
+
+
+def create_grid():
+    """Returns the weather array (3, 4, 365, 2) of a grid, in kJ/m2 and mm"""
+    grid = np.empty((3, 4, 365, 2))
+    grid[..., 0] = 8712.
+    grid[..., 1] = np.arange(365) % 7
+    return grid
+
+
+def assert_converted(weather, name):
+    """Checks that the grid values of create_grid were converted once"""
+    assert np.all(weather[..., 0] == 8712000.), name + ': IRRAD ' + str(np.unique(weather[..., 0]))
+    assert np.allclose(weather[..., 1], (np.arange(365) % 7) / 10.), name + ': RAIN ' + str(
+        np.unique(weather[..., 1]))
+
+
+def check_conversion_view_then_base():
+    """The weather of a cell (a view of the grid) is converted, then the whole grid: the cell is not converted again"""
+    stage = WeatherConversionStage(CONVERSIONS)
+    grid = create_grid()
+    stage.apply(grid[1, 2], CONVERSION_COLUMNS)
+    stage.apply(grid, CONVERSION_COLUMNS)
+    assert_converted(grid, 'view then base')
+
+
+def check_conversion_base_then_view():
+    """The grid is converted, then the weather of the cells (views, also plain numpy views): nothing changes"""
+    stage = WeatherConversionStage(CONVERSIONS)
+    grid = create_grid()
+    stage.apply(grid, CONVERSION_COLUMNS)
+    stage.apply(grid[1, 2], CONVERSION_COLUMNS)
+    stage.apply(np.asarray(grid[0]), CONVERSION_COLUMNS)
+    assert_converted(grid, 'base then view')
+
+
+def check_conversion_array_copy():
+    """A copy made with np.array of the weather of a converted cell is not converted again, a copy of the weather of a
+    cell not converted is converted without changing the grid"""
+    stage = WeatherConversionStage(CONVERSIONS)
+    grid = create_grid()
+    stage.apply(grid, CONVERSION_COLUMNS)
+    cell = np.array(grid[1, 2])
+    stage.apply(cell, CONVERSION_COLUMNS)
+    assert_converted(cell, 'copy of a converted cell')
+
+    grid = create_grid()
+    cell = np.array(grid[1, 2])
+    stage.apply(cell, CONVERSION_COLUMNS)
+    assert_converted(cell, 'copy of a cell')
+    assert np.all(grid[..., 0] == 8712.), 'copy of a cell: the grid was converted'
+
+
+def check_conversion_units():
+    """Converting the data already converted to another unit raises an exception"""
+    grid = create_grid()
+    WeatherConversionStage(CONVERSIONS).apply(grid, CONVERSION_COLUMNS)
+    try:
+        WeatherConversionStage([('IRRAD', 'kJ/m2', 'MJ/m2', None)]).apply(grid[0], CONVERSION_COLUMNS)
+    except Exception:
+        return
+    raise AssertionError('the data in J/m2 were converted from kJ/m2')
+
+
+def check_csv_weather_blank_fields():
+    """The empty fields of a weather CSV file, also made only of spaces and tabs, are NaN and the blank lines are
+    skipped, as with np.genfromtxt"""
+    fileName = os.path.join(REGRESSION_FOLDER, 'weather_blank_fields.csv')
+    data = parse_csv_weather(fileName, 5)
+    expected = np.genfromtxt(fileName, delimiter=';', skip_header=1, dtype=float)
+    assert data.shape == (5, 5), 'blank fields: shape ' + str(data.shape)
+    assert np.array_equal(data, expected, equal_nan=True), 'blank fields: ' + str(data) + ', expected ' + str(
+        expected)
+    assert np.isnan(data).sum() == 5, 'blank fields: ' + str(np.isnan(data).sum()) + ' NaN values, expected 5'
+
+
+def run_unit(engine, workflow, weather, runMode):
+    """Runs a unit of the run mode of the workflow, as the golden outputs harness does, and returns the status"""
+    status, numberOfDays = golden_outputs.initialize(engine, workflow, weather)
+    for d in range(numberOfDays):
+        status = engine.executeStep(status, runMode)
+    return status
+
+
+def check_step_replay():
+    """The steps recorded on two units of WofostSimple (steps reading status variables written by the other steps and
+    not declared as inputs) are replayed with the recorded outputs"""
+    weathers = run_benchmarks.load_csv_weather()
+    engine = golden_outputs.create_engine('WofostSimple')
+    engine.recorder = StepRecorder(steps=['DVS_Phenology', 'WOFOST_Leaf_Dynamics'], every=10)
+    runMode = engine.getRunModeNames()[0]
+    for year in golden_outputs.DEFAULT_YEARS:
+        run_unit(engine, 'WofostSimple', weathers[year - 1959], runMode)
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = os.path.join(folder, 'steps.ecrec')
+        engine.recorder.save(fileName)
+        results = StepReplay(fileName).run()
+    assert len(results) == 2, 'step replay: replayed steps ' + str(list(results.keys()))
+    for stepKey, result in results.items():
+        assert result['calls'] > 0, 'step replay: no calls of ' + str(stepKey)
+        assert len(result['mismatches']) == 0, 'step replay: ' + str(len(result['mismatches'])) + ' mismatches of ' + \
+            str(stepKey) + ', first ' + str(result['mismatches'][0])
+
+
+def check_analyzer_strict():
+    """The steps linking the CO2 data to the assimilation and to the evapotranspiration declare no outputs: they are
+    kept in the plans of WofostSimpleWithCo2 in strict mode (default) and pruned only with strict=False"""
+    engine = golden_outputs.create_engine('WofostSimpleWithCo2')
+    analyzer = WorkflowAnalyzer(engine)
+    co2Steps = ['LinkCo2DataToAssimilation', 'LinkCo2DataToEvapotranspiration']
+    for runMode in engine.getRunModeNames():
+        plan = analyzer.analyze(runMode)
+        pruned = [s for s in co2Steps if s in plan.getPrunedStepNames()]
+        assert len(pruned) == 0, runMode + ' strict: pruned ' + ', '.join(pruned)
+        plan = analyzer.analyze(runMode, strict=False)
+        kept = [s for s in co2Steps if s not in plan.getPrunedStepNames()]
+        assert len(kept) == 0, runMode + ' not strict: kept ' + ', '.join(kept)
+
+
+def check_sink_run_modes():
+    """The run modes of WofostSimpleWithCo2 (different output variables) are written by a CSV sink to their own files,
+    each one with the columns of its run mode"""
+    weather = run_benchmarks.load_csv_weather()[golden_outputs.DEFAULT_YEARS[0] - 1959]
+    engine = golden_outputs.create_engine('WofostSimpleWithCo2')
+    runModes = engine.getRunModeNames()
+    with tempfile.TemporaryDirectory() as folder:
+        sink = CsvOutputSink(os.path.join(folder, 'details.csv'))
+        engine.DailyDetailsSink = sink
+        dailyDetails = {}
+        for runMode in runModes:
+            dailyDetails[runMode] = engine.finalize(run_unit(engine, 'WofostSimpleWithCo2', weather, runMode),
+                                                    runMode)[1]
+        sink.close()
+        for i, runMode in enumerate(runModes):
+            fileName = sink.fileName if i == 0 else sink.getFileName(runMode)
+            with open(fileName, newline='') as f:
+                rows = list(csv.reader(f))
+            assert rows[0] == ['RUN_MODE'] + list(dailyDetails[runMode].keys()), runMode + ': columns ' + str(rows[0])
+            assert len(rows) - 1 == len(dailyDetails[runMode]['DAY']), runMode + ': ' + str(len(rows) - 1) + ' rows'
+            assert all(r[0] == runMode for r in rows[1:]), runMode + ': rows of other run modes'
+
+
+class FailingOutputSink(OutputSink):
+    """Output sink failing at every write of a block"""
+
+    def writeBlock(self, table, block, rows):
+        raise Exception('write error of the regression check')
+
+    def closeFile(self, table):
+        pass
+
+
+def check_sink_error():
+    """An error of the daily details sink does not discard the outputs returned by finalize"""
+    weather = run_benchmarks.load_csv_weather()[golden_outputs.DEFAULT_YEARS[0] - 1959]
+    engine = golden_outputs.create_engine('WofostPhenology')
+    runMode = engine.getRunModeNames()[0]
+    expected = engine.finalize(run_unit(engine, 'WofostPhenology', weather, runMode), runMode)
+    engine.DailyDetailsSink = FailingOutputSink('details.csv', bufferRows=1)
+    results = engine.finalize(run_unit(engine, 'WofostPhenology', weather, runMode), runMode)
+    assert results is not None, 'sink error: no results'
+    assert np.array_equal(results[0], expected[0]), 'sink error: summary ' + str(results[0]) + ', expected ' + str(
+        expected[0])
+    assert results[1] == expected[1], 'sink error: different daily details'
+
+
+def check_weather_store_float64():
+    """The weather stores are float64 by default: the cells are views of the store, with the values of the weather
+    array. The cells of the float32 stores are float64 copies of the rounded values"""
+    weather = run_benchmarks.load_csv_weather()[golden_outputs.DEFAULT_YEARS[0] - 1959]
+    variables = sorted(run_benchmarks.WEATHER_COLUMNS, key=run_benchmarks.WEATHER_COLUMNS.get)
+    data = weather[:, :len(variables)]
+    with tempfile.TemporaryDirectory() as folder:
+        for dtype in ['<f8', '<f4']:
+            store = WeatherStore(write_weather_store(os.path.join(folder, 'weather' + dtype[1:]), data, variables,
+                                                     datetime.datetime(run_benchmarks.YEAR, 1, 1), dtype=dtype))
+            cell = store.getCell(0, 0)
+            assert cell.dtype == np.float64, dtype + ': cell of type ' + str(cell.dtype)
+            expected = data if dtype == '<f8' else data.astype(np.float32).astype(np.float64)
+            assert np.array_equal(cell, expected, equal_nan=True), dtype + ': values changed'
+            assert (cell.base is not None) == (dtype == '<f8'), dtype + ': cell view ' + str(cell.base is not None)
+            store.close()
+
+
+# registered checks: name -> function
+CHECKS = {
+    'conversion_view_then_base': check_conversion_view_then_base,
+    'conversion_base_then_view': check_conversion_base_then_view,
+    'conversion_array_copy': check_conversion_array_copy,
+    'conversion_units': check_conversion_units,
+    'csv_weather_blank_fields': check_csv_weather_blank_fields,
+    'step_replay': check_step_replay,
+    'analyzer_strict': check_analyzer_strict,
+    'sink_run_modes': check_sink_run_modes,
+    'sink_error': check_sink_error,
+    'weather_store_float64': check_weather_store_float64,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ecrops regression checks')
+    parser.add_argument('--checks', nargs='+', default=list(CHECKS.keys()), choices=list(CHECKS.keys()),
+                        help='checks to run')
+    args = parser.parse_args(argv)
+    failures = 0
+    for name in args.checks:
+        try:
+            CHECKS[name]()
+            print(name + ': OK')
+        except Exception:
+            failures += 1
+            print(name + ': FAILED')
+            traceback.print_exc(limit=5, file=sys.stdout)
+    print(str(failures) + ' failed check(s)')
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Records the inputs and outputs of the steps during a benchmark simulation and executes again the steps on the
+recorded values (see ecrops.StepRecorder).
+
+Usage (from any folder):
+
+    python replay_steps.py record --workflow WofostSimple [--weather csv] [--units 10] [--steps ...] [--every 1] [--output steps.ecrec]
+    python replay_steps.py replay steps.ecrec [--steps ...] [--repeat 10] [--implementation Step=module|Class ...]
+
+The record command runs the workflow as the benchmark suite does (see run_benchmarks.py), the replay command checks
+that the steps produce the recorded outputs and reports the time per call. With --implementation a step is replaced
+by another class (e.g. an optimized version), that is checked and measured on the same recorded values.
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import json
+import os
+import sys
+
+import run_benchmarks
+from ecrops.ModelEngine import ModelEngine, load_step_class
+from ecrops.StepRecorder import StepRecorder, StepReplay
+
+
+def record(args):
+    """Runs the units of the workflow with a StepRecorder attached and saves the records"""
+    workflowFile, parametersFile, model = run_benchmarks.WORKFLOWS[args.workflow]
+    with open(os.path.join(run_benchmarks.BENCHMARKS_FOLDER, parametersFile)) as f:
+        parameters = json.load(f)
+    weathers = run_benchmarks.load_csv_weather() if args.weather == 'csv' else run_benchmarks.load_netcdf_weather()
+    engine = ModelEngine(workflowFile)
+    engine.recorder = StepRecorder(steps=args.steps, every=args.every, max_records=args.max_records)
+    run_benchmarks.run_units(engine, model, parameters, weathers, args.units,
+                             {'init_s': 0.0, 'run_s': 0.0, 'finalize_s': 0.0, 'days': 0})
+    engine.recorder.save(args.output)
+    for (runMode, stepName), records in engine.recorder.records.items():
+        print(runMode + ' ' + stepName + ': ' + str(len(records)) + ' records')
+    print('Records saved to ' + args.output)
+    return 0
+
+
+def replay(args):
+    """Replays the recorded file, printing the report. Returns 1 if there are mismatches, 0 otherwise"""
+    implementations = {}
+    for implementation in args.implementation:
+        stepName, fullClass = implementation.split('=')
+        module, className = fullClass.split('|')
+        implementations[stepName] = load_step_class(module, className)
+    replayer = StepReplay(args.file)
+    results = replayer.run(steps=args.steps, implementations=implementations, repeat=args.repeat,
+                           tolerance=args.tolerance)
+    print(replayer.report(results))
+    return 1 if any(len(r['mismatches']) > 0 for r in results.values()) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='record and replay the ecrops steps')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    recordParser = subparsers.add_parser('record', help='run a workflow recording the steps')
+    recordParser.add_argument('--workflow', default='WofostSimple', choices=list(run_benchmarks.WORKFLOWS.keys()))
+    recordParser.add_argument('--weather', default='csv', choices=run_benchmarks.WEATHER_SOURCES)
+    recordParser.add_argument('--units', type=int, default=10, help='number of units to run')
+    recordParser.add_argument('--steps', nargs='+', default=None, help='class names of the steps to record')
+    recordParser.add_argument('--every', type=int, default=1, help='sampling interval in days')
+    recordParser.add_argument('--max-records', type=int, default=None, help='maximum number of records per step')
+    recordParser.add_argument('--output', default='steps.ecrec', help='file of the records')
+
+    replayParser = subparsers.add_parser('replay', help='execute again the recorded steps')
+    replayParser.add_argument('file', help='file of the records')
+    replayParser.add_argument('--steps', nargs='+', default=None, help='names of the steps to replay')
+    replayParser.add_argument('--repeat', type=int, default=1, help='executions of every recorded call')
+    replayParser.add_argument('--tolerance', type=float, default=1e-9, help='relative tolerance of the comparison')
+    replayParser.add_argument('--implementation', nargs='*', default=[],
+                              help='replacement classes of the steps, as StepClass=module|Class')
+
+    args = parser.parse_args(argv)
+    if args.command == 'record':
+        return record(args)
+    return replay(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
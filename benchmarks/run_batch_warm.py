@@ -0,0 +1,173 @@
+"""
+Parity and throughput of the BatchModelEngine on the WARM workflows.
+
+The script runs the WARM workflows on a batch of simulation units (the years of the Santa Lucia weather, with some
+parameters changed from unit to unit) with the ModelEngine, one unit at a time, and with the BatchModelEngine, all the
+units at once. It compares the summary outputs and the daily details of every unit, using the default tolerances of
+the golden outputs harness, and reports the simulated days per second (days of all the units) of the two engines.
+The throughput of the BatchModelEngine is also measured on larger batches (--throughput-units).
+
+Usage (from any folder):
+
+    python run_batch_warm.py [--workflows WarmPotential WarmSterility] [--units 60] [--throughput-units 1000 10000]
+
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import golden_outputs
+import run_benchmarks
+from ecrops.BatchModelEngine import BatchModelEngine
+from ecrops.ModelEngine import ModelEngine
+
+# WARM workflows: name -> workflow file
+WORKFLOWS = {
+    'WarmPotential': run_benchmarks.WORKFLOWS['WarmPotential'][0],
+    'WarmSterility': os.path.join(run_benchmarks.BENCHMARKS_FOLDER, 'WorkflowWarmSterility.xml'),
+}
+
+# parameters changed from unit to unit: name -> values used in turn by the units
+UNIT_PARAMETERS = {
+    'GrowingDegreeDaysToReachFlowering': [950, 900, 1000],
+    'LeafLife': [600.0, 550.0, 650.0, 500.0],
+}
+
+TOLERANCE = {'abs': 1e-5, 'rel': 1e-6}
+
+
+def get_units(weathers, units):
+    """Returns the converted weather arrays and the parameters of the units
+    :return: a tuple (list of weather arrays, list of parameters dictionaries)
+    """
+    with open(os.path.join(run_benchmarks.BENCHMARKS_FOLDER, 'ParametersWarmRice.json')) as f:
+        parameters = json.load(f)
+    converted = [run_benchmarks.convert_weather(w, 'warm') for w in weathers]
+    unitWeathers = []
+    unitParameters = []
+    for u in range(units):
+        unitWeathers.append(converted[u % len(converted)])
+        p = dict(parameters)
+        for name, values in UNIT_PARAMETERS.items():
+            p[name] = values[u % len(values)]
+        unitParameters.append(p)
+    return unitWeathers, unitParameters
+
+
+def get_days():
+    """Returns the first day, the simulation start day and the simulation end day of the units, as the benchmark
+    suite does"""
+    first_day = datetime.datetime(run_benchmarks.YEAR, 1, 1)
+    simulation_start_day = first_day + datetime.timedelta(days=run_benchmarks.SOWING_DOY - 2)
+    return first_day, simulation_start_day, simulation_start_day + datetime.timedelta(days=365)
+
+
+def run_scalar(workflowFile, unitWeathers, unitParameters):
+    """Runs the units one at a time with the ModelEngine
+    :return: a tuple (list of the results of finalize, run time in seconds)
+    """
+    engine = ModelEngine(workflowFile)
+    engine.ReturnDailyDetails = True
+    runMode = engine.getRunModeNames()[0]
+    first_day, simulation_start_day, simulation_end_day = get_days()
+    results = []
+    elapsed = 0.0
+    for weather, parameters in zip(unitWeathers, unitParameters):
+        numberOfDays = weather.shape[0]
+        status = engine.initialize(weather, run_benchmarks.WEATHER_COLUMNS,
+                                   run_benchmarks.get_driving_variables('warm', numberOfDays), parameters,
+                                   first_day, simulation_start_day, simulation_end_day)
+        t0 = time.perf_counter()
+        for d in range(numberOfDays):
+            status = engine.executeStep(status, runMode)
+        elapsed += time.perf_counter() - t0
+        results.append(engine.finalize(status, runMode))
+    return results, elapsed
+
+
+def run_batch(workflowFile, unitWeathers, unitParameters, returnDailyDetails=True):
+    """Runs all the units at once with the BatchModelEngine. The parameters changed from unit to unit are passed as
+    arrays
+    :return: a tuple (result of finalize, run time in seconds)
+    """
+    engine = BatchModelEngine(workflowFile)
+    engine.ReturnDailyDetails = returnDailyDetails
+    runMode = engine.getRunModeNames()[0]
+    first_day, simulation_start_day, simulation_end_day = get_days()
+    parameters = dict(unitParameters[0])
+    for name in UNIT_PARAMETERS:
+        parameters[name] = np.array([p[name] for p in unitParameters], dtype=float)
+    numberOfDays = unitWeathers[0].shape[0]
+    status = engine.initialize(np.stack(unitWeathers), run_benchmarks.WEATHER_COLUMNS,
+                               run_benchmarks.get_driving_variables('warm', numberOfDays), parameters, first_day,
+                               simulation_start_day, simulation_end_day)
+    t0 = time.perf_counter()
+    for d in range(numberOfDays):
+        status = engine.executeStep(status, runMode)
+    elapsed = time.perf_counter() - t0
+    return engine.finalize(status, runMode), elapsed
+
+
+def compare_units(engine, scalarResults, batchResult):
+    """Compares the outputs of every unit of the two engines
+    :return: a tuple (list of the indexes of the divergent units, maximum absolute difference)
+    """
+    names = engine.getOutputVariablesNames(engine.getRunModeNames()[0])
+    batchSummary, batchDaily = batchResult
+    divergent = []
+    maxDifference = 0.0
+    for u, (summary, daily) in enumerate(scalarResults):
+        pairs = [(batchSummary[u, i], summary[i]) for i in range(len(names))]
+        for name in names:
+            pairs.extend(zip(batchDaily[name][:, u], daily[name]))
+        equal = True
+        for value, reference in pairs:
+            value = float(value)
+            maxDifference = max(maxDifference, abs(value - reference))
+            equal = equal and golden_outputs.is_equal(value, reference, TOLERANCE)
+        if not equal:
+            divergent.append(u)
+    return divergent, maxDifference
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ecrops BatchModelEngine parity and throughput on the WARM workflows')
+    parser.add_argument('--workflows', nargs='+', default=list(WORKFLOWS.keys()), choices=list(WORKFLOWS.keys()),
+                        help='workflows to run')
+    parser.add_argument('--units', type=int, default=60, help='number of units compared with the ModelEngine')
+    parser.add_argument('--throughput-units', type=int, nargs='*', default=[1000, 10000],
+                        help='numbers of units run only with the BatchModelEngine to measure the throughput')
+    args = parser.parse_args(argv)
+    weathers = run_benchmarks.load_csv_weather()
+    failures = 0
+    for workflow in args.workflows:
+        workflowFile = WORKFLOWS[workflow]
+        unitWeathers, unitParameters = get_units(weathers, args.units)
+        days = sum(w.shape[0] for w in unitWeathers)
+        scalarResults, scalarTime = run_scalar(workflowFile, unitWeathers, unitParameters)
+        batchResult, batchTime = run_batch(workflowFile, unitWeathers, unitParameters)
+        divergent, maxDifference = compare_units(ModelEngine(workflowFile), scalarResults, batchResult)
+        failures += len(divergent)
+        scalarSpeed = days / scalarTime
+        print('%s %d units: %d divergent unit(s) %s, max absolute difference %.3g' % (
+            workflow, args.units, len(divergent), divergent[0:10], maxDifference))
+        print('%s %d units: ModelEngine %.0f days/s, BatchModelEngine %.0f days/s (%.1fx)' % (
+            workflow, args.units, scalarSpeed, days / batchTime, scalarTime / batchTime))
+        for units in args.throughput_units:
+            unitWeathers, unitParameters = get_units(weathers, units)
+            days = sum(w.shape[0] for w in unitWeathers)
+            batchResult, batchTime = run_batch(workflowFile, unitWeathers, unitParameters, False)
+            print('%s %d units: BatchModelEngine %.0f days/s (%.1fx the ModelEngine)' % (
+                workflow, units, days / batchTime, days / batchTime / scalarSpeed))
+    print(str(failures) + ' divergent unit(s)')
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
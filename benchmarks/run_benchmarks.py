@@ -0,0 +1,362 @@
+"""
+Benchmark suite of the ecrops ModelEngine.
+
+The suite runs the sample workflows of EcropsWofostExampleConsole and a WARM workflow on the bundled weather
+(the Santa Lucia CSV file and the weatherSample_2003.nc grid) for a given number of simulation units, and measures
+the time spent in the initialization, in the daily run and in the finalization of the units, the simulated days per
+second, the peak memory and the memory blocks left allocated at the end of the units (from the tracemalloc snapshots).
+
+Usage (from any folder):
+
+    python run_benchmarks.py run [--units 1 100 10000] [--workflows ...] [--weather csv netcdf] [--output results.json]
+    python run_benchmarks.py compare baseline.json results.json [--threshold 0.1]
+
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_FOLDER = os.path.join(BENCHMARKS_FOLDER, '..', 'EcropsWofostExampleConsole')
+
+# use the ecrops package of this repository if it is not installed
+if os.path.join(BENCHMARKS_FOLDER, '..', 'ecrops') not in sys.path:
+    sys.path.append(os.path.join(BENCHMARKS_FOLDER, '..', 'ecrops'))
+
+from ecrops.ModelEngine import ModelEngine
+from ecrops.csvweather import load_csv_weather as load_weather_file
+from ecrops.ecrops_version import __version__ as ecrops_version
+from ecrops.wofost_util.util import wind10to2
+
+# the netCDF4 package is needed only to read the netcdf weather
+try:
+    from netCDF4 import Dataset
+except ImportError:
+    Dataset = None
+
+# benchmarked workflows: name -> (workflow file, parameters file, model)
+WORKFLOWS = {
+    'WofostSimple': (os.path.join(EXAMPLES_FOLDER, 'WorkflowWofostSimple.xml'), 'ParametersWofostMaize.json', 'wofost'),
+    'WofostPhenology': (
+        os.path.join(EXAMPLES_FOLDER, 'WorkflowWofostPhenology.xml'), 'ParametersWofostMaize.json', 'wofost'),
+    'WofostCo2Partitioning': (
+        os.path.join(EXAMPLES_FOLDER, 'WorkflowWofostCo2Partitioning.xml'), 'ParametersWofostMaize.json', 'wofost'),
+    'WofostSimpleWithCo2': (
+        os.path.join(EXAMPLES_FOLDER, 'WorkflowWofostSimpleWithCo2.xml'), 'ParametersWofostMaize.json', 'wofost'),
+    'WarmPotential': (os.path.join(BENCHMARKS_FOLDER, 'WorkflowWarmPotential.xml'), 'ParametersWarmRice.json', 'warm'),
+}
+
+WEATHER_SOURCES = ['csv', 'netcdf']
+
+DEFAULT_UNITS = [1, 100, 10000]
+
+YEAR = 2003  # the year available in both the weather sources
+SOWING_DOY = 105
+LAT = 39.77
+LON = 8.5
+
+# columns of the weather arrays, before the conversion to the units of measure of the model
+WEATHER_COLUMNS = {'TEMP_MAX': 0, 'TEMP_MIN': 1, 'IRRAD': 2, 'RAIN': 3, 'WIND': 4, 'RH': 5, 'E0': 6, 'ES0': 7,
+                   'ET0': 8}
+
+# number of the lines of code allocating the most retained memory listed in the results of a case
+RETAINED_SITES = 5
+
+# metrics compared by the compare command, with True if a greater value is better
+COMPARED_METRICS = {'init_s': False, 'run_s': False, 'finalize_s': False, 'total_s': False,
+                    'days_per_second': True, 'peak_memory_bytes': False}
+
+
+def load_csv_weather():
+    """Loads the Santa Lucia weather file and returns one weather array (365 days, units of the file: C, kJ/m2,
+    mm, m/s, %, mm) per year from 1959 to 2018. The units of the benchmark use the years in turn.
+    :return: a list of numpy arrays with columns WEATHER_COLUMNS
+    """
+    data = load_weather_file(os.path.join(EXAMPLES_FOLDER, 'SampleWeatherSantaLucia1959-2019.csv'))
+    years = []
+    for year in range(1959, 2019):
+        first = (datetime.datetime(year, 1, 1) - datetime.datetime(1959, 1, 1)).days
+        weather = data[first:first + 365].copy()
+        # the windspeed is not available in the file
+        weather[:, WEATHER_COLUMNS['WIND']] = 0
+        years.append(weather)
+    return years
+
+
+def load_netcdf_weather():
+    """Loads the weatherSample_2003.nc file and returns one weather array (365 days, units of the file: C, kJ/m2, mm,
+    m/s at 2 meters, %, mm) per grid cell. The units of the benchmark use the grid cells in turn.
+    :return: a list of numpy arrays with columns WEATHER_COLUMNS
+    """
+    variables = ['temperature_max', 'temperature_min', 'radiation', 'precipitation', 'windspeed', None, 'e0', 'es0',
+                 'et0']
+    rootgrp = Dataset(os.path.join(EXAMPLES_FOLDER, 'weatherSample_2003.nc'), 'r', format='NETCDF4')
+    try:
+        data = [None if v is None else np.asarray(rootgrp.variables[v][0:365], dtype=float) for v in variables]
+    finally:
+        rootgrp.close()
+    cells = []
+    for x in range(data[0].shape[1]):
+        for y in range(data[0].shape[2]):
+            weather = np.empty((365, len(variables)), dtype=float)
+            for i in range(len(variables)):
+                # the relative humidity is not available in the file: the default of the Weather step is used
+                weather[:, i] = 80 if data[i] is None else data[i][:, x, y]
+            weather[:, WEATHER_COLUMNS['WIND']] = wind10to2(weather[:, WEATHER_COLUMNS['WIND']])
+            cells.append(weather)
+    return cells
+
+
+def convert_weather(weather, model):
+    """Converts the weather array to the units of measure expected by the model: WOFOST wants the radiation in
+    J/m2 and rain and evapotranspiration in cm, WARM wants the radiation in MJ/m2 and evapotranspiration in mm.
+    :param weather: weather array with columns WEATHER_COLUMNS
+    :param model: 'wofost' or 'warm'
+    :return: the converted weather array
+    """
+    weather = weather.copy()
+    if model == 'wofost':
+        weather[:, WEATHER_COLUMNS['IRRAD']] *= 1000  # kJ => J
+        for c in ['RAIN', 'E0', 'ES0', 'ET0']:
+            weather[:, WEATHER_COLUMNS[c]] /= 10.  # mm => cm
+    else:
+        weather[:, WEATHER_COLUMNS['IRRAD']] /= 1000.  # kJ => MJ
+    return weather
+
+
+def get_driving_variables(model, numberOfDays):
+    """Returns the driving variables of a unit
+    :param model: 'wofost' or 'warm'
+    :param numberOfDays: number of days to run
+    :return: dictionary of driving variables
+    """
+    drivingVariables = {'DURATION': numberOfDays, 'START_DOY': SOWING_DOY, 'YEAR': YEAR, 'LAT': LAT, 'LON': LON}
+    if model == 'wofost':
+        drivingVariables.update({'ConsiderCo2Effect': False, 'Co2FertReference': 369,
+                                 'Co2Concentrations': {str(YEAR): 400}, 'Co2FertSlope': 0.18,
+                                 'SOIL_MOISTURE_CONTENT_FC': 0.35, 'SOIL_MOISTURE_CONTENT_WP': 0.19,
+                                 'SOIL_MOISTURE_CONTENT_SAT': 0.45, 'WAV': (0.35 - 0.19) * 200 / 100, 'DEPTH': 200,
+                                 'Crop': 2})
+    return drivingVariables
+
+
+def run_units(engine, model, parameters, weathers, units, measures):
+    """Runs all the run modes of the workflow for the units, adding the elapsed times to measures
+    :param engine: the ModelEngine
+    :param model: 'wofost' or 'warm'
+    :param parameters: the model parameters
+    :param weathers: list of weather arrays, used in turn by the units
+    :param units: number of units to run
+    :param measures: dictionary with keys init_s, run_s, finalize_s, days
+    :return: the list of the summary outputs of the units
+    """
+    runModes = engine.getRunModeNames()
+    converted = [convert_weather(w, model) for w in weathers[0:min(units, len(weathers))]]
+    first_day = datetime.datetime(YEAR, 1, 1)
+    simulation_start_day = first_day + datetime.timedelta(days=SOWING_DOY - 2)
+    outputs = []
+    for u in range(units):
+        weather = converted[u % len(converted)]
+        numberOfDays = weather.shape[0]
+        drivingVariables = get_driving_variables(model, numberOfDays)
+        simulation_end_day = simulation_start_day + datetime.timedelta(days=numberOfDays)
+        for rm in runModes:
+            t0 = time.perf_counter()
+            status = engine.initialize(weather, WEATHER_COLUMNS, drivingVariables, parameters, first_day,
+                                       simulation_start_day, simulation_end_day)
+            t1 = time.perf_counter()
+            for d in range(numberOfDays):
+                status = engine.executeStep(status, rm)
+            t2 = time.perf_counter()
+            summary = engine.finalize(status, rm)
+            t3 = time.perf_counter()
+            measures['init_s'] += t1 - t0
+            measures['run_s'] += t2 - t1
+            measures['finalize_s'] += t3 - t2
+            measures['days'] += numberOfDays
+            outputs.append(summary[0] if summary else None)
+    return outputs
+
+
+def get_retained_statistics(before, after):
+    """Returns the statistics (tracemalloc.StatisticDiff, by line of the allocation, largest first) of the memory
+    blocks allocated between the two tracemalloc snapshots and still alive, excluding the blocks of tracemalloc and of
+    the import system"""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<unknown>'),
+               tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+               tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')]
+    before = before.filter_traces(filters)
+    after = after.filter_traces(filters)
+    return [stat for stat in after.compare_to(before, 'lineno') if stat.count_diff != 0 or stat.size_diff != 0]
+
+
+def run_case(workflow, weatherSource, weathers, units, memoryUnits, fusedSteps=False):
+    """Runs a benchmark case and returns its measures
+    :param workflow: name of the workflow (key of WORKFLOWS)
+    :param weatherSource: 'csv' or 'netcdf'
+    :param weathers: list of weather arrays of the source
+    :param units: number of units to run
+    :param memoryUnits: maximum number of units run with tracemalloc to measure the memory (0 to skip)
+    :param fusedSteps: value of the fused_steps property of the engine
+    :return: dictionary of measures
+    """
+    workflowFile, parametersFile, model = WORKFLOWS[workflow]
+    with open(os.path.join(BENCHMARKS_FOLDER, parametersFile)) as f:
+        parameters = json.load(f)
+
+    gc.collect()
+    t0 = time.perf_counter()
+    engine = ModelEngine(workflowFile)
+    load_s = time.perf_counter() - t0
+    engine.ReturnDailyDetails = False
+    engine.PrintDailyDetails = False
+    engine.fused_steps = fusedSteps
+
+    measures = {'init_s': 0.0, 'run_s': 0.0, 'finalize_s': 0.0, 'days': 0}
+    run_units(engine, model, parameters, weathers, units, measures)
+
+    result = {'workflow': workflow, 'weather': weatherSource, 'units': units,
+              'run_modes': len(engine.getRunModeNames()), 'days': measures['days'], 'load_s': load_s,
+              'init_s': measures['init_s'], 'run_s': measures['run_s'], 'finalize_s': measures['finalize_s'],
+              'total_s': load_s + measures['init_s'] + measures['run_s'] + measures['finalize_s'],
+              'days_per_second': measures['days'] / measures['run_s'] if measures['run_s'] > 0 else 0}
+
+    # the memory is measured in a separate pass, because tracemalloc slows down the execution
+    memoryUnits = min(units, memoryUnits)
+    if memoryUnits > 0:
+        del engine
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        engine = ModelEngine(workflowFile)
+        engine.ReturnDailyDetails = False
+        engine.PrintDailyDetails = False
+        engine.fused_steps = fusedSteps
+        outputs = run_units(engine, model, parameters, weathers, memoryUnits,
+                            {'init_s': 0.0, 'run_s': 0.0, 'finalize_s': 0.0, 'days': 0})
+        del engine, outputs
+        gc.collect()
+        result['memory_units'] = memoryUnits
+        result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        retained = get_retained_statistics(before, tracemalloc.take_snapshot())
+        tracemalloc.stop()
+        result['retained_blocks'] = sum(stat.count_diff for stat in retained)
+        result['retained_bytes'] = sum(stat.size_diff for stat in retained)
+        result['retained_sites'] = ['%s:%d: %+d blocks, %+d bytes' % (
+            os.path.normpath(stat.traceback[0].filename), stat.traceback[0].lineno, stat.count_diff, stat.size_diff)
+                                    for stat in retained[:RETAINED_SITES] if stat.count_diff != 0]
+    return result
+
+
+def run(args):
+    """Runs the benchmark cases selected by the command line arguments and saves the results in a JSON file"""
+    results = {'environment': {'ecrops_version': ecrops_version, 'python': platform.python_version(),
+                               'numpy': np.__version__, 'platform': platform.platform(),
+                               'processor': platform.processor(),
+                               'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                               'fused_steps': args.fused_steps},
+               'cases': [], 'skipped': []}
+
+    for weatherSource in args.weather:
+        if weatherSource == 'netcdf' and Dataset is None:
+            print('Skipping the netcdf weather: the netCDF4 package is not installed')
+            for workflow in args.workflows:
+                results['skipped'].append({'workflow': workflow, 'weather': weatherSource,
+                                           'reason': 'netCDF4 package not installed'})
+            continue
+        weathers = load_csv_weather() if weatherSource == 'csv' else load_netcdf_weather()
+        for workflow in args.workflows:
+            for units in args.units:
+                result = run_case(workflow, weatherSource, weathers, units, args.memory_units, args.fused_steps)
+                results['cases'].append(result)
+                print('%s %s %d units: init %.3f s, run %.3f s, finalize %.3f s, %.0f days/s, peak memory %s bytes' % (
+                    workflow, weatherSource, units, result['init_s'], result['run_s'], result['finalize_s'],
+                    result['days_per_second'], result.get('peak_memory_bytes', '-')))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print('Results saved to ' + args.output)
+
+
+def compare(args):
+    """Compares the results with a baseline, printing the relative change of every metric. Returns 1 if a metric
+    is worse than the baseline by more than the threshold, 0 otherwise"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        results = json.load(f)
+
+    baselineCases = {(c['workflow'], c['weather'], c['units']): c for c in baseline['cases']}
+    regressions = 0
+    for case in results['cases']:
+        key = (case['workflow'], case['weather'], case['units'])
+        if key not in baselineCases:
+            print('%s %s %d units: not in the baseline' % key)
+            continue
+        reference = baselineCases.pop(key)
+        for metric, greaterIsBetter in COMPARED_METRICS.items():
+            if metric not in case or metric not in reference or reference[metric] == 0:
+                continue
+            change = (case[metric] - reference[metric]) / reference[metric]
+            worse = -change if greaterIsBetter else change
+            flag = ''
+            if metric.endswith('_s') and abs(case[metric] - reference[metric]) < args.min_seconds:
+                # differences of few milliseconds are measurement noise
+                pass
+            elif worse > args.threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            elif worse < -args.threshold:
+                flag = '  improvement'
+            print('%s %s %d units: %s %.6g -> %.6g (%+.1f%%)%s' % (
+                key + (metric, reference[metric], case[metric], change * 100, flag)))
+    for key in baselineCases:
+        print('%s %s %d units: not in the results' % key)
+
+    print(str(regressions) + ' regression(s) over the threshold of ' + str(args.threshold * 100) + '%')
+    return 1 if regressions > 0 else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ecrops ModelEngine benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    runParser = subparsers.add_parser('run', help='run the benchmarks')
+    runParser.add_argument('--units', type=int, nargs='+', default=DEFAULT_UNITS, help='numbers of units to run')
+    runParser.add_argument('--workflows', nargs='+', default=list(WORKFLOWS.keys()), choices=list(WORKFLOWS.keys()),
+                           help='workflows to run')
+    runParser.add_argument('--weather', nargs='+', default=WEATHER_SOURCES, choices=WEATHER_SOURCES,
+                           help='weather sources')
+    runParser.add_argument('--memory-units', type=int, default=100,
+                           help='maximum number of units run with tracemalloc to measure the memory (0 to skip)')
+    runParser.add_argument('--fused-steps', action='store_true',
+                           help='run the steps with the functions generated by the engine (ModelEngine.fused_steps)')
+    runParser.add_argument('--output', default='results.json', help='JSON file of the results')
+
+    compareParser = subparsers.add_parser('compare', help='compare results with a baseline')
+    compareParser.add_argument('baseline', help='JSON file of the baseline results')
+    compareParser.add_argument('results', help='JSON file of the results to compare')
+    compareParser.add_argument('--threshold', type=float, default=0.1,
+                               help='relative worsening reported as a regression (0.1 = 10%%)')
+    compareParser.add_argument('--min-seconds', type=float, default=0.01,
+                               help='minimum difference of the times reported as a regression or improvement')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
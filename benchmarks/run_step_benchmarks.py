@@ -0,0 +1,180 @@
+"""
+Micro-benchmarks of the single ecrops steps.
+
+The script reuses the unit test datasets of the steps (the xml files in ecrops/unit_tests/wofost and
+ecrops/unit_tests/warm, see GenericEcropsStepUnitTest) to build the status of every test set and measures the methods
+setparameters, initialize, integrate and runstep of every step in isolation, calling them many times after some
+warm-up calls. The result is a table of the per-call costs, ranked from the most expensive step method.
+
+Usage (from any folder):
+
+    python run_step_benchmarks.py [--datasets wofost warm] [--steps ...] [--repeat 2000] [--warmup 200] [--output steps.json]
+
+See the "Benchmarks" section of ecrops/Manual.md for details.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# use the ecrops package of this repository if it is not installed
+if os.path.join(BENCHMARKS_FOLDER, '..', 'ecrops') not in sys.path:
+    sys.path.append(os.path.join(BENCHMARKS_FOLDER, '..', 'ecrops'))
+
+from ecrops import ModelEngine
+from ecrops.unit_tests.GenericEcropsStepUnitTest import read_test_sets, create_status, set_status_values
+
+UNIT_TESTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(sys.modules['ecrops'].__file__)), 'unit_tests')
+
+DEFAULT_DATASETS = ['wofost', 'warm']
+
+METHODS = ['setparameters', 'initialize', 'integrate', 'runstep']
+
+
+def prepare_test_sets(stepmodule, stepname, testsets):
+    """Creates a step instance and a status per test set, running setparameters and initialize as the unit tests do
+    :return: a list of tuples (step instance, status, inputs)
+    """
+    prepared = []
+    for parameters, inputs, outputs in testsets:
+        status = create_status(parameters)
+        stepInstance = ModelEngine.create_instance(stepmodule, stepname)
+        set_status_values(status, inputs)
+        status = stepInstance.setparameters(status)
+        status = stepInstance.initialize(status)
+        set_status_values(status, inputs)
+        prepared.append((stepInstance, status, inputs))
+    return prepared
+
+
+def time_method(prepared, method, repeat, warmup):
+    """Calls the method of the steps repeat times (after warmup calls that are not measured), using the test sets
+    in turn. The inputs of the test set are set again in the status before every call, outside the measure.
+    :return: the list of the durations of the calls, in nanoseconds
+    """
+    samples = []
+    for r in range(warmup + repeat):
+        stepInstance, status, inputs = prepared[r % len(prepared)]
+        function = getattr(stepInstance, method)
+        set_status_values(status, inputs)
+        t0 = time.perf_counter_ns()
+        function(status)
+        elapsed = time.perf_counter_ns() - t0
+        if r >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+def get_timer_overhead(repeat):
+    """Returns the median time (nanoseconds) measured around a call of a function doing nothing"""
+    def function(status):
+        return status
+    samples = []
+    for r in range(repeat):
+        t0 = time.perf_counter_ns()
+        function(None)
+        samples.append(time.perf_counter_ns() - t0)
+    return sorted(samples)[len(samples) // 2]
+
+
+def get_statistics(samples):
+    """Returns the statistics (microseconds) of the durations"""
+    samples = sorted(samples)
+    return {'calls': len(samples), 'mean_us': sum(samples) / len(samples) / 1e3,
+            'median_us': samples[len(samples) // 2] / 1e3,
+            'p90_us': samples[min(len(samples) - 1, (len(samples) * 90) // 100)] / 1e3,
+            'min_us': samples[0] / 1e3, 'max_us': samples[-1] / 1e3}
+
+
+def benchmark_dataset(xml_file, repeat, warmup):
+    """Measures the methods of the step of the dataset
+    :return: the list of the rows of the results, one per method
+    """
+    stepmodule, stepname, testsets = read_test_sets(xml_file)
+    prepared = prepare_test_sets(stepmodule, stepname, testsets)
+    rows = []
+    for method in METHODS:
+        row = {'step': stepname, 'module': stepmodule, 'method': method, 'test_sets': len(testsets),
+               'dataset': os.path.relpath(xml_file, UNIT_TESTS_FOLDER)}
+        try:
+            row.update(get_statistics(time_method(prepared, method, repeat, warmup)))
+        except Exception as e:
+            row['error'] = str(e)
+        rows.append(row)
+    return rows
+
+
+def get_dataset_files(datasets):
+    """Returns the xml files of the datasets: names of the folders in ecrops/unit_tests, folders or files"""
+    files = []
+    for dataset in datasets:
+        if os.path.isfile(dataset):
+            files.append(dataset)
+            continue
+        folder = dataset if os.path.isdir(dataset) else os.path.join(UNIT_TESTS_FOLDER, dataset)
+        files.extend(sorted(glob.glob(os.path.join(folder, '*.xml'))))
+    return files
+
+
+def print_table(rows, timerOverhead):
+    """Prints the rows ranked by mean time per call"""
+    print('Timer overhead (included in the times): %.3f us' % (timerOverhead / 1e3))
+    print('%4s  %-40s %-14s %10s %10s %10s %10s' % ('rank', 'step', 'method', 'mean us', 'median us', 'p90 us',
+                                                   'calls'))
+    for rank, row in enumerate(rows, 1):
+        print('%4d  %-40s %-14s %10.2f %10.2f %10.2f %10d' % (rank, row['step'], row['method'], row['mean_us'],
+                                                            row['median_us'], row['p90_us'], row['calls']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ecrops steps micro-benchmarks')
+    parser.add_argument('--datasets', nargs='+', default=DEFAULT_DATASETS,
+                        help='folders of ecrops/unit_tests (wofost, warm), other folders or xml files')
+    parser.add_argument('--steps', nargs='+', default=None, help='names of the steps to run (default all)')
+    parser.add_argument('--methods', nargs='+', default=METHODS, choices=METHODS, help='methods to show')
+    parser.add_argument('--repeat', type=int, default=2000, help='measured calls per method')
+    parser.add_argument('--warmup', type=int, default=200, help='calls per method before the measure')
+    parser.add_argument('--output', default=None, help='JSON file of the results')
+    args = parser.parse_args(argv)
+
+    rows = []
+    skipped = []
+    for xml_file in get_dataset_files(args.datasets):
+        try:
+            stepname = ET.parse(xml_file).getroot().attrib['Step']
+        except Exception as e:
+            print('Skipping dataset ' + xml_file + ': ' + str(e))
+            skipped.append({'dataset': xml_file, 'reason': str(e)})
+            continue
+        if args.steps is not None and stepname not in args.steps:
+            continue
+        try:
+            datasetRows = benchmark_dataset(xml_file, args.repeat, args.warmup)
+        except Exception as e:
+            print('Skipping dataset ' + xml_file + ': ' + str(e))
+            skipped.append({'dataset': xml_file, 'reason': str(e)})
+            continue
+        for row in datasetRows:
+            if 'error' in row:
+                print('Error in ' + row['step'] + '.' + row['method'] + ': ' + row['error'])
+        rows.extend(r for r in datasetRows if r['method'] in args.methods)
+
+    timerOverhead = get_timer_overhead(args.repeat)
+    measured = sorted((r for r in rows if 'error' not in r), key=lambda r: -r['mean_us'])
+    print_table(measured, timerOverhead)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'repeat': args.repeat, 'warmup': args.warmup, 'timer_overhead_us': timerOverhead / 1e3,
+                       'rows': measured + [r for r in rows if 'error' in r], 'skipped': skipped}, f, indent=1)
+        print('Results saved to ' + args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+""" Class BatchModelEngine, used to run a workflow on many simulation units at once with the array versions of the
+steps """
+import numbers
+import sys
+import traceback
+
+import numpy as np
+
+from ecrops.ModelEngine import ModelEngine, create_instance
+
+
+class BatchModelEngine(ModelEngine):
+    """
+    The BatchModelEngine class runs a workflow on many simulation units (e.g. the grid cells of a region) at once. The
+    units share the workflow, the driving variables and the simulation calendar (the days and the crop start day), while
+    the weather and the parameters can be different for every unit. Every variable of the status is a NumPy array with
+    one value per unit, so a day of all the units is computed by a single call of every step.
+
+    The steps of the workflow are replaced by their array versions, declared by the steps with the attribute
+    batch_step (see Step.batch_step): an exception is raised when the workflow is loaded if a step has no array
+    version. The array versions take the place of the branches of the scalar steps with masks on the status variables
+    (for example on the development stage), so every unit computes the same values of the scalar workflow.
+
+    Usage is the same of the ModelEngine, with the weather array of all the units:
+
+    - model = BatchModelEngine(config_file)
+    - status = model.initialize(timedependantvariables, timeDependantVariableColumn, drivingVariables, allparameters,
+      first_day, simulation_start_day, simulation_end_day): timedependantvariables is an array with shape (units,
+      days, columns), i.e. the weather arrays of the units stacked; the values of allparameters can be numbers or
+      arrays with one value per unit
+    - for each simulation cycle: status = model.executeStep(status, runMode)
+    - summary, dailyDetails = model.finalize(status, runMode): summary is an array with shape (units, output
+      variables), dailyDetails contains the lists DAY and DOY and, for every output variable, an array with shape
+      (days, units)
+
+    The run modes with aggregated output variables are not supported, as well as the properties PrintDailyDetails and
+    PrintDailyDetailsToFile. The daily details can be written to a DailyDetailsSink (one block of rows per unit).
+    """
+
+    def loadCompiledWorkflow(self, compiledWorkflow):
+        """
+        Populates the properties of the engine from a compiled workflow (see ModelEngine.loadCompiledWorkflow), then
+        replaces every step with its array version (see Step.batch_step). An exception is raised if a step has no
+        array version or if a run mode has aggregated output variables.
+
+        :param compiledWorkflow: the compiled workflow, an instance of CompiledWorkflow
+        """
+        ModelEngine.loadCompiledWorkflow(self, compiledWorkflow)
+        for wk in self.Workflows:
+            if wk.aggregatedOutputVariables is not None:
+                msg = 'The run mode ' + wk.name + ' has aggregated output variables, which are not supported by the ' \
+                                                  'BatchModelEngine'
+                print(msg)
+                raise Exception(msg)
+            missing = [s.__class__.__name__ for s in wk.steps if s.batch_step is None]
+            if len(missing) > 0:
+                msg = 'The steps ' + ', '.join(missing) + ' of the run mode ' + wk.name + \
+                      ' have no array version and cannot be run by the BatchModelEngine'
+                print(msg)
+                raise Exception(msg)
+            batchSteps = {}
+            for s in wk.steps:
+                moduleName, className = s.batch_step.split('|')
+                batchSteps[id(s)] = create_instance(moduleName, className)
+            wk.steps = [batchSteps[id(s)] for s in wk.steps]
+            if wk.precropSteps is not None:
+                wk.precropSteps = [batchSteps[id(s)] for s in wk.precropSteps]
+
+    def initialize(self, timedependantvariables, timeDependantVariableColumn, drivingVariables, allparameters,
+                   first_day, simulation_start_day, simulation_end_day):
+        """
+        Initializes the status of all the units (see ModelEngine.initialize). The weather array of the units
+        (timedependantvariables, shape (units, days, columns)) is rearranged with shape (days, columns, units), so that
+        status.weather.WeatherDataArray[day][column] is the contiguous array of the values of the units. The number
+        of units is saved in status.batch_size.
+
+        :returns: the status variable.
+        """
+        timedependantvariables = np.asarray(timedependantvariables, dtype=float)
+        if timedependantvariables.ndim != 3:
+            msg = 'The weather array of the BatchModelEngine must have shape (units, days, columns), found shape ' + \
+                  str(timedependantvariables.shape)
+            print(msg)
+            raise Exception(msg)
+        status = ModelEngine.initialize(self, np.ascontiguousarray(timedependantvariables.transpose(1, 2, 0)),
+                                        timeDependantVariableColumn, drivingVariables, allparameters, first_day,
+                                        simulation_start_day, simulation_end_day)
+        status.batch_size = timedependantvariables.shape[0]
+        return status
+
+    def getDailyOutputValue(self, oVar, status):
+        """
+        Returns the current values of an output variable (see ModelEngine.getDailyOutputValue): an array with one value
+        per unit, rounded to the 5th digit, or the value of the variable if it is not a number or an array.
+        """
+        value = ModelEngine.getDailyOutputValue(self, oVar, status)
+        if isinstance(value, np.ndarray):
+            return np.round(value, 5)
+        return value
+
+    def finalize(self, status, runMode, unit=None):
+        """
+        Returns the output variables of all the units calculated after the last time interval executed and the daily
+        details (see ModelEngine.finalize).
+
+        :param status: the status of the model
+        :param runMode: the current run mode
+        :param unit: optional list with the dictionary of the identifiers of every unit (e.g. {'X': x, 'Y': y}),
+        written to the DailyDetailsSink as columns of the daily details. The index of the unit is always written in
+        the column UNIT
+        :returns: a tuple containing two values: 1) the summary output array, with shape (units, output variables)
+        2) the daily details dictionary (None if ReturnDailyDetails and ReturnDekadalDetails are False): the lists DAY
+        and DOY and, for every output variable, an array with shape (days, units)
+        """
+        try:
+            if self.PrintDailyDetails or self.PrintDailyDetailsToFile:
+                raise Exception('PrintDailyDetails and PrintDailyDetailsToFile are not supported by the '
+                                'BatchModelEngine: use a DailyDetailsSink')
+            if self.debug_timing_mode and self.profiler is not None:
+                print(self.profiler.report())
+
+            outVariables = self.getOutputVariables(runMode)
+            if outVariables is None or len(outVariables) <= 0:
+                print(('No output variables read for run mode ' + runMode))
+                return None
+
+            units = status.batch_size
+            summary_output_array = np.zeros((units, len(outVariables)))
+            for i, oVar in enumerate(outVariables):
+                try:
+                    varValue = eval(oVar.source if oVar.code is None else oVar.code, globals(), {'status': status})
+                except Exception:
+                    # as in the ModelEngine, the variables not defined are 0
+                    continue
+                summary_output_array[:, i] = toUnitsArray(varValue, units)
+
+            dailyDetails = None
+            if hasattr(status, 'dailydetails'):
+                dailyDetails = {}
+                for name, values in status.dailydetails.items():
+                    if name in ('DAY', 'DOY'):
+                        dailyDetails[name] = values
+                    else:
+                        dailyDetails[name] = np.array([toUnitsArray(v, units) for v in values]).reshape(
+                            (len(values), units))
+
+            if self.DailyDetailsSink is not None and dailyDetails is not None:
+                # an error of the sink does not discard the outputs of the units
+                try:
+                    for u in range(units):
+                        unitIdentifiers = {'RUN_MODE': runMode, 'UNIT': u}
+                        if unit is not None:
+                            unitIdentifiers.update(unit[u])
+                        self.DailyDetailsSink.write(
+                            {name: values if name in ('DAY', 'DOY') else values[:, u].tolist() for name, values in
+                             dailyDetails.items()}, unitIdentifiers)
+                except Exception as exc:
+                    print(("\nError writing the daily details to the DailyDetailsSink :" + str(exc)))
+
+            return summary_output_array, dailyDetails if self.ReturnDailyDetails or self.ReturnDekadalDetails else None
+
+        except Exception as exc:
+            print(("\nError executing the BatchModelEngine finalize :" + str(exc)))
+            traceback.print_exc(limit=20, file=sys.stdout)
+            return None
+
+
+def toUnitsArray(value, units):
+    """Returns the value of a variable as an array of float with one value per unit: numbers are repeated for all the
+    units, None is NaN"""
+    if value is None:
+        return np.full(units, np.nan)
+    if isinstance(value, numbers.Number):
+        return np.full(units, float(value))
+    return np.broadcast_to(np.asarray(value, dtype=float), (units,))
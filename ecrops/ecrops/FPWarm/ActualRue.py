@@ -5,6 +5,9 @@ class ActualRue(Step):
     Actual Rue
     """
 
+    batch_step = 'ecrops.FPWarm.batch.ActualRue|ActualRue'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
@@ -6,6 +6,9 @@ class CO2EffectOnRue(Step):
     # European Journal of Agronomy, 18, 289-307
     """
 
+    batch_step = 'ecrops.FPWarm.batch.CO2EffectOnRue|CO2EffectOnRue'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
@@ -7,6 +7,9 @@ class ColdInducedSterilityWARM(Step):
     ColdInducedSterilityWARM
     """
 
+    batch_step = 'ecrops.FPWarm.batch.ColdInducedSterilityWARM|ColdInducedSterilityWARM'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
@@ -2,6 +2,9 @@ from ecrops.Step import Step
 class GrowingDegreesDaysTemperature(Step):
     """Growing Degrees Days Temperature"""
 
+    batch_step = 'ecrops.FPWarm.batch.GrowingDegreesDaysTemperature|GrowingDegreesDaysTemperature'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
@@ -7,6 +7,9 @@ class HeatInducedSterilityWARM(Step):
     HeatInducedSterilityWARM
     """
 
+    batch_step = 'ecrops.FPWarm.batch.HeatInducedSterilityWARM|HeatInducedSterilityWARM'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container,'WarmParameters'):
             from ecrops.Printable import Printable
@@ -9,6 +9,9 @@ class InterceptedAbsorbedRadiation(Step):
     für die Stoffproduktion. Japanese Journal of Botany, 14, 22 - 52
     """
 
+    batch_step = 'ecrops.FPWarm.batch.InterceptedAbsorbedRadiation|InterceptedAbsorbedRadiation'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
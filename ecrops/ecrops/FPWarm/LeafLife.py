@@ -10,6 +10,9 @@ from ecrops.FPWarm.GAIage import GAIage
 class LeafLife(Step):
     """Leaf Life duration """
 
+    batch_step = 'ecrops.FPWarm.batch.LeafLife|LeafLife'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
@@ -4,6 +4,10 @@ class PanicleHeight(Step):
     PANICLE HEIGHT. Reference: Confalonieri, R., Mariani, L., Bocchi, S., 2004. PREDA: a prototype of a rice cold damage early
     warning system at high latitudes. Proceedings of the International Rice Cold Tolerance Workshop, Canberra, Australia, 22-23 July 2004
     """
+
+    batch_step = 'ecrops.FPWarm.batch.PanicleHeight|PanicleHeight'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
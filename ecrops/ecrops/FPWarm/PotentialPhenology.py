@@ -33,6 +33,9 @@ class PotentialPhenology(Step):
     # Harvestable: 4.00
     """
 
+    batch_step = 'ecrops.FPWarm.batch.PotentialPhenology|PotentialPhenology'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
@@ -8,6 +8,10 @@ class PotentialTranspiration(Step):
     Potential crop water transpiration. Reference: Stockle, C.O., Donatelli, M., Nelson, R., 2003. CropSyst, a cropping systems simulation model.
     European Journal of Agronomy, 18, 289-307
     """
+
+    batch_step = 'ecrops.FPWarm.batch.PotentialTranspiration|PotentialTranspiration'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
@@ -5,6 +5,10 @@ class PotentialWaterUptake(Step):
     """
     Growing Degrees Days Temperature
     """
+
+    batch_step = 'ecrops.FPWarm.batch.PotentialWaterUptake|PotentialWaterUptake'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
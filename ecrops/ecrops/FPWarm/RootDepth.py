@@ -6,6 +6,10 @@ class RootDepth(Step):
     """
     Root Depth
     """
+
+    batch_step = 'ecrops.FPWarm.batch.RootDepth|RootDepth'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
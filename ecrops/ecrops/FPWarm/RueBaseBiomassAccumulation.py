@@ -4,6 +4,10 @@ class RueBaseBiomassAccumulation(Step):
     RUE based biomass accumulation. Reference: Monteith, J.L. 1977. Climate and the efficiency of crop production in Britain.
     Philos. Trans. R. Soc. London, Ser. B. Biol. Sci. 281:277-294
     """
+
+    batch_step = 'ecrops.FPWarm.batch.RueBaseBiomassAccumulation|RueBaseBiomassAccumulation'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
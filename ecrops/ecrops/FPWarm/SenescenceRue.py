@@ -5,6 +5,10 @@ class SenescenceRue(Step):
     # Reference: Confalonieri, R., Gusberti, D., Acutis, M., 2006. Comparison of WOFOST, CropSyst and WARM for
     # simulating rice growth (Japonica type – short cycle varieties). Italian Journal of Agrometeorology, 3, 7-16
     """
+
+    batch_step = 'ecrops.FPWarm.batch.SenescenceRue|SenescenceRue'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
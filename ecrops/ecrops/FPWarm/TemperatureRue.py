@@ -5,6 +5,10 @@ class TemperatureRue(Step):
     Reference: Yin, X., Kropff, M.J., McLaren, G., Visperas, R.M., 1995. A nonlinear model for crop development
     as a function of temperature. Agricultural and Forest Meteorology, 77, 1-16
     """
+
+    batch_step = 'ecrops.FPWarm.batch.TemperatureRue|TemperatureRue'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def setparameters(self, container):
         if not hasattr(container, 'WarmParameters'):
             from ecrops.Printable import Printable
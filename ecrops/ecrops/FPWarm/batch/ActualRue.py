@@ -0,0 +1,36 @@
+import numpy as np
+
+from ecrops.FPWarm import ActualRue as scalar
+
+
+class ActualRue(scalar.ActualRue):
+    """Array version of the Actual Rue step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.RUEActual = np.zeros(container.batch_size)
+        container.auxiliary.GrowthRatioCO2 = 1
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+        a = container.auxiliary
+
+        # the effects are multiplied in the order of the scalar step
+        rate = p.MaximumRadiationUseEfficiency
+        if container.UseSaturation == True:
+            rate = rate * r.RUESaturationEffectRate
+        if container.UseSenescence == True:
+            rate = rate * r.RUESenescenceEffectRate
+        if container.UseTemperature == True:
+            rate = rate * r.RUETemperatureEffectRate
+
+        dvs = s.DevelopmentStageCode
+        r.RUEActualRate = np.where((dvs >= 1) & (dvs <= 3), rate, 0.)
+
+        if (container.UseCO2 == True):
+            r.RUEActualRate = r.RUEActualRate * a.GrowthRatioCO2
+
+        s.RUEActual = s.RUEActual + r.RUEActualRate
+        return container
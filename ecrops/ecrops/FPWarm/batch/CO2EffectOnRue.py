@@ -0,0 +1,15 @@
+import numpy as np
+
+from ecrops.FPWarm import CO2EffectOnRue as scalar
+
+
+class CO2EffectOnRue(scalar.CO2EffectOnRue):
+    """Array version of the CO2 Effect on Rue step, run by the BatchModelEngine"""
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        a = container.auxiliary
+
+        a.GrowthRatioCO2 = np.where(np.asarray(p.IsC3) == 1, 0.0007 * container.Co2Concentration + 0.75,
+                                    0.0003 * container.Co2Concentration + 0.9)
+        return container
@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+
+from ecrops.FPWarm import ColdInducedSterilityWARM as scalar
+
+
+class ColdInducedSterilityWARM(scalar.ColdInducedSterilityWARM):
+    """Array version of the ColdInducedSterilityWARM step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        self.HighSensitivityForManyDays = True
+        container.states.ColdInducedSpikeletSterilityState = np.zeros(container.batch_size)
+        container.rates.ColdInducedSpikeletSterilityRate = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        dvs = s.DevelopmentStageCode
+        beforeFlowering = (dvs >= 1.6) & (dvs <= 1.9)
+        duringFlowering = (dvs > 1.9) & (dvs <= 2.1)
+        sensitive = beforeFlowering | duringFlowering
+        if sensitive.any():
+            ThresholdT = np.where(beforeFlowering, p.ThresholdTemperatureInducingSterilityBeforeFlowering,
+                                  p.ThresholdTemperatureInducingSterilityDuringFlowering)
+            Tavg = (container.weather.TEMP_MAX + container.weather.TEMP_MIN) / 2
+            DT = container.weather.TEMP_MAX - container.weather.TEMP_MIN
+            # Strategy to estimate hourly air temperature.  agronomy@isci.it, February 2008. Campbell, G.S. 1985. Soil physics with BASIC: transport models for soil-plant systems.
+            # HAT Campbell
+            DailyStress = 0
+            CampbellTimingVariation = 15
+            for j in range(24):
+                DailyStress = DailyStress + self.HourlySterilityFactor(
+                    Tavg + DT / 2 * math.cos(0.2618 * (j - CampbellTimingVariation)), ThresholdT)
+
+            DeltaBeforeFlowering = 0.125
+            DeltaDuringFlowering = 0.125 / 2.0
+            if (self.HighSensitivityForManyDays == True):
+                DeltaBeforeFlowering = DeltaBeforeFlowering * 1.5
+                DeltaDuringFlowering = DeltaDuringFlowering * 1.5
+            # DevelopmentStageCode exactly between panicle initiation and heading: 1.75 before flowering, 2 during
+            bell = np.where(beforeFlowering,
+                            self.BellFactor(dvs, 1.75, DeltaBeforeFlowering / 2.51, DeltaBeforeFlowering),
+                            self.BellFactor(dvs, 2.0, DeltaDuringFlowering / 2.51, DeltaDuringFlowering))
+            r.ColdInducedSpikeletSterilityRate = np.where(
+                sensitive, p.SensitivityToColdShockInducedSterility * DailyStress * bell / 100, 0.)
+        else:
+            r.ColdInducedSpikeletSterilityRate = np.zeros(container.batch_size)
+
+        s.ColdInducedSpikeletSterilityState = np.minimum(
+            s.ColdInducedSpikeletSterilityState + r.ColdInducedSpikeletSterilityRate, 1)
+        return container
+
+    def BellFactor(self, DVS, DVSmiddle, Sigma, Delta):
+        F1 = Delta / (Sigma * (math.pow((2 * math.pi), 0.5)))
+        expo = -(((DVS - DVSmiddle) ** 2) / (2 * (math.pow(Sigma, 2))))
+        F2 = np.exp(expo)
+        return np.where((DVS >= 1.6) & (DVS <= 2.1), F1 * F2, 0.)
+
+    def HourlySterilityFactor(self, Thour, ThresholdT):
+        return np.where(Thour > ThresholdT, 0., ThresholdT - Thour)
@@ -0,0 +1,27 @@
+import numpy as np
+
+from ecrops.FPWarm import GrowingDegreesDaysTemperature as scalar
+
+
+class GrowingDegreesDaysTemperature(scalar.GrowingDegreesDaysTemperature):
+    """Array version of the Growing Degrees Days Temperature step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.GrowingDegreeDaysTemperature = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        Tavg = container.weather.TEMP
+
+        r.GrowingDegreeDaysTemperatureRate = np.where(Tavg <= p.BaseTemperatureDevelopment, 0.,
+                                                      np.where(Tavg >= p.CutoffTemperatureDevelopment,
+                                                               p.CutoffTemperatureDevelopment -
+                                                               p.BaseTemperatureDevelopment,
+                                                               Tavg - p.BaseTemperatureDevelopment))
+
+        s.GrowingDegreeDaysTemperature = s.GrowingDegreeDaysTemperature + r.GrowingDegreeDaysTemperatureRate
+        return container
@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+
+from ecrops.FPWarm import HeatInducedSterilityWARM as scalar
+
+
+class HeatInducedSterilityWARM(scalar.HeatInducedSterilityWARM):
+    """Array version of the HeatInducedSterilityWARM step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        self.HighSensitivityForManyDays = True
+        container.states.HeatInducedSpikeletSterilityState = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        dvs = s.DevelopmentStageCode
+        sensitive = (dvs >= 1.9) & (dvs <= 2.1)
+        if sensitive.any():
+            Tavg = (container.weather.TEMP_MAX + container.weather.TEMP_MIN) / 2
+            DT = container.weather.TEMP_MAX - container.weather.TEMP_MIN
+            # Strategy to estimate hourly air temperature.  agronomy@isci.it, February 2008. Campbell, G.S. 1985. Soil physics with BASIC: transport models for soil-plant systems.
+            # HAT Campbell
+            DailyStress = 0
+            CampbellTimingVariation = 15
+            for j in range(24):
+                DailyStress = DailyStress + self.HourlySterilityFactor(
+                    Tavg + DT / 2 * math.cos(0.2618 * (j - CampbellTimingVariation)),
+                    p.ThresholdTemperatureInducingHeatSterility)
+            if (self.HighSensitivityForManyDays == False):
+                Delta = 0.06
+                Sigma = Delta / 2.5
+            else:
+                Delta = 0.125
+                Sigma = Delta / 2.5
+            DevelopmentStageCodeExactlyBetweenPanicleInitiationAndHeading = 2
+            r.HeatInducedSpikeletSterilityRate = np.where(
+                sensitive, p.SensitivityToHeatShockInducedSterility * DailyStress * self.BellFactor(
+                    dvs, DevelopmentStageCodeExactlyBetweenPanicleInitiationAndHeading, Sigma, Delta) / 100, 0.)
+        else:
+            r.HeatInducedSpikeletSterilityRate = np.zeros(container.batch_size)
+
+        s.HeatInducedSpikeletSterilityState = np.minimum(
+            s.HeatInducedSpikeletSterilityState + r.HeatInducedSpikeletSterilityRate, 1)
+        return container
+
+    def BellFactor(self, DVS, DVSmiddle, Sigma, Delta):
+        F1 = Delta / (Sigma * (math.pow((2 * math.pi), 0.5)))
+        expo = -(((DVS - DVSmiddle) ** 2) / (2 * (math.pow(Sigma, 2))))
+        F2 = np.exp(expo)
+        return np.where((DVS >= 1.9) & (DVS <= 2.1), F1 * F2, 0.)
+
+    def HourlySterilityFactor(self, Thour, ThresholdT):
+        return np.where(Thour < ThresholdT, 0., Thour - ThresholdT)
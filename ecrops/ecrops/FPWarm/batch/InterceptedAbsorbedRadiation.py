@@ -0,0 +1,39 @@
+import numpy as np
+
+from ecrops.FPWarm import InterceptedAbsorbedRadiation as scalar
+
+
+class InterceptedAbsorbedRadiation(scalar.InterceptedAbsorbedRadiation):
+    """Array version of the Intercepted absorbed radiation step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.InterceptedSolarRadiation = np.zeros(container.batch_size)
+        container.states.AbsorbedSolarRadiation = np.zeros(container.batch_size)
+        container.states.GreenLeafAreaIndex = np.zeros(container.batch_size)
+        container.states.TotalLeafAreaIndex = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        dvs = s.DevelopmentStageCode
+        # initalization of LAU at emergence
+        emerged = (dvs >= 1.00) & (s.TotalLeafAreaIndex == 0)
+        s.GreenLeafAreaIndex = np.where(emerged, 0.007, s.GreenLeafAreaIndex)
+        s.TotalLeafAreaIndex = np.where(emerged, 0.007, s.TotalLeafAreaIndex)
+
+        growing = (dvs > 1) & (dvs <= 4)
+        r.InterceptedSolarRadiationRate = np.where(growing, self.LambertBeerLaw(
+            p.ExtinctionCoefficientSolarRadiation, s.TotalLeafAreaIndex) * container.weather.IRRAD, 0.)
+        r.AbsorbedSolarRadiationRate = np.where(growing, self.LambertBeerLaw(
+            p.ExtinctionCoefficientSolarRadiation, s.GreenLeafAreaIndex) * container.weather.IRRAD, 0.)
+
+        s.InterceptedSolarRadiation = s.InterceptedSolarRadiation + r.InterceptedSolarRadiationRate
+        s.AbsorbedSolarRadiation = s.AbsorbedSolarRadiation + r.AbsorbedSolarRadiationRate
+        return container
+
+    def LambertBeerLaw(self, coeff, GLAI):
+        """Beer–Lambert law, empirically describing light intensity attenuation"""
+        return 1 - np.exp(-coeff * GLAI)
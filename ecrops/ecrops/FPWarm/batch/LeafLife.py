@@ -0,0 +1,129 @@
+import numpy as np
+
+from ecrops.FPWarm import LeafLife as scalar
+from ecrops.Printable import Printable
+
+INITIAL_CAPACITY = 64
+"""Initial number of daily green area units that can be kept for every simulation unit (the arrays grow when needed)"""
+
+
+class LeafLife(scalar.LeafLife):
+    """Array version of the Leaf Life duration step, run by the BatchModelEngine.
+
+    The daily green area units (the list of GAIage objects of the scalar step) are kept in the arrays of
+    status.states.LeafAreaIndexAge, with one row per simulation unit and one column per day of creation:
+    DailyGreenLeafAreaIndex, GrowingDegreeDaysAssociatedToGAIunits and Alive (False for the units killed and for the
+    ones with area not greater than 0, that never age and never contribute to the dead area). The columns from First
+    to Count are in use.
+
+    The scalar step sorts the list by the growing degree days (descending) and kills, starting from the oldest unit,
+    one every two units older than the leaf life (see LeafLife.LeavesAging). As the units with positive area age
+    together, the sorted list starts with the units having positive growing degree days in creation order, which are
+    the columns in use: the units killed are found by ranking these columns. The units with zero growing degree days
+    are killed by the scalar step only if the growing degree days of a day exceed the leaf life: this case is not
+    supported and raises an exception."""
+
+    def initialize(self, container):
+        ages = Printable()
+        ages.DailyGreenLeafAreaIndex = np.zeros((container.batch_size, INITIAL_CAPACITY))
+        ages.GrowingDegreeDaysAssociatedToGAIunits = np.zeros((container.batch_size, INITIAL_CAPACITY))
+        ages.Alive = np.zeros((container.batch_size, INITIAL_CAPACITY), dtype=bool)
+        ages.First = 0
+        ages.Count = 0
+        container.states.LeafAreaIndexAge = ages
+        # initialization of LAI
+        container.states.GreenLeafAreaIndex = np.zeros(container.batch_size)
+        container.states.TotalLeafAreaIndex = np.zeros(container.batch_size)
+        container.states.DeadLeafAreaIndex = np.zeros(container.batch_size)
+        container.rates.TotalLeafAreaIndexRate = np.zeros(container.batch_size)
+        container.rates.GreenLeafAreaIndexRate = np.zeros(container.batch_size)
+        container.rates.DeadLeafAreaIndexRate = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        leafLife = np.asarray(p.LeafLife, dtype=float)
+        if np.any(r.GrowingDegreeDaysRate > leafLife):
+            raise Exception('The batch LeafLife step does not support daily growing degree days greater than the leaf '
+                            'life (day ' + str(container.day) + ')')
+
+        ages = s.LeafAreaIndexAge
+        # aging of the existing units
+        first, count = ages.First, ages.Count
+        np.add(ages.GrowingDegreeDaysAssociatedToGAIunits[:, first:count], r.GrowingDegreeDaysRate[:, None],
+               out=ages.GrowingDegreeDaysAssociatedToGAIunits[:, first:count], where=ages.Alive[:, first:count])
+
+        # Add the new(today) GAI unit :
+        self.addUnit(ages, r.TotalLeafAreaIndexRate)
+
+        # Kill the GAI units older than the threshold:
+        DeadLAI = self.LeavesAging(ages, leafLife, r.GrowingDegreeDaysRate)
+        r.DeadLeafAreaIndexRate = DeadLAI
+
+        # Calculates other rates:
+        r.GreenLeafAreaIndexRate = r.TotalLeafAreaIndexRate - r.DeadLeafAreaIndexRate
+        s.DeadLeafAreaIndex = s.DeadLeafAreaIndex + r.DeadLeafAreaIndexRate
+        s.GreenLeafAreaIndex = np.where(s.GreenLeafAreaIndex == 0.03, 0., s.GreenLeafAreaIndex) + \
+                               r.GreenLeafAreaIndexRate
+
+        s.DeadLeafAreaIndex = np.maximum(s.DeadLeafAreaIndex, 0.)
+        s.GreenLeafAreaIndex = np.maximum(s.GreenLeafAreaIndex, 0.)
+        s.TotalLeafAreaIndex = np.maximum(s.TotalLeafAreaIndex, 0.)
+        return container
+
+    def addUnit(self, ages, dailyGreenLeafAreaIndex):
+        """Adds the green area units of the day (one column), moving the columns in use to the beginning of the arrays
+        or enlarging them when they are full"""
+        capacity = ages.Alive.shape[1]
+        if ages.Count == capacity:
+            first, count = ages.First, ages.Count
+            inUse = count - first
+            if inUse > capacity // 2:
+                capacity = capacity * 2
+            for name in ['DailyGreenLeafAreaIndex', 'GrowingDegreeDaysAssociatedToGAIunits', 'Alive']:
+                values = getattr(ages, name)
+                newValues = np.zeros((values.shape[0], capacity), dtype=values.dtype)
+                newValues[:, 0:inUse] = values[:, first:count]
+                setattr(ages, name, newValues)
+            ages.First = 0
+            ages.Count = inUse
+        column = ages.Count
+        ages.DailyGreenLeafAreaIndex[:, column] = dailyGreenLeafAreaIndex
+        ages.GrowingDegreeDaysAssociatedToGAIunits[:, column] = 0
+        ages.Alive[:, column] = dailyGreenLeafAreaIndex > 0.0
+        ages.Count = column + 1
+
+    def LeavesAging(self, ages, LeafDuration, GDDtoday):
+        """Leaves aging: kills the green area units as LeafLife.LeavesAging does on the sorted list, returning the dead
+        area of every simulation unit"""
+        first, count = ages.First, ages.Count
+        alive = ages.Alive[:, first:count]
+        gdd = ages.GrowingDegreeDaysAssociatedToGAIunits[:, first:count]
+        area = ages.DailyGreenLeafAreaIndex[:, first:count]
+
+        # position of the units in the sorted list, and number of units older than the threshold
+        ranked = alive & (gdd > 0)
+        position = np.cumsum(ranked, axis=1) - 1
+        if LeafDuration.ndim > 0:
+            LeafDuration = LeafDuration[:, None]
+        old = np.count_nonzero(ranked & (gdd + GDDtoday[:, None] > LeafDuration), axis=1)
+        # the scalar step skips one unit after every deletion
+        killed = ranked & (position < old[:, None]) & (position % 2 == 0)
+
+        # the dead area is summed in the order of the list
+        Dead = np.zeros(alive.shape[0])
+        rows = np.flatnonzero(killed.any(axis=1))
+        while len(rows) > 0:
+            columns = killed[rows].argmax(axis=1)
+            Dead[rows] = Dead[rows] + area[rows, columns]
+            killed[rows, columns] = False
+            alive[rows, columns] = False
+            rows = rows[killed[rows].any(axis=1)]
+
+        # the columns not in use any more are skipped
+        inUse = alive.any(axis=0)
+        ages.First = first + (int(inUse.argmax()) if inUse.any() else count - first)
+        return Dead
@@ -0,0 +1,23 @@
+import numpy as np
+
+from ecrops.FPWarm import PanicleHeight as scalar
+
+
+class PanicleHeight(scalar.PanicleHeight):
+    """Array version of the Panicle Height step, run by the BatchModelEngine"""
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+
+        dvs = s.DevelopmentStageCode
+        growing = (dvs >= 1.6) & (dvs <= 2)
+        # the height is calculated only for the units between panicle initiation and flowering (the power of a
+        # negative number would be NaN)
+        dvsC = np.where(growing, dvs, 1.6) - 1
+        F1 = (dvsC - 0.6) / (1 - 0.6)
+        F2 = (2 - dvsC) / 1
+        Expo = 1 / (1 - 0.6)
+        s.PanicleHeight = np.where(growing, ((F1 * (F2 ** Expo)) ** 5) * p.MaximumPanicleHeight,
+                                   np.where(dvs > 2, p.MaximumPanicleHeight, 0.))
+        return container
@@ -0,0 +1,51 @@
+import numpy as np
+
+from ecrops.FPWarm import PartitioningWarm as scalar
+
+
+class PartitioningWarm(scalar.PartitioningWarm):
+    """Array version of the Aboveground biomass partitioning step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.ColdInducedSpikeletSterilityState = np.zeros(container.batch_size)
+        container.states.HeatInducedSpikeletSterilityState = np.zeros(container.batch_size)
+        container.auxiliary.Sterility = np.zeros(container.batch_size)
+        container.states.LeavesBiomass = np.zeros(container.batch_size)
+        container.states.StemsBiomass = np.zeros(container.batch_size)
+        container.states.StorageOrgansBiomass = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+        a = container.auxiliary
+
+        r.LeavesBiomassRate = r.AbovegroundBiomassRate * self.PartitioningToLeaves(
+            p.PartitioningToLeavesAtEmergence, s.DevelopmentStageCode)
+
+        # put togheter cold and heat sterility  (1= max sterility, 0= no sterility)
+        a.Sterility = np.minimum(1, s.ColdInducedSpikeletSterilityState + s.HeatInducedSpikeletSterilityState)
+
+        r.StorageOrgansBiomassRate = r.AbovegroundBiomassRate * self.PartitioningToStorageOrgans(
+            s.DevelopmentStageCode) * (1 - a.Sterility)
+        r.StemsBiomassRate = r.AbovegroundBiomassRate - r.LeavesBiomassRate - r.StorageOrgansBiomassRate
+
+        s.LeavesBiomass = s.LeavesBiomass + r.LeavesBiomassRate
+        s.StemsBiomass = s.StemsBiomass + r.StemsBiomassRate
+        s.StorageOrgansBiomass = s.StorageOrgansBiomass + r.StorageOrgansBiomassRate
+        return container
+
+    def PartitioningToLeaves(self, RipL0, DVS):
+        """
+        Rate of biomass allocated to the leaves
+        """
+        result = np.where((DVS >= 1) & (DVS <= 2), -RipL0 * (DVS ** 2) + 2 * DVS * RipL0, 0.)
+        return np.minimum(np.maximum(result, 0.), 1.)
+
+    def PartitioningToStorageOrgans(self, DVS):
+        """
+        Rate of biomass allocated to the storage organs
+        """
+        result = np.where(DVS < 1.6, 0., np.where(DVS > 2.5, 1., -1.8751 * (DVS ** 2) + 9.1817 * DVS - 10.2121))
+        return np.minimum(np.maximum(result, 0.), 1.)
@@ -0,0 +1,67 @@
+import numpy as np
+
+from ecrops.FPWarm import PotentialPhenology as scalar
+
+
+class PotentialPhenology(scalar.PotentialPhenology):
+    """Array version of the WARM Phenology step, run by the BatchModelEngine. The development stage code of every unit
+    selects the phase of the unit"""
+
+    def initialize(self, container):
+        container.states.DevelopmentStageCode = np.zeros(container.batch_size)
+        container.states.GrowingDegreeDays = np.zeros(container.batch_size)
+        container.states.DOS = None
+        container.rates.GrowingDegreeDaysRate = np.zeros(container.batch_size)
+        container.auxiliary.VernalizationFactor = 1
+        container.auxiliary.PhotoPeriodFactor = 1
+        return container
+
+    def integrate(self, container):
+        s = container.states  # states
+        p = container.WarmParameters  # parameters
+
+        emergence = p.GrowingDegreeDaysToReachEmergence
+        flowering = p.GrowingDegreeDaysToReachFlowering + p.GrowingDegreeDaysToReachEmergence
+        maturity = p.GrowingDegreeDaysToReachEmergence + p.GrowingDegreeDaysToReachFlowering + \
+                   p.GrowingDegreeDaysToReachMaturity
+        gdd = s.GrowingDegreeDays
+        s.DevelopmentStageCode = np.select(
+            [gdd < emergence, gdd < flowering, gdd < maturity],
+            [gdd / p.GrowingDegreeDaysToReachEmergence,  # sowing - emergence
+             1 + ((gdd - p.GrowingDegreeDaysToReachEmergence) / p.GrowingDegreeDaysToReachFlowering),  # emergence - flowering
+             2 + ((gdd - p.GrowingDegreeDaysToReachEmergence - p.GrowingDegreeDaysToReachFlowering) /
+                  p.GrowingDegreeDaysToReachMaturity)],  # flowering - maturity
+            3 + ((gdd - p.GrowingDegreeDaysToReachEmergence - p.GrowingDegreeDaysToReachFlowering -
+                  p.GrowingDegreeDaysToReachMaturity) / p.GrowingDegreeDaysToReachHarvest))  # maturity - harvest
+        return container
+
+    def runstep(self, container):
+        s = container.states  # states
+        a = container.auxiliary
+        r = container.rates  # rates
+
+        # at sowing
+        if container.day == container.sowing_emergence_day:
+            s.DOS = container.day
+        # before sowing and emergence
+        if s.DOS is None:
+            return container
+
+        # emergence - flowering
+        if container.UsePhotoPeriod == False and container.UseVernalization == False:  # no  photoperiod;  no vernalization
+            vegetativeRate = r.GrowingDegreeDaysTemperatureRate
+        elif container.UsePhotoPeriod == False and container.UseVernalization == True:  # no photoperiod; yes vernalization
+            vegetativeRate = r.GrowingDegreeDaysTemperatureRate * a.VernalizationFactor
+        elif container.UsePhotoPeriod == True and container.UseVernalization == False:  # yes photoperiod; no vernalization
+            vegetativeRate = r.GrowingDegreeDaysTemperatureRate * a.PhotoPeriodFactor
+        else:  # yes photoperiod; yes vernalization
+            vegetativeRate = r.GrowingDegreeDaysTemperatureRate * a.PhotoPeriodFactor * a.VernalizationFactor
+
+        dvs = s.DevelopmentStageCode
+        r.GrowingDegreeDaysRate = np.select(
+            [(dvs >= 0) & (dvs < 1), (dvs >= 1) & (dvs < 2), (dvs >= 2) & (dvs < 4), dvs >= 4],
+            [r.GrowingDegreeDaysTemperatureRate, vegetativeRate, r.GrowingDegreeDaysTemperatureRate, 0.],
+            r.GrowingDegreeDaysRate)
+
+        s.GrowingDegreeDays = s.GrowingDegreeDays + r.GrowingDegreeDaysRate
+        return container
@@ -0,0 +1,39 @@
+import numpy as np
+
+from ecrops.FPWarm import PotentialTranspiration as scalar
+from ecrops.Printable import Printable
+
+
+class PotentialTranspiration(scalar.PotentialTranspiration):
+    """Array version of the Potential crop water transpiration step, run by the BatchModelEngine. The copy of the
+    states made every day by the scalar step (status.States, not used by the other steps) is not made"""
+
+    def initialize(self, container):
+        if not hasattr(container, 'auxiliary'):
+            container.auxiliary = Printable()
+        container.auxiliary.DayOfPhysiologicalMaturity = 0
+        container.states.Transpiration = np.zeros(container.batch_size)
+        container.rates.TranspirationRate = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+        a = container.auxiliary
+
+        dvs = s.DevelopmentStageCode
+        glai = s.GreenLeafAreaIndex
+        _kc = np.where((glai < 3) & ((1 + (p.FullCanopyCoefficient - 1) * glai) > 0),
+                       1 + (p.FullCanopyCoefficient - 1) * glai / 3, p.FullCanopyCoefficient)
+        _TranspirationPotentialRate = _kc * container.weather.ET0 * self.LambertBeerLaw(
+            p.ExtinctionCoefficientSolarRadiation, glai)
+        r.TranspirationRate = np.where((dvs >= 1) & (dvs <= 3) & (np.asarray(a.DayOfPhysiologicalMaturity) <= 1),
+                                       np.minimum(_TranspirationPotentialRate, r.WaterUptakeRate), 0.)
+
+        s.Transpiration = s.Transpiration + r.TranspirationRate
+        return container
+
+    def LambertBeerLaw(self, coeff, GLAI):
+        """LambertBeerLaw: empirically describing light intensity attenuation"""
+        return 1 - np.exp(-coeff * GLAI)
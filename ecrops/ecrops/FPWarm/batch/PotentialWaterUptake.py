@@ -0,0 +1,26 @@
+import numpy as np
+
+from ecrops.FPWarm import PotentialWaterUptake as scalar
+
+
+class PotentialWaterUptake(scalar.PotentialWaterUptake):
+    """Array version of the Potential Water Uptake step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.WaterUptake = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        emerged = s.DevelopmentStageCode > 1
+        r.WaterUptakeRate = np.where(emerged, p.FullCanopyWaterUptakeMaximum * self.LambertBeerLaw(
+            p.ExtinctionCoefficientSolarRadiation, s.GreenLeafAreaIndex), 0.)
+        s.WaterUptake = np.where(emerged, s.WaterUptake, 0.) + r.WaterUptakeRate
+        return container
+
+    def LambertBeerLaw(self, coeff, GLAI):
+        """LambertBeerLaw: empirically describing light intensity attenuation"""
+        return 1 - np.exp(-coeff * GLAI)
@@ -0,0 +1,15 @@
+import numpy as np
+
+from ecrops.FPWarm import RootDepth as scalar
+
+
+class RootDepth(scalar.RootDepth):
+    """Array version of the Root Depth step, run by the BatchModelEngine"""
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+
+        s.RootDepth = np.minimum(p.MaximumRootingDepth * np.log(s.DevelopmentStageCode + 1),  # log base e
+                                 p.MaximumRootingDepth)
+        return container
@@ -0,0 +1,28 @@
+import numpy as np
+
+from ecrops.FPWarm import RueBaseBiomassAccumulation as scalar
+
+
+class RueBaseBiomassAccumulation(scalar.RueBaseBiomassAccumulation):
+    """Array version of the RUE based biomass accumulation step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.BiomassRadiationDependent = np.zeros(container.batch_size)
+        container.states.AbovegroundBiomass = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        dvs = s.DevelopmentStageCode
+        # 10 transforms g m - 2 to kg  ha - 1
+        r.BiomassRadiationDependentRate = np.where((dvs >= 0) & (dvs <= 3), r.RUEActualRate *
+                                                   p.PARtoGlobalRadiationFactor * r.AbsorbedSolarRadiationRate * 10,
+                                                   0.)
+        r.AbovegroundBiomassRate = r.BiomassRadiationDependentRate
+
+        s.BiomassRadiationDependent = s.BiomassRadiationDependent + r.BiomassRadiationDependentRate
+        s.AbovegroundBiomass = s.AbovegroundBiomass + r.AbovegroundBiomassRate
+        return container
@@ -0,0 +1,23 @@
+import numpy as np
+
+from ecrops.FPWarm import SaturationRue as scalar
+
+
+class SaturationRue(scalar.SaturationRue):
+    """Array version of the Saturation Rue step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.RUESaturationEffect = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        # Saturation of the enzymatic chains effect on radiation use efficiency.
+        r.RUESaturationEffectRate = np.where(container.weather.IRRAD >= p.ThresholdRadiationForSaturation,
+                                             2 - 0.04 * container.weather.IRRAD, 1.)
+
+        s.RUESaturationEffect = s.RUESaturationEffect + r.RUESaturationEffectRate
+        return container
@@ -0,0 +1,21 @@
+import numpy as np
+
+from ecrops.FPWarm import SenescenceRue as scalar
+
+
+class SenescenceRue(scalar.SenescenceRue):
+    """Array version of the Senescence Rue step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.RUESenescenceEffect = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        s = container.states  # states
+        r = container.rates  # rates
+
+        dvs = s.DevelopmentStageCode
+        r.RUESenescenceEffectRate = np.where((dvs > 2) & (dvs <= 3), 1.5 - 0.25 * dvs, 1.)
+
+        s.RUESenescenceEffect = s.RUESenescenceEffect + r.RUESenescenceEffectRate
+        return container
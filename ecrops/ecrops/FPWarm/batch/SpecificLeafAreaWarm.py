@@ -0,0 +1,39 @@
+import numpy as np
+
+from ecrops.FPWarm import SpecificLeafAreaWarm as scalar
+
+
+class SpecificLeafAreaWarm(scalar.SpecificLeafAreaWarm):
+    """Array version of the Specific leaf area step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.SpecificLeafArea = np.zeros(container.batch_size)
+        container.rates.TotalLeafAreaIndexRate = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        dvs = s.DevelopmentStageCode
+        # out of the phase the values of the previous day are kept
+        growing = (dvs >= 1) & (dvs < 3)
+        s.SpecificLeafArea = np.where(growing, self.SLAfromDVS(dvs, p.SpecificLeafAreaAtTillering,
+                                                               p.SpecificLeafAreaAtEmergence) * 1000,
+                                      s.SpecificLeafArea)
+        r.TotalLeafAreaIndexRate = np.where(growing, r.LeavesBiomassRate / 10 * (s.SpecificLeafArea / 1000),
+                                            r.TotalLeafAreaIndexRate)
+        s.TotalLeafAreaIndex = np.where(growing, np.where(s.TotalLeafAreaIndex == 0.03, 0., s.TotalLeafAreaIndex) +
+                                        r.TotalLeafAreaIndexRate, s.TotalLeafAreaIndex)
+        return container
+
+    def SLAfromDVS(self, DVS, SpecificLeafAreaAtTillering, SpecificLeafAreaAtEmergence):
+        """
+        Specific Lead Area estimation from the Developement stage
+        """
+        result = np.select([(DVS >= 1) & (DVS <= 1.35), (DVS > 1.35) & (DVS <= 3)],
+                           [((SpecificLeafAreaAtTillering - SpecificLeafAreaAtEmergence) / 0.1225) *
+                            ((DVS - 1) ** 2) + SpecificLeafAreaAtEmergence,
+                            np.broadcast_to(SpecificLeafAreaAtTillering, np.shape(DVS))], 0.)
+        return result / 1000
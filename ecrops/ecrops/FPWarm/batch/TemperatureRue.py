@@ -0,0 +1,30 @@
+import numpy as np
+
+from ecrops.FPWarm import TemperatureRue as scalar
+
+
+class TemperatureRue(scalar.TemperatureRue):
+    """Array version of the Temperature Rue step, run by the BatchModelEngine"""
+
+    def initialize(self, container):
+        container.states.RUETemperatureEffect = np.zeros(container.batch_size)
+        return container
+
+    def runstep(self, container):
+        p = container.WarmParameters  # parameters
+        s = container.states  # states
+        r = container.rates  # rates
+
+        Tavg = np.minimum(container.weather.TEMP, p.OptimumTemperatureForGrowth)
+
+        Espo = (p.MaximumTemperatureForGrowth - p.OptimumTemperatureForGrowth) / \
+               (p.OptimumTemperatureForGrowth - p.BaseTemperatureForGrowth)
+        FirstFactor = np.maximum((Tavg - p.BaseTemperatureForGrowth) /
+                                 (p.OptimumTemperatureForGrowth - p.BaseTemperatureForGrowth), 0.)
+        SecondFactor = np.maximum((p.MaximumTemperatureForGrowth - Tavg) /
+                                  (p.MaximumTemperatureForGrowth - p.OptimumTemperatureForGrowth), 0.)
+
+        r.RUETemperatureEffectRate = (FirstFactor * (SecondFactor ** Espo)) ** p.BetaFunctionCShapeParameter
+
+        s.RUETemperatureEffect = s.RUETemperatureEffect + r.RUETemperatureEffectRate
+        return container
@@ -0,0 +1 @@
+"""This sub package contain the array versions of the WARM model steps, run by the BatchModelEngine"""
\ No newline at end of file
@@ -1,7 +1,10 @@
 """ Class ModelEngine and its utility classes """
-import calendar
+import hashlib
 import importlib
+import importlib.util
 import json
+import marshal
+import os
 import sys
 import traceback
 from datetime import timedelta
@@ -13,6 +16,11 @@ import pickle
 from ecrops import Step
 from ecrops.ModelWorkflowReader import ModelWorkflowReader
 from ecrops.Printable import Printable
+from ecrops.SimulationCalendar import SimulationCalendar, ModelStatus, toModelStatus
+from ecrops.OutputAggregator import OutputAggregator, AGGREGATES, PERIODS
+from ecrops.StatusAliases import apply_aliases, check_alias
+from ecrops.StepProfiler import StepProfiler
+from ecrops.WeatherConversions import WeatherConversionStage
 import time
 import csv
 import numbers
@@ -78,9 +86,17 @@ class ModelEngine:
     initVariables = None
     """ Variable initialization configuration """
 
+    initFunction = None
+    """ Function that executes all the instructions of the Init section, compiled when the workflow is loaded. It is 
+    None if the Init section is missing or cannot be compiled: in this case the instructions are executed one by one"""
+
     drivingVariables = None
     """ Driving variables declaration configuration """
 
+    weatherConversions = None
+    """ Conversions of the units of measure of the weather data declared in the WeatherConversions section (a
+    WeatherConversionStage, see convertWeather), None if the section is missing """
+
     PrintDailyDetails = False
     """boolean property used to trigger the print to console of the daily status variables. Set it to true to print 
     the daily values of all the output columns (defined in the configuration file) """
@@ -103,25 +119,58 @@ class ModelEngine:
     PrintDailyDetails_OutputFile = "output.csv"
     """"Name of the output file to print the daily status variables."""
 
-    def __init__(self, configuration, file_mode=True):
+    DailyDetailsSink = None
+    """OutputSink object (see OutputSinks) receiving the daily details of every unit in the finalize method. The sink
+    buffers the rows and writes them in blocks to CSV, Parquet or NetCDF files (one file for all the run modes having
+    the same output variables), so it can be shared by all the units and the engines of a process. If None (default),
+    the daily details are not written to a sink"""
+
+    def __init__(self, configuration, file_mode=True, use_cache=True, persist_compiled=False):
         """Constructor: if file_mode is True (default): sets the 'configuration' argument as the path of the workflow
         configuration file, reads the file and populates the properties Workflows, drivingVariables and
         initVariables. If file_mode is False, the 'configuration' string contains the content of the configuration file
 
+        If use_cache is True (default), the parsed and compiled workflow is taken from the process-level cache of
+        compiled workflows (see get_compiled_workflow), so that the XML is parsed only once per process for the same
+        content. The step instances are always created new for every ModelEngine instance.
+        If persist_compiled is True (and file_mode is True), the compiled workflow is also saved next to the XML file
+        (same path plus '.compiled' extension) and reused by the next processes while the XML file is not changed.
         """
         self.file_mode = file_mode #True if the XML file is provided, False if the XML content string is provided
-        if file_mode:
-            self.XmlWorkflowConfig = configuration
+        self._dayFunctions = {}  # functions generated by getDayFunction
+        self._activityWindows = {}  # activity windows of the lists of steps, see getActivityWindows
+        self.XmlWorkflowConfig = configuration
+        if use_cache:
+            self.loadCompiledWorkflow(get_compiled_workflow(configuration, file_mode, persist_compiled))
+        elif file_mode:
             self.readWorkflowConfigurationFromXMLFile()
         else:
-            self.XmlWorkflowConfig = configuration
             self.readWorkflowConfigurationFromXMLString()
         d = datetime.datetime(1999, 1, 1)  # do not remove!
 
-    debug_timing_mode = False  # set to true to enable component time tracing
-    debug_timing_runstep_time = {}
-    debug_timing_initialize_time = {}
-    debug_timing_integrate_time = {}
+    debug_timing_mode = False
+    """Set to true to enable component time tracing: a StepProfiler is attached to the engine (if the profiler property 
+    is not set) and its report is printed by the finalize method"""
+
+    profiler = None
+    """StepProfiler object that records the execution times of the steps (see StepProfiler). If None (default), 
+    the steps are run without any measurement"""
+
+    recorder = None
+    """StepRecorder object that records the inputs and outputs of the integrate and runstep calls of the steps (see 
+    StepRecorder). If None (default), nothing is recorded"""
+
+    fused_steps = False
+    """Set to true to integrate and run the steps of every day with a single function generated for the steps of the 
+    day (see build_day_function): the function calls the methods of the steps in order, pre-bound and stored in local 
+    variables, and skips the methods that do nothing. The functions are generated at the first use and cached in the 
+    engine. They are not used when a profiler or a recorder is attached"""
+
+    activity_windows = True
+    """If true (default), the runstep method of the steps declaring an activity window (see Step.activity_window) is
+    called only in the days of the window. The windows are evaluated once per day, when the runstep method of the
+    first step with a window is about to be called (so after the steps computing the crop phase dates, e.g. the
+    phenology). Set it to false to call the runstep method of all the steps every day"""
 
     def createModelGraph(self, runMode, graphbuilders=[TextualGraphBuilder()]):
         """
@@ -193,6 +242,23 @@ class ModelEngine:
         allTheParameters = self.getParametersList()
         return json.dumps(allTheParameters)
 
+    def convertWeather(self, timedependantvariables, timeDependantVariableColumn, copy=False):
+        """
+        Converts the units of measure of the weather data as declared in the WeatherConversions section of the
+        workflow, with numpy on the whole array (see WeatherConversions.WeatherConversionStage). The conversion should
+        be applied once to the weather of all the units (e.g. the array of a grid or of a tile), before taking the
+        weather of the single units passed to the initialize method. The conversions applied are recorded on the
+        memory of the array, so converting it again (or one of its views) does nothing.
+
+        :param timedependantvariables: the weather array, with the variables on the last axis
+        :param timeDependantVariableColumn: the position of the variables in the array
+        :param copy: if False (default) the values are converted in place, otherwise a converted copy is returned
+        :returns: the converted array, or the array unchanged if the workflow has no WeatherConversions section
+        """
+        if self.weatherConversions is None:
+            return timedependantvariables
+        return self.weatherConversions.apply(timedependantvariables, timeDependantVariableColumn, copy)
+
     def initialize(self, timedependantvariables, timeDependantVariableColumn, drivingVariables, allparameters,
                    first_day, simulation_start_day,
                    simulation_end_day):
@@ -230,11 +296,13 @@ class ModelEngine:
         :returns: the status variable.
         """
 
-        status = Printable()
+        status = ModelStatus()
         status.rates = Printable()
         status.states = Printable()
         status.model_initialized = False
-        status.day = first_day
+        # the time axis is the integer day index on the calendar of the simulation window: status.day is derived
+        status.calendar = SimulationCalendar(first_day, simulation_end_day)
+        status.day_index = 0
         status.doy = first_day
         status.first_day = first_day
         status.simulation_start_day = simulation_start_day
@@ -249,38 +317,26 @@ class ModelEngine:
                     traceback.print_exc(limit=20, file=sys.stdout)
                     raise Exception(msg)
 
+        if self.initFunction is not None:
+            # run all the instructions of the Init section, compiled in a single function at the workflow loading
+            try:
+                self.initFunction(status, timedependantvariables, timeDependantVariableColumn, drivingVariables,
+                                  allparameters, first_day, simulation_start_day, simulation_end_day)
+            except Exception as exc:
+                iVar = self.initVariables[get_failing_init_variable_index(exc)]
+                print(("\nError executing the ModelEngine initialization. Error initializing variable '" + iVar.name +
+                       "' with source '" + iVar.source + "' . Error:" + str(exc)))
+                traceback.print_exc(limit=20, file=sys.stdout)
+            return status
+
         command = None
         try:
-            # year = int(drivingVariables['YEAR'])
             for iVar in self.initVariables:
                 # execute a line code that will define a new variable
                 command = 'status.' + iVar.name + " = " + iVar.source.replace('&gt;', '>').replace('&lt;', '<')
-                exec(command)
+                # use the code compiled at the workflow loading, if available
+                exec(command if iVar.code is None else iVar.code)
 
-        except ValueError as exc:
-            print((
-                    "\nError executing the ModelEngine initialization. Error executing command '" + command + "' . "
-                                                                                                              "Error:" + str(
-                exc)))
-            traceback.print_exc(limit=20, file=sys.stdout)
-        except TypeError as exc:
-            print((
-                    "\nError executing the ModelEngine initialization. Error executing command '" + command + "' . "
-                                                                                                              "Error:" + str(
-                exc)))
-            traceback.print_exc(limit=20, file=sys.stdout)
-        except KeyError as exc:
-            print((
-                    "\nError executing the ModelEngine initialization. Error executing command '" + command + "' . "
-                                                                                                              "Error:" + str(
-                exc)))
-            traceback.print_exc(limit=20, file=sys.stdout)
-        except IndexError as exc:
-            print((
-                    "\nError executing the ModelEngine initialization. Error executing command '" + command + "' . "
-                                                                                                              "Error:" + str(
-                exc)))
-            traceback.print_exc(limit=20, file=sys.stdout)
         except Exception as exc:
             print((
                     "\nError executing the ModelEngine initialization. Error executing command '" + command + "' . "
@@ -294,7 +350,8 @@ class ModelEngine:
         """
         Runs all steps for specific run mode, in the defined order, for every value of status.day property when
         status.simulation_start_day <= status.day <= status.simulation_end_day.
-        status.day is incremented by 1 day at the end of the method.
+        status.day is incremented by 1 day at the end of the method (the engine increments status.day_index, the index
+        of the day in the calendar of the simulation, see SimulationCalendar).
         For every step, the “status” variable is set as an input of the step, is updated by the step and returned to the engine.
 
         Arguments:
@@ -307,126 +364,42 @@ class ModelEngine:
 
         """
         try:
+            if type(status) is not ModelStatus:
+                status = toModelStatus(status)
             components = self.getSteps2Run(runMode)
 
+            # steps to integrate and run today: before the crop start event only the pre-crop steps, if declared
+            dailyComponents = self.getDailySteps2Run(status, runMode)
+            if self.debug_timing_mode and self.profiler is None:
+                self.profiler = StepProfiler()
+            profiler = self.profiler
+            if profiler is not None:
+                profilerToken = profiler.start()
+
             # only the first day
             if status.simulation_start_day == status.day:
-                for c in components:
-                    c.setparameters(status)
-                    status.model_initialized = True
-                    if self.debug_timing_mode:
-                        self.debug_timing_initialize_time[str(c.__class__.__name__)] = 0
-                        self.debug_timing_integrate_time[str(c.__class__.__name__)] = 0
-                        self.debug_timing_runstep_time[str(c.__class__.__name__)] = 0
-                for c in components:
-                    if self.debug_timing_mode:
-                        starttimeinitialize = time.time()
-                    status = c.initialize(status)
-                    if self.debug_timing_mode:
-                        self.debug_timing_initialize_time[
-                            str(c.__class__.__name__)] += time.time() - starttimeinitialize
+                status = self.initializeSteps(status, components, runMode)
+
+            if profiler is not None:
+                profiler.phase = 'pre-crop' if dailyComponents is not components else 'crop'
 
             # run steps from start to end day
             if status.simulation_start_day <= status.day <= status.simulation_end_day:
-                for c in components:
+                if self.fused_steps and profiler is None and self.recorder is None:
+                    # at start day execute only the run step, without integration
+                    status = self.getDayFunction(dailyComponents, status.simulation_start_day != status.day)(status)
+                else:
                     if status.simulation_start_day != status.day:  # at start day execute only the run step, without integration
-                        if self.debug_timing_mode:
-                            starttimeintegratte = time.time()
-                        if status.model_initialized == False:
-                            raise Exception('model was not initialized. Please check the model start conditions')
-                        status = c.integrate(status)
-                        if self.debug_timing_mode:
-                            self.debug_timing_integrate_time[
-                                str(c.__class__.__name__)] += time.time() - starttimeintegratte
+                        status = self.integrateSteps(status, dailyComponents, runMode)
+                    status = self.runSteps(status, dailyComponents, runMode)
 
-                for c in components:
-                    if self.debug_timing_mode:
-                        starttimerunstep = time.time()
-                    status = c.runstep(status)
-                    if self.debug_timing_mode:
-                        self.debug_timing_runstep_time[str(c.__class__.__name__)] += time.time() - starttimerunstep
-
-            # if flags ReturnDailyDetails or ReturnDekadalDetails or PrintDailyDetails are set to true, at the first day initialize the structure to contain the daily values (status.dailydetails)
-            if (
-                    self.ReturnDailyDetails or self.ReturnDekadalDetails or self.PrintDailyDetails or self.PrintDailyDetailsToFile) and status.first_day == status.day:
-
-                if hasattr(status, 'dailydetails') == False:
-                    status.dailydetails = {}
-
-                # in the dailydetails, always add DAY and DOY column and then all the output columns defined in the configuration file
-                for col in ['DAY', 'DOY'] + self.getOutputVariablesNames(runMode):
-                    # initialize each column as an empy list. The list will contain a value for each day
-                    status.dailydetails[col] = []
-
-            # if flags ReturnDailyDetails or ReturnDekadalDetails or PrintDailyDetails are set to true, at the end of the daily step collect the ouput variables values
-            # into the status.dailydetails dictionary (besides the output variables, add always also columns DAY (=complete date) and DOY (=julian day) )
-            # in case of ReturnDekadalDetails, this is done only for the days that respect the Dekadal calendar, returned by method id_dekadal_day
-            if (self.ReturnDailyDetails or (self.ReturnDekadalDetails and self.id_dekadal_day(
-                    status.day)) or self.PrintDailyDetails or self.PrintDailyDetailsToFile) and status.first_day <= status.day and status.day <= status.simulation_end_day:
-
-                # in the dailydetails, always add DAY and DOY column
-                status.dailydetails['DAY'].append(status.day)
-                status.dailydetails['DOY'].append(status.day.timetuple().tm_yday)
-
-                # in the daily details, add all the output columns defined in the configuration file
-                # retrieve the output variables for the specific runMode
-                outVariables = self.getOutputVariables(runMode)
-                i = 0
-
-                # for each output column
-                for oVar in outVariables:
-                    # check if all variables levels are valid and if contains the elements
-                    varParts = oVar.source.split('.')
-
-                    # if varParts[0] is status, we use directly status because it is faster than eval
-                    varValues = {}
-                    if (varParts[0] == 'status'):
-                        varValues[0] = status
-                    else:
-                        varValues[0] = eval(varParts[0])
-
-                    progressiveVarName = varParts[0]
-                    varConditions = True
-                    finalValue = None
-                    for p in range(1, len(varParts)):
-                        if varValues[p - 1] is None:
-                            finalValue = None
-                            break
+            if profiler is not None:
+                profiler.stop(profilerToken, runMode, None, 'day')
 
-                        if "()" not in varParts[p]:
-                            # davide: added the condition "[" in varParts[p] to manage arrays like "myvariable[3]"
-                            if hasattr(varValues[p - 1], varParts[p]) or "[" in varParts[p]:
-                                progressiveVarName = progressiveVarName + '.' + varParts[p]
-                                # davide: if varParts[p] is in __dict__ of  varParts[p-1] we avoid the use of eval and we get the value directly from __dict__
-                                if hasattr(varValues[p - 1], '__dict__') and varParts[p] in varValues[p - 1].__dict__:
-                                    varValues[p] = varValues[p - 1].__dict__[varParts[p]]
-                                else:
-                                    varValues[p] = eval(progressiveVarName)
-                                finalValue = varValues[p]
-                            else:
-                                varConditions = False
-                                break
-                        else:
-                            progressiveVarName = progressiveVarName + '.' + varParts[p]
-                            varValues[p] = eval(progressiveVarName)
-                            finalValue = varValues[p]
-
-                    if varConditions:
-                        # append the current day value to the daily details array
-                        if isinstance(finalValue, numbers.Number):
-                            vb = round(finalValue, 5)  # round all numbers to the 5th digit
-                            status.dailydetails[oVar.name].append(vb)
-                        else:
-                            status.dailydetails[oVar.name].append(finalValue)
+            status = self.collectDailyDetails(status, runMode)
 
-                    else:
-                        # if the variable is not valid, append 0
-                        status.dailydetails[oVar.name].append(0)
-
-                    i = i + 1
-
-            # get next day, using datetime
-            status.day = status.day + timedelta(days=1)
+            # get next day, advancing the day index (status.day is derived from it)
+            status.day_index = status.day_index + 1
 
             return status
         except Exception as exc:
@@ -434,13 +407,289 @@ class ModelEngine:
             traceback.print_exc(limit=20, file=sys.stdout)
             raise exc
 
-    def finalize(self, status, runMode):
+    def initializeSteps(self, status, components, runMode=None):
+        """
+        Calls the setparameters method and then the initialize method of the provided steps. It is called by
+        executeStep at the simulation start day. If the run mode declares aliases of the status variables, they are
+        applied after the setparameters methods (which create the containers of the steps) and before the initialize
+        methods (see StatusAliases).
+
+        :param status: the status of the model
+        :param components: the list of steps
+        :param runMode: the current run mode, used to apply the aliases and to record the execution times when a
+        profiler is attached
+        :returns: the updated status of the model
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.phase = 'init'
+        for c in components:
+            if profiler is None:
+                c.setparameters(status)
+            else:
+                token = profiler.start()
+                c.setparameters(status)
+                profiler.stop(token, runMode, c, 'setparameters')
+            status.model_initialized = True
+        aliases = self.getAliases(runMode) if runMode is not None else None
+        if aliases is not None:
+            status = apply_aliases(status, aliases)
+        for c in components:
+            if profiler is None:
+                status = c.initialize(status)
+            else:
+                token = profiler.start()
+                status = c.initialize(status)
+                profiler.stop(token, runMode, c, 'initialize')
+        return status
+
+    def integrateSteps(self, status, components, runMode=None):
+        """
+        Calls the integrate method of the provided steps, in the provided order.
+
+        :param status: the status of the model
+        :param components: the list of steps
+        :param runMode: the current run mode, used only when a profiler or a recorder is attached
+        :returns: the updated status of the model
+        """
+        if status.model_initialized == False and len(components) > 0:
+            raise Exception('model was not initialized. Please check the model start conditions')
+        if self.profiler is None and self.recorder is None:
+            for c in components:
+                status = c.integrate(status)
+        else:
+            for c in components:
+                status = self.callStepMethod(status, c, 'integrate', runMode)
+        return status
+
+    def runSteps(self, status, components, runMode=None):
+        """
+        Calls the runstep method of the provided steps, in the provided order.
+
+        :param status: the status of the model
+        :param components: the list of steps
+        :param runMode: the current run mode, used only when a profiler or a recorder is attached
+        :returns: the updated status of the model
+        """
+        activityWindows = self.getActivityWindows(components) if self.activity_windows else None
+        if activityWindows is None:
+            if self.profiler is None and self.recorder is None:
+                for c in components:
+                    status = c.runstep(status)
+            else:
+                for c in components:
+                    status = self.callStepMethod(status, c, 'runstep', runMode)
+            return status
+
+        # the windows are evaluated at the first step declaring them, then the steps out of the window are skipped
+        windows = {}
+        for c, window in zip(components, activityWindows):
+            if window is not None:
+                active = windows.get(window)
+                if active is None:
+                    active = Step.is_in_activity_window(window, status)
+                    windows[window] = active
+                if not active:
+                    continue
+            if self.profiler is None and self.recorder is None:
+                status = c.runstep(status)
+            else:
+                status = self.callStepMethod(status, c, 'runstep', runMode)
+        return status
+
+    def getActivityWindows(self, components):
+        """
+        Returns the activity windows declared by the provided steps (see Step.activity_window), computed at the first
+        call for the same steps: a list with the window of every step, None for the steps active every day. It
+        returns None if no step declares a window.
+
+        :param components: the list of steps
+        :returns: the list of the windows, or None
+        """
+        cached = self._activityWindows.get(id(components))
+        # the windows are computed again if the list of steps was changed
+        if cached is None or cached[0] != components:
+            activityWindows = []
+            for c in components:
+                window = getattr(c, 'activity_window', Step.ACTIVITY_ALWAYS)
+                if window not in Step.ACTIVITY_WINDOWS:
+                    raise Exception('Step ' + c.__class__.__name__ + ' declares the unknown activity window ' + str(
+                        window) + ' (valid values: ' + ', '.join(Step.ACTIVITY_WINDOWS) + ')')
+                activityWindows.append(None if window == Step.ACTIVITY_ALWAYS else window)
+            cached = (list(components), activityWindows if any(w is not None for w in activityWindows) else None)
+            self._activityWindows[id(components)] = cached
+        return cached[1]
+
+    def getDayFunction(self, components, integrate):
+        """
+        Returns the function that integrates (if integrate is True) and runs the provided steps (see
+        build_day_function), generating it at the first call for the same steps. If the property activity_windows is
+        True, the function skips the runstep of the steps out of their activity window. It is used by executeStep when the
+        property fused_steps is True.
+
+        :param components: the list of steps
+        :param integrate: True if the integrate methods have to be called before the runstep methods
+        :returns: the function, that takes the status and returns the updated status
+        """
+        key = (id(components), integrate, self.activity_windows)
+        cached = self._dayFunctions.get(key)
+        # the function is generated again if the list of steps was changed
+        if cached is None or cached[0] != components:
+            cached = (list(components), build_day_function(components, integrate, self.getActivityWindows(
+                components) if self.activity_windows else None))
+            self._dayFunctions[key] = cached
+        return cached[1]
+
+    def callStepMethod(self, status, step, method, runMode):
+        """
+        Calls the method (integrate or runstep) of the step, measuring the call with the attached profiler and
+        recording its inputs and outputs with the attached recorder.
+
+        :param status: the status of the model
+        :param step: the step
+        :param method: the name of the method
+        :param runMode: the current run mode
+        :returns: the updated status of the model
+        """
+        recorder = self.recorder
+        recorded = recorder is not None and recorder.isRecorded(status, runMode, step)
+        if recorded:
+            inputs = recorder.captureInputs(status, runMode, step)
+        profiler = self.profiler
+        if profiler is not None:
+            token = profiler.start()
+        status = getattr(step, method)(status)
+        if profiler is not None:
+            profiler.stop(token, runMode, step, method)
+        if recorded:
+            recorder.addRecord(status, runMode, step, method, inputs)
+        return status
+
+    def collectDailyDetails(self, status, runMode):
+        """
+        If flags ReturnDailyDetails or ReturnDekadalDetails or PrintDailyDetails or PrintDailyDetailsToFile are set
+        to true (or the DailyDetailsSink is set), adds the current day values of the output variables to
+        status.dailydetails. If the run mode has aggregated output variables, adds their current day values to the
+        aggregator of the status (status.outputaggregator, see OutputAggregator). It is called by executeStep at the end of every day, before
+        incrementing status.day.
+
+        :param status: the status of the model
+        :param runMode: the current run mode
+        :returns: the updated status of the model
+        """
+        # if flags ReturnDailyDetails or ReturnDekadalDetails or PrintDailyDetails are set to true, at the first day initialize the structure to contain the daily values (status.dailydetails)
+        dayIndex = status.day_index
+        if (
+                self.ReturnDailyDetails or self.ReturnDekadalDetails or self.PrintDailyDetails or self.PrintDailyDetailsToFile or self.DailyDetailsSink is not None) and dayIndex == 0:
+
+            if hasattr(status, 'dailydetails') == False:
+                status.dailydetails = {}
+
+            # in the dailydetails, always add DAY and DOY column and then all the output columns defined in the configuration file
+            for col in ['DAY', 'DOY'] + self.getOutputVariablesNames(runMode):
+                # initialize each column as an empy list. The list will contain a value for each day
+                status.dailydetails[col] = []
+
+        # if flags ReturnDailyDetails or ReturnDekadalDetails or PrintDailyDetails are set to true, at the end of the daily step collect the ouput variables values
+        # into the status.dailydetails dictionary (besides the output variables, add always also columns DAY (=complete date) and DOY (=julian day) )
+        # in case of ReturnDekadalDetails, this is done only for the days that respect the Dekadal calendar (status.calendar.isDekadal)
+        if (self.ReturnDailyDetails or (self.ReturnDekadalDetails and status.calendar.isDekadal(
+                dayIndex)) or self.PrintDailyDetails or self.PrintDailyDetailsToFile or self.DailyDetailsSink is not None) and dayIndex >= 0 and status.day <= status.simulation_end_day:
+
+            # in the dailydetails, always add DAY and DOY column
+            status.dailydetails['DAY'].append(status.day)
+            status.dailydetails['DOY'].append(status.calendar.getDoy(dayIndex))
+
+            # in the daily details, add all the output columns defined in the configuration file
+            # retrieve the output variables for the specific runMode
+            for oVar in self.getOutputVariables(runMode):
+                status.dailydetails[oVar.name].append(self.getDailyOutputValue(oVar, status))
+
+        # accumulate the values of the aggregated output variables, if the run mode declares them
+        aggregatedVariables = self.getAggregatedOutputVariables(runMode)
+        if aggregatedVariables is not None and dayIndex >= 0 and status.day <= status.simulation_end_day:
+            if dayIndex == 0 or not hasattr(status, 'outputaggregator'):
+                status.outputaggregator = OutputAggregator(aggregatedVariables)
+            status.outputaggregator.add(status.day,
+                                        {oVar.name: self.getDailyOutputValue(oVar, status) for oVar in
+                                         aggregatedVariables},
+                                        status.calendar.isDekadal(dayIndex), status.calendar.isMonthEnd(dayIndex))
+
+        return status
+
+    def getDailyOutputValue(self, oVar, status):
+        """
+        Returns the current value of an output variable, as it is saved in the daily details: numbers are rounded to
+        the 5th digit, None is returned if one of the levels of the variable is None, 0 is returned if one of the levels
+        of the variable is not defined.
+
+        :param oVar: the output variable (OutputVariable object)
+        :param status: the status of the model
+        :returns: the value of the output variable
+        """
+        # first try the expression compiled at the workflow loading: if it fails (for example because
+        # one of the levels of the variable is None or is not defined) the levels are explored one by one
+        if oVar.code is not None:
+            try:
+                finalValue = eval(oVar.code, globals(), {'status': status})
+                if isinstance(finalValue, numbers.Number):
+                    finalValue = round(finalValue, 5)  # round all numbers to the 5th digit
+                return finalValue
+            except Exception:
+                pass
+
+        # check if all variables levels are valid and if contains the elements
+        varParts = oVar.source.split('.')
+
+        # if varParts[0] is status, we use directly status because it is faster than eval
+        varValues = {}
+        if (varParts[0] == 'status'):
+            varValues[0] = status
+        else:
+            varValues[0] = eval(varParts[0])
+
+        progressiveVarName = varParts[0]
+        varConditions = True
+        finalValue = None
+        for p in range(1, len(varParts)):
+            if varValues[p - 1] is None:
+                finalValue = None
+                break
+
+            if "()" not in varParts[p]:
+                # davide: added the condition "[" in varParts[p] to manage arrays like "myvariable[3]"
+                if hasattr(varValues[p - 1], varParts[p]) or "[" in varParts[p]:
+                    progressiveVarName = progressiveVarName + '.' + varParts[p]
+                    # davide: if varParts[p] is in __dict__ of  varParts[p-1] we avoid the use of eval and we get the value directly from __dict__
+                    if hasattr(varValues[p - 1], '__dict__') and varParts[p] in varValues[p - 1].__dict__:
+                        varValues[p] = varValues[p - 1].__dict__[varParts[p]]
+                    else:
+                        varValues[p] = eval(progressiveVarName)
+                    finalValue = varValues[p]
+                else:
+                    varConditions = False
+                    break
+            else:
+                progressiveVarName = progressiveVarName + '.' + varParts[p]
+                varValues[p] = eval(progressiveVarName)
+                finalValue = varValues[p]
+
+        if varConditions:
+            if isinstance(finalValue, numbers.Number):
+                return round(finalValue, 5)  # round all numbers to the 5th digit
+            return finalValue
+
+        # if the variable is not valid, return 0
+        return 0
+
+    def finalize(self, status, runMode, unit=None):
         """
         For the current run mode it generates an array with output variables calculated after the last time interval
         executed and returns it. To do so, it uses the output variables definition read from the workflow file.
         It also returns the daily details object if ReturnDailyDetails or ReturnDekadalDetails are True. Finally,
         if PrintDailyDetails or PrintDailyDetailsToFiles is True, it prints the content of the daily details object
-        to the console output or to the specified file (PrintDailyDetails_OutputFile)
+        to the console output or to the specified file (PrintDailyDetails_OutputFile). If the DailyDetailsSink is set,
+        the daily details are added to the sink, with the identifiers of the unit and the run mode (RUN_MODE column)
 
         Arguments:
 
@@ -449,25 +698,28 @@ class ModelEngine:
         :param runMode: the current run mode returns: the array containing the values of the output variables, in the same order they are returned by getOutputVariables and
         getOutputVariablesNames methods
 
+        :param unit: optional dictionary with the identifiers of the simulated unit (e.g. {'X': x, 'Y': y}), written
+        to the DailyDetailsSink as columns of the daily details
+
         :returns: a tuple containing two values: 1) the summary output array. It is a 1D array having size  =
         NUM_OUTPUT_VARIABLES -  2) the daily details dictionary (if ReturnDailyDetails and ReturnDekadalDetails are
         False, the returned daily details object is None).  The dictionary contains one item for each output
         variable: the key is the variable name, the value is a list: the list contains one item per simulated day.
         Each item of the list is the value of the output variable at that day.
+        If the run mode has aggregated output variables (see getAggregatedOutputVariables), the tuple contains a third
+        value: the dictionary of the aggregated values returned by OutputAggregator.getResults (period -> dictionary
+        containing the lists START, END and DAYS and the array of the aggregated values of every variable).
         """
         try:
-            for k in self.debug_timing_initialize_time.keys():
-                print('initialize time' + k + ' : ' + str(self.debug_timing_initialize_time[k]) + ' seconds')
-            for k in self.debug_timing_integrate_time.keys():
-                print('integrate time' + k + ' : ' + str(self.debug_timing_integrate_time[k]) + ' seconds')
-            for k in self.debug_timing_runstep_time.keys():
-                print('runstep time' + k + ' : ' + str(self.debug_timing_runstep_time[k]) + ' seconds')
+            if self.debug_timing_mode and self.profiler is not None:
+                print(self.profiler.report())
 
             # retrieve the output variables for the specific runMode
             outVariables = self.getOutputVariables(runMode)
+            aggregatedVariables = self.getAggregatedOutputVariables(runMode)
             if outVariables is None:
                 print(('No output variables read for run mode ' + runMode))
-            if len(outVariables) <= 0:
+            if len(outVariables) <= 0 and aggregatedVariables is None:
                 return None
 
             # initialize the array to return
@@ -475,6 +727,17 @@ class ModelEngine:
 
             i = 0
             for oVar in outVariables:
+                # first try the expression compiled at the workflow loading, then explore the levels one by one
+                if oVar.code is not None:
+                    try:
+                        varValue = eval(oVar.code, globals(), {'status': status})
+                        if varValue is not None:
+                            summary_output_array[i] = varValue
+                        i = i + 1
+                        continue
+                    except Exception:
+                        pass
+
                 # check if all variables levels are valid and if contains the elements
                 varParts = oVar.source.split('.')
                 varValue = eval(varParts[0])
@@ -514,16 +777,28 @@ class ModelEngine:
                         grids_writer.writerow(row_)
             if self.PrintDailyDetails:
                 print((str(list(status.dailydetails.keys()))))
+                # the rows are joined and written to the console output at once
+                lines = []
                 for row in range(0, len(status.dailydetails['DOY'])):
-                    sys.stdout.write('\n')
-                    for col in list(status.dailydetails.keys()):
-                        if row < len(status.dailydetails[col]):
-                            sys.stdout.write(str(status.dailydetails[col][row]) + ',')
-
-            if self.ReturnDailyDetails or self.ReturnDekadalDetails:
-                return summary_output_array, status.dailydetails
-            else:
-                return summary_output_array, None
+                    lines.append('\n' + ''.join(str(values[row]) + ',' for values in status.dailydetails.values() if
+                                                row < len(values)))
+                sys.stdout.write(''.join(lines))
+            if self.DailyDetailsSink is not None:
+                unitIdentifiers = {'RUN_MODE': runMode}
+                if unit is not None:
+                    unitIdentifiers.update(unit)
+                # an error of the sink does not discard the outputs of the unit
+                try:
+                    self.DailyDetailsSink.write(status.dailydetails, unitIdentifiers)
+                except Exception as exc:
+                    print(("\nError writing the daily details to the DailyDetailsSink :" + str(exc)))
+
+            dailyDetails = status.dailydetails if self.ReturnDailyDetails or self.ReturnDekadalDetails else None
+            if aggregatedVariables is not None:
+                aggregator = getattr(status, 'outputaggregator', None)
+                return summary_output_array, dailyDetails, (
+                    OutputAggregator(aggregatedVariables) if aggregator is None else aggregator).getResults()
+            return summary_output_array, dailyDetails
 
         except Exception as exc:
             print(("\nError executing the ModelEngine finalize :" + str(exc)))
@@ -609,66 +884,88 @@ class ModelEngine:
 
 
     def readWorkflowConfigurationFromXML(self, xm):
-        xWs = xm.getElementsByTagName('Workflow')
-        self.Workflows = list()
+        """
+        Reads the workflows configuration from the parsed XML document xm (see readWorkflowConfigurationFromXMLFile)
+        """
+        self.loadCompiledWorkflow(compile_workflow_configuration(xm))
 
-        # parse all models
-        for xWk in xWs:
-            wkRunnable = (xWk.attributes['run'].value == 'ON')
-            if wkRunnable:
-                wk = ModelEngineWorkflow()
-                wk.steps = list()
-                wk.name = xWk.attributes['name'].value
-                xSteps = xWk.getElementsByTagName('Step')
-                for xStep in xSteps:
-                    stepParts = str(xStep.firstChild.nodeValue).split('|')
-
-                    # create the instance of the step
-                    stepinstance = create_instance(stepParts[0], stepParts[1])
-
-                    # add the step's INSTANCE to the steps list
-                    wk.steps.append(stepinstance)
-
-                # read output variables for current workflow
-                xOutput = xWk.getElementsByTagName('Output')
-                if len(xOutput) > 0:
-                    xoVariables = xOutput[0].getElementsByTagName('Variable')
-                    wk.outputVariables = list()
-                    for xVar in xoVariables:
-                        wkVar = OutputVariable()
-                        wkVar.name = xVar.attributes['name'].value
-                        wkVar.source = xVar.attributes['source'].value
-                        wkVar.description = xVar.attributes['description'].value
+    def loadCompiledWorkflow(self, compiledWorkflow):
+        """
+        Populates the properties Workflows, initVariables and drivingVariables from a compiled workflow (see class
+        CompiledWorkflow). A new instance of every step is created.
+
+        :param compiledWorkflow: the compiled workflow, an instance of CompiledWorkflow
+        """
+        self.Workflows = list()
+        for wName, wSteps, wOutputs, wAliases in compiledWorkflow.workflows:
+            wk = ModelEngineWorkflow()
+            wk.steps = list()
+            wk.name = wName
+            wk.aliases = wAliases
+            for moduleName, className, precrop in wSteps:
+                # create the instance of the step
+                stepinstance = create_instance(moduleName, className)
+
+                # add the step's INSTANCE to the steps list
+                wk.steps.append(stepinstance)
+
+                # if at least one step declares the 'precrop' attribute, the workflow has a reduced pre-crop plan
+                # made of the steps having precrop="ON"
+                if precrop is not None:
+                    if wk.precropSteps is None:
+                        wk.precropSteps = list()
+                    if precrop:
+                        wk.precropSteps.append(stepinstance)
+
+            if wOutputs is not None:
+                wk.outputVariables = list()
+                for name, source, description, code, aggregate, period in wOutputs:
+                    wkVar = OutputVariable()
+                    wkVar.name = name
+                    wkVar.source = source
+                    wkVar.description = description
+                    wkVar.code = code
+                    wkVar.aggregate = aggregate
+                    wkVar.period = period
+                    if period is None:
                         wk.outputVariables.append(wkVar)
+                    else:
+                        # the aggregated variables are returned only as aggregated values (see OutputAggregator)
+                        if wk.aggregatedOutputVariables is None:
+                            wk.aggregatedOutputVariables = list()
+                        wk.aggregatedOutputVariables.append(wkVar)
+
+            self.Workflows.append(wk)
 
-                self.Workflows.append(wk)
+        self.initFunction = None
+        if compiledWorkflow.initFunctionCode is not None:
+            namespace = {}
+            exec(compiledWorkflow.initFunctionCode, globals(), namespace)
+            self.initFunction = namespace[INIT_FUNCTION_NAME]
 
-        # read init variables for current workflow, if exists
-        xInit = xm.getElementsByTagName('Init')
-        if len(xInit) > 0:
-            xiVariables = xInit[0].getElementsByTagName('Variable')
+        if compiledWorkflow.initVariables is not None:
             self.initVariables = list()
-            for iVar in xiVariables:
+            for name, source, code in compiledWorkflow.initVariables:
                 wiVar = InitVariable()
-                wiVar.name = iVar.attributes['name'].value
-                wiVar.source = iVar.attributes['source'].value
+                wiVar.name = name
+                wiVar.source = source
+                wiVar.code = code
                 self.initVariables.append(wiVar)
 
-        # read driving variables
-        xDriv = xm.getElementsByTagName('DrivingVariables')
-        if len(xDriv) > 0:
-            xiDrVariables = xDriv[0].getElementsByTagName('DrivingVariable')
+        self.weatherConversions = None
+        if compiledWorkflow.weatherConversions is not None:
+            self.weatherConversions = WeatherConversionStage(compiledWorkflow.weatherConversions)
+
+        if compiledWorkflow.drivingVariables is not None:
             self.drivingVariables = list()
-            for iVar in xiDrVariables:
+            for name, description, unitofmeasure, type in compiledWorkflow.drivingVariables:
                 wiVar = DrivingVariable()
-                wiVar.name = iVar.attributes['name'].value
-                wiVar.description = iVar.attributes['description'].value
-                wiVar.unitofmeasure = iVar.attributes['unitofmeasure'].value
-                wiVar.type = iVar.attributes['type'].value
+                wiVar.name = name
+                wiVar.description = description
+                wiVar.unitofmeasure = unitofmeasure
+                wiVar.type = type
                 self.drivingVariables.append(wiVar)
 
-        return
-
     def getSteps2Run(self, runMode):
         """
         Retrieves the steps to run for specific run mode from the configured Workflows property.
@@ -683,6 +980,43 @@ class ModelEngine:
                 return x.steps
         return None
 
+    def getPreCropSteps2Run(self, runMode):
+        """
+        Retrieves the steps to run before the crop start event for specific run mode from the configured Workflows
+        property. These are the steps declared with attribute precrop="ON" in the workflow file.
+
+        Arguments:
+
+        :param runMode: the current run mode
+        :returns: The list of pre-crop steps to run, or None if the workflow does not declare a pre-crop plan
+        """
+        for x in self.Workflows:
+            if x.name == runMode:
+                return x.precropSteps
+        return None
+
+    def getDailySteps2Run(self, status, runMode):
+        """
+        Retrieves the steps to integrate and run in the current day (status.day) for specific run mode.
+        Before the crop start event (status.day < status.sowing_emergence_day), if the workflow declares a pre-crop
+        plan, only the pre-crop steps are returned. Otherwise (or if status.sowing_emergence_day is not defined) all
+        the steps of the run mode are returned. All the steps are returned also in the first two days of the simulation
+        (the day without integration and the first integrated day), so that every step sets the values of its
+        variables before the crop starts (e.g. the crop states, 0.0 before sowing) as in the full plan.
+
+        Arguments:
+
+        :param status: the status of the model
+        :param runMode: the current run mode
+        :returns: The list of steps to integrate and run in the current day
+        """
+        precropSteps = self.getPreCropSteps2Run(runMode)
+        if precropSteps is not None and getattr(status, 'sowing_emergence_day', None) is not None \
+                and status.day < status.sowing_emergence_day \
+                and (status.day - status.simulation_start_day).days >= PRECROP_FIRST_DAY_INDEX:
+            return precropSteps
+        return self.getSteps2Run(runMode)
+
     def getOutputVariables(self, runMode):
         """
         Retrieves the output variables for specific run mode from the configured Workflows property.
@@ -697,6 +1031,36 @@ class ModelEngine:
                 return x.outputVariables
         return None
 
+    def getAliases(self, runMode):
+        """
+        Retrieves the aliases of the status variables (Alias tags) for specific run mode from the configured Workflows
+        property.
+
+        :param runMode: the current run mode
+        :returns: the list of tuples (source, target) of the aliases, None if the run mode has no aliases
+        """
+        for x in self.Workflows:
+            if x.name == runMode:
+                return x.aliases
+        return None
+
+    def getAggregatedOutputVariables(self, runMode):
+        """
+        Retrieves the output variables aggregated by period (Output variables having the attributes 'aggregate' and
+        'period') for specific run mode from the configured Workflows property. These variables are not included in the
+        output variables returned by getOutputVariables.
+
+        Arguments:
+
+        :param runMode: the current run mode
+        :returns: the list of aggregated output variables as 'Variable' objects, None if the run mode has no aggregated
+        output variables
+        """
+        for x in self.Workflows:
+            if x.name == runMode:
+                return x.aggregatedOutputVariables
+        return None
+
     def getOutputVariablesNames(self, runMode):
         """
         Retrieves the output variables names for specific run mode from the configured Workflows property.
@@ -757,12 +1121,6 @@ class ModelEngine:
             return -1
         return outputVariables.index(variablename)
 
-    def is_last_day_of_month(self, dt):
-        return dt.day == calendar.monthrange(dt.year, dt.month)[1]
-
-    def id_dekadal_day(self, dt):
-        return dt.day == 10 or dt.day == 20 or self.is_last_day_of_month(dt)
-
 def DeSerializeModelInputConfiguration(serialized_pickle_string):
     """
     Deserializes the model starting from a pickle serialized string returned by method 'SerializeModelInputConfiguration'.
@@ -776,6 +1134,7 @@ def DeSerializeModelInputConfiguration(serialized_pickle_string):
      - the status variable after the initialization
     """
     res = pickle.loads(serialized_pickle_string)
+    # the workflow is compiled only the first time, then it is taken from the process-level cache
     m = ModelEngine(res[0], file_mode=False)
     runmodes = m.getRunModeNames()
     ret=[]
@@ -795,9 +1154,22 @@ class ModelEngineWorkflow:
     steps = None
     """List of steps of the workflow"""
 
+    precropSteps = None
+    """List of steps to run before the crop start event (status.sowing_emergence_day), i.e. the steps declared with 
+    attribute precrop="ON". None if no step of the workflow declares the 'precrop' attribute: in this case all the steps 
+    are run every day"""
+
     outputVariables = None
     """List of output variables of the workflow (OutputVariable object)"""
 
+    aggregatedOutputVariables = None
+    """List of output variables of the workflow aggregated by period (OutputVariable object having the period), None if 
+    the workflow has no aggregated output variables"""
+
+    aliases = None
+    """List of tuples (source, target) of the aliases of the status variables declared by the Alias tags (see 
+    StatusAliases), None if the workflow has no aliases"""
+
 
 class OutputVariable:
     """
@@ -813,6 +1185,16 @@ class OutputVariable:
     description = ''
     """Textual description of the variable"""
 
+    code = None
+    """The source compiled as python expression when the workflow is loaded (None if it cannot be compiled)"""
+
+    aggregate = None
+    """Aggregation function of the daily values: 'sum', 'mean', 'min', 'max' or 'last' (None if the variable is not 
+    aggregated)"""
+
+    period = None
+    """Aggregation period of the daily values: 'dekad' or 'month' (None if the variable is not aggregated)"""
+
 
 class DrivingVariable:
     """
@@ -862,6 +1244,392 @@ class InitVariable:
      source = "0 if drivingVariables['DEPTH'] &lt;= 0 else drivingVariables['DEPTH'] 
      """
 
+    code = None
+    """The instruction 'status.name = source' compiled when the workflow is loaded (None if it cannot be compiled)"""
+
+
+class CompiledWorkflow:
+    """
+    Parsed and compiled form of a workflow configuration file. It contains only plain python objects and code objects
+    (no step instances), so it can be shared by all the ModelEngine instances of the process created from the same
+    configuration and it can be saved with the marshal module next to the XML file (see get_compiled_workflow).
+    """
+
+    FORMAT_VERSION = 5
+    """Version of the format of the compiled workflow saved to file"""
+
+    content_hash = ''
+    """SHA1 hash of the XML content the workflow was compiled from"""
+
+    workflows = None
+    """List of the active workflows (run="ON"). Each item is a tuple (name, steps, outputs, aliases) where steps is a 
+    list of tuples (module name, class name, precrop), outputs is a list of tuples (name, source, description, code, 
+    aggregate, period), or None if the workflow has no Output section, and aliases is a list of tuples (source, target) 
+    of the Alias tags of the workflow and of the root element, or None if there are no aliases. precrop is None if the 
+    step does not declare the 'precrop' attribute, otherwise it is True if precrop="ON". aggregate and period are None 
+    for the variables that are not aggregated """
+
+    initVariables = None
+    """List of tuples (name, source, code) for the variables of the Init section, or None if the section is missing"""
+
+    drivingVariables = None
+    """List of tuples (name, description, unitofmeasure, type) of the DrivingVariables section, or None if the section 
+    is missing"""
+
+    weatherConversions = None
+    """List of tuples (variable, source unit, target unit, conversion) of the WeatherConversions section, or None if the
+    section is missing. conversion is None if the attribute is not set"""
+
+    initFunctionCode = None
+    """Code that defines the function INIT_FUNCTION_NAME, executing all the instructions of the Init section, one per 
+    line in the same order of the section (see build_init_function_code). None if the Init section is missing or if 
+    one of its instructions cannot be compiled"""
+
+    def dumps(self):
+        """Returns the compiled workflow serialized with the marshal module"""
+        return marshal.dumps((self.FORMAT_VERSION, importlib.util.MAGIC_NUMBER, self.content_hash,
+                              self.workflows, self.initVariables, self.drivingVariables, self.initFunctionCode,
+                              self.weatherConversions))
+
+    @staticmethod
+    def loads(data, content_hash):
+        """
+        Deserializes a compiled workflow saved with method dumps. Returns None if the data were saved with another
+        format version or python version, or if they were compiled from a content different from content_hash.
+        """
+        try:
+            saved = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            return None
+        if len(saved) != 8 or saved[0] != CompiledWorkflow.FORMAT_VERSION or saved[1] != importlib.util.MAGIC_NUMBER \
+                or saved[2] != content_hash:
+            return None
+        version, magic, h, workflows, initVariables, drivingVariables, initFunctionCode, weatherConversions = saved
+        compiled = CompiledWorkflow()
+        compiled.content_hash = h
+        compiled.workflows = workflows
+        compiled.initVariables = initVariables
+        compiled.drivingVariables = drivingVariables
+        compiled.initFunctionCode = initFunctionCode
+        compiled.weatherConversions = weatherConversions
+        return compiled
+
+
+def _compile_or_none(source, filename, mode):
+    """Compiles the source, returning None in case of syntax errors. The error will be raised when the source is
+    executed"""
+    try:
+        return compile(source, filename, mode)
+    except SyntaxError:
+        return None
+
+
+PRECROP_FIRST_DAY_INDEX = 2
+"""Number of days from the simulation start day to the first day in which the reduced pre-crop plan can be run (see
+ModelEngine.getDailySteps2Run): the first two days of the simulation run all the steps"""
+
+INIT_FUNCTION_NAME = 'initialize_status'
+"""Name of the function generated from the Init section of the workflow"""
+
+INIT_FUNCTION_FILENAME = '<init>'
+"""File name of the code generated from the Init section of the workflow, used to find the failing instruction"""
+
+INIT_FUNCTION_ARGUMENTS = ['status', 'timedependantvariables', 'timeDependantVariableColumn', 'drivingVariables',
+                           'allparameters', 'first_day', 'simulation_start_day', 'simulation_end_day']
+"""Arguments of the function generated from the Init section: these names can be used in the sources of the Init 
+variables"""
+
+
+def build_init_function_code(commands):
+    """
+    Compiles the instructions of the Init section in a single function, named INIT_FUNCTION_NAME and having arguments
+    INIT_FUNCTION_ARGUMENTS. The i-th instruction is written at line i+2 of the generated code, so that in case of error
+    the failing instruction can be found from the traceback (see get_failing_init_variable_index).
+
+    :param commands: the list of the instructions (e.g. "status.LAT = drivingVariables['LAT']")
+    :return: the code defining the function, or None if an instruction cannot be compiled
+    """
+    lines = ['def ' + INIT_FUNCTION_NAME + '(' + ', '.join(INIT_FUNCTION_ARGUMENTS) + '):']
+    for command in commands:
+        lines.append('    ' + command)
+    lines.append('    return status')
+    return _compile_or_none('\n'.join(lines), INIT_FUNCTION_FILENAME, 'exec')
+
+
+DAY_FUNCTION_FILENAME = '<day>'
+"""File name of the code generated by build_day_function"""
+
+
+def _return_status(self, status):
+    return status
+
+
+def is_noop_method(method):
+    """
+    Returns True if the method of a step does nothing: its code only returns the status argument (e.g. the integrate
+    method of SeriesAccumulator)
+    """
+    code = getattr(getattr(method, '__func__', method), '__code__', None)
+    reference = _return_status.__code__
+    return code is not None and code.co_argcount == 2 and code.co_code == reference.co_code
+
+
+def build_day_function(components, integrate=True, activityWindows=None):
+    """
+    Generates a function that calls the integrate methods (if integrate is True) and then the runstep methods of the
+    provided steps, in the provided order, as done by integrateSteps and runSteps. The methods are bound to the step
+    instances when the function is generated and are passed as default values of arguments of the function, so that
+    they are local variables; the methods that do nothing (see is_noop_method) are not called. For example, for two steps
+    the generated code is:
+
+        def day_function(status, integrate_0=..., runstep_0=..., runstep_1=...):
+            if status.model_initialized == False:
+                raise Exception('model was not initialized. Please check the model start conditions')
+            status = integrate_0(status)
+            status = runstep_0(status)
+            status = runstep_1(status)
+            return status
+
+    If the activity windows of the steps are provided (see ModelEngine.getActivityWindows), every window is evaluated
+    before the runstep of the first step declaring it and the runstep of the steps of the window is called only if the
+    day is in the window (e.g. 'if window_1: status = runstep_1(status)').
+
+    :param components: the list of steps
+    :param integrate: True if the integrate methods have to be called before the runstep methods
+    :param activityWindows: the list of the activity windows of the steps (None for the steps active every day), or
+    None to run all the steps
+    :return: the function, that takes the status and returns the updated status
+    """
+    methods = []
+    for method in (['integrate', 'runstep'] if integrate else ['runstep']):
+        for i, c in enumerate(components):
+            boundMethod = getattr(c, method)
+            if not is_noop_method(boundMethod):
+                window = activityWindows[i] if activityWindows is not None and method == 'runstep' else None
+                methods.append((method + '_' + str(i), boundMethod, window))
+    arguments = ['status'] + [name + '=' + name for name, m, w in methods]
+    if any(w is not None for name, m, w in methods):
+        arguments.append('is_in_activity_window=is_in_activity_window')
+    lines = ['def day_function(' + ', '.join(arguments) + '):']
+    if integrate and len(components) > 0:
+        lines.append('    if status.model_initialized == False:')
+        lines.append("        raise Exception('model was not initialized. Please check the model start conditions')")
+    windows = []
+    for name, m, window in methods:
+        if window is None:
+            lines.append('    status = ' + name + '(status)')
+            continue
+        windowVariable = 'window_' + str(Step.ACTIVITY_WINDOWS.index(window))
+        if window not in windows:
+            windows.append(window)
+            lines.append('    ' + windowVariable + ' = is_in_activity_window(' + repr(window) + ', status)')
+        lines.append('    if ' + windowVariable + ':')
+        lines.append('        status = ' + name + '(status)')
+    lines.append('    return status')
+    namespace = {name: m for name, m, w in methods}
+    namespace['is_in_activity_window'] = Step.is_in_activity_window
+    exec(compile('\n'.join(lines), DAY_FUNCTION_FILENAME, 'exec'), namespace)
+    return namespace['day_function']
+
+
+def get_failing_init_variable_index(exc):
+    """
+    Returns the position, in the Init section, of the instruction that raised the exception exc inside the function
+    generated by build_init_function_code
+    """
+    lineno = None
+    tb = exc.__traceback__
+    while tb is not None:
+        if tb.tb_frame.f_code.co_filename == INIT_FUNCTION_FILENAME:
+            lineno = tb.tb_lineno
+        tb = tb.tb_next
+    return lineno - 2
+
+
+def read_alias(xAlias):
+    """
+    Returns the tuple (source, target) of an Alias node, read from its attributes 'from' and 'to' (e.g.
+    <Alias from="status.weather.TEMP_MAX" to="status.states.TEMP_MAX"/>). An exception is raised if they are not valid
+    status variables.
+    """
+    source = xAlias.attributes['from'].value.strip()
+    target = xAlias.attributes['to'].value.strip()
+    check_alias(source, target)
+    return source, target
+
+
+def read_output_aggregation(xVar):
+    """
+    Returns the tuple (aggregate, period) of an Output variable node, read from its attributes 'aggregate' (sum, mean,
+    min, max, last) and 'period' (dekad, month). If only one attribute is set, the other one is 'last' or 'dekad'.
+    Both values are None if the variable is not aggregated. An exception is raised for unknown values.
+    """
+    aggregate = xVar.attributes['aggregate'].value if xVar.hasAttribute('aggregate') else None
+    period = xVar.attributes['period'].value if xVar.hasAttribute('period') else None
+    if aggregate is None and period is None:
+        return None, None
+    aggregate = 'last' if aggregate is None else aggregate
+    period = 'dekad' if period is None else period
+    if aggregate not in AGGREGATES or period not in PERIODS:
+        raise Exception('Output variable ' + xVar.attributes['name'].value + ': invalid aggregate "' + aggregate +
+                        '" or period "' + period + '". Valid values are ' + '|'.join(AGGREGATES) + ' and ' +
+                        '|'.join(PERIODS))
+    return aggregate, period
+
+
+def compile_workflow_configuration(xm, content_hash=''):
+    """
+    Reads the workflows configuration for which the flag RUN is ON from the parsed XML document xm (a minidom
+    document) and returns it as a CompiledWorkflow. The instructions of the Init section and the sources of the output
+    variables are compiled as python code.
+
+    :param xm: the minidom document of the workflow configuration
+    :param content_hash: the hash of the XML content, saved in the compiled workflow
+    :return: the CompiledWorkflow
+    """
+    compiled = CompiledWorkflow()
+    compiled.content_hash = content_hash
+    compiled.workflows = list()
+
+    # the aliases declared in the root element apply to all the workflows
+    rootAliases = [read_alias(xAlias) for xAlias in xm.documentElement.childNodes if
+                   xAlias.nodeType == xAlias.ELEMENT_NODE and xAlias.tagName == 'Alias']
+
+    # parse all models
+    for xWk in xm.getElementsByTagName('Workflow'):
+        if xWk.attributes['run'].value == 'ON':
+            steps = list()
+            for xStep in xWk.getElementsByTagName('Step'):
+                stepParts = str(xStep.firstChild.nodeValue).split('|')
+                precrop = None
+                if xStep.hasAttribute('precrop'):
+                    precrop = xStep.attributes['precrop'].value == 'ON'
+                steps.append((stepParts[0], stepParts[1], precrop))
+
+            # read output variables for current workflow
+            outputs = None
+            xOutput = xWk.getElementsByTagName('Output')
+            if len(xOutput) > 0:
+                outputs = list()
+                for xVar in xOutput[0].getElementsByTagName('Variable'):
+                    name = xVar.attributes['name'].value
+                    source = xVar.attributes['source'].value
+                    aggregate, period = read_output_aggregation(xVar)
+                    outputs.append((name, source, xVar.attributes['description'].value,
+                                    _compile_or_none(source, '<output ' + name + '>', 'eval'), aggregate, period))
+
+            aliases = rootAliases + [read_alias(xAlias) for xAlias in xWk.getElementsByTagName('Alias')]
+
+            compiled.workflows.append((xWk.attributes['name'].value, steps, outputs,
+                                       aliases if len(aliases) > 0 else None))
+
+    # read init variables, if exists
+    xInit = xm.getElementsByTagName('Init')
+    if len(xInit) > 0:
+        compiled.initVariables = list()
+        commands = list()
+        for iVar in xInit[0].getElementsByTagName('Variable'):
+            name = iVar.attributes['name'].value
+            source = iVar.attributes['source'].value
+            command = 'status.' + name + " = " + source.replace('&gt;', '>').replace('&lt;', '<')
+            compiled.initVariables.append((name, source, _compile_or_none(command, '<init ' + name + '>', 'exec')))
+            commands.append(command)
+        if all(code is not None for name, source, code in compiled.initVariables):
+            compiled.initFunctionCode = build_init_function_code(commands)
+
+    # read driving variables
+    xDriv = xm.getElementsByTagName('DrivingVariables')
+    if len(xDriv) > 0:
+        compiled.drivingVariables = list()
+        for iVar in xDriv[0].getElementsByTagName('DrivingVariable'):
+            compiled.drivingVariables.append((iVar.attributes['name'].value, iVar.attributes['description'].value,
+                                              iVar.attributes['unitofmeasure'].value, iVar.attributes['type'].value))
+
+    # read the conversions of the units of measure of the weather data
+    xConversions = xm.getElementsByTagName('WeatherConversions')
+    if len(xConversions) > 0:
+        compiled.weatherConversions = list()
+        for xConv in xConversions[0].getElementsByTagName('Conversion'):
+            compiled.weatherConversions.append((xConv.attributes['variable'].value, xConv.attributes['from'].value,
+                                                xConv.attributes['to'].value,
+                                                xConv.attributes['conversion'].value if xConv.hasAttribute(
+                                                    'conversion') else None))
+
+    return compiled
+
+
+_compiled_workflows = {}
+"""Process-level cache of the compiled workflows, keyed by the SHA1 hash of the XML content"""
+
+_workflow_files = {}
+"""For the workflow files already read, the file modification time and size and the hash of its content, keyed by the
+absolute path of the file"""
+
+
+def get_compiled_workflow(configuration, file_mode=True, persist_compiled=False):
+    """
+    Returns the compiled workflow for the configuration (path of the XML file if file_mode is True, XML content string
+    otherwise), using the process-level cache. The cache is keyed by the hash of the XML content; in file mode the
+    content is read again only if the modification time or the size of the file changed.
+
+    If persist_compiled is True and file_mode is True, the compiled workflow is also read from (or written to) the file
+    having the path of the XML file plus the '.compiled' extension. The saved file is used only if it was compiled from
+    the same XML content and with the same python version.
+
+    :param configuration: the path of the XML file or the XML content string
+    :param file_mode: True if configuration is a path, False if it is the XML content
+    :param persist_compiled: True to read/write the compiled workflow next to the XML file
+    :return: the CompiledWorkflow
+    """
+    if file_mode:
+        path = os.path.abspath(configuration)
+        st = os.stat(path)
+        known = _workflow_files.get(path)
+        if known is not None and known[0] == st.st_mtime_ns and known[1] == st.st_size \
+                and known[2] in _compiled_workflows:
+            return _compiled_workflows[known[2]]
+        with open(path, 'rb') as f:
+            content = f.read()
+    else:
+        content = configuration.encode('utf-8') if isinstance(configuration, str) else configuration
+
+    content_hash = hashlib.sha1(content).hexdigest()
+    if file_mode:
+        _workflow_files[path] = (st.st_mtime_ns, st.st_size, content_hash)
+    if content_hash in _compiled_workflows:
+        return _compiled_workflows[content_hash]
+
+    compiled = None
+    if file_mode and persist_compiled and os.path.exists(path + '.compiled'):
+        with open(path + '.compiled', 'rb') as f:
+            compiled = CompiledWorkflow.loads(f.read(), content_hash)
+
+    if compiled is None:
+        compiled = compile_workflow_configuration(minidom.parseString(content), content_hash)
+        if file_mode and persist_compiled:
+            # write to a temporary file and then rename it, so that concurrent processes never read a partial file
+            tmp = path + '.compiled.' + str(os.getpid())
+            try:
+                with open(tmp, 'wb') as f:
+                    f.write(compiled.dumps())
+                os.replace(tmp, path + '.compiled')
+            except OSError as exc:
+                print('Warning: could not save the compiled workflow ' + path + '.compiled: ' + str(exc))
+
+    _compiled_workflows[content_hash] = compiled
+    return compiled
+
+
+def clear_workflow_cache():
+    """Empties the process-level cache of the compiled workflows"""
+    _compiled_workflows.clear()
+    _workflow_files.clear()
+    _step_classes.clear()
+
+
+_step_classes = {}
+"""Cache of the step classes already loaded by create_instance, keyed by (module name, class name)"""
+
 
 def create_instance(moduleName, classname):
     """
@@ -870,6 +1638,21 @@ def create_instance(moduleName, classname):
     :param classname: the class name (e.g EvapotranspirationPotential)
     :return: the instance of the Step
     """
+    m = _step_classes.get((moduleName, classname))
+    if m is not None:
+        return m()
+    m = load_step_class(moduleName, classname)
+    _step_classes[(moduleName, classname)] = m
+    return m()  # create and return the instance of the loaded type
+
+
+def load_step_class(moduleName, classname):
+    """
+    Load and return the class of a Step, given the step module name and the class name. If the type loaded is not a valid Step implementation, an exception will be raised
+    :param moduleName: the module name (e.g. ecrops.wofost.evapotranspirationPotential)
+    :param classname: the class name (e.g EvapotranspirationPotential)
+    :return: the class of the Step
+    """
     moduleParts = moduleName.split('.')
     moduleName = moduleParts[0]
     moduleLoaded = importlib.import_module(moduleName)
@@ -882,4 +1665,4 @@ def create_instance(moduleName, classname):
     # check the loaded type is implementation of abstract class step. Otherwise throw an error
     if not (issubclass(m, Step.Step)):
         raise Exception("Class " + classname + " is not a valid implementation of Step")
-    return m()  # create and return the instance of the loaded type
+    return m
@@ -1,6 +1,44 @@
 import logging
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 1000
+"""Default number of locations of the batches of simulation units returned by AbstractDataLoader.iter_units"""
+
+
+class SimulationUnitsBatch:
+    """
+    A batch of simulation units returned by AbstractDataLoader.iter_units: the input data of a range of locations, in
+    arrays having the same dimensions of the arrays returned by the data loader methods, with only the locations of the
+    batch on the locations dimension
+    """
+
+    locationIds = None
+    """Indexes of the locations of the batch in the arrays of the whole domain (numpy array)"""
+
+    dailyData = None
+    """Daily data of the locations: NUM_SEASONS x NUM_BATCH_LOCATIONS x NUM_DAYS X NUM_DAILY_VARIABLES"""
+
+    locationData = None
+    """Location data: NUM_CROPS x NUM_SEASONS x NUM_BATCH_LOCATIONS x NUM_LOCATION_VARIABLES"""
+
+    cropLocationData = None
+    """Crop location data: NUM_CROPS x NUM_SEASONS x NUM_BATCH_LOCATIONS x NUM_CROP_LOCATION_VARIABLES"""
+
+    soilData = None
+    """Soil data: NUM_BATCH_LOCATIONS x NUM_SOIL_PER_LOCATION, NUM_LAYERS x NUM_SOIL_VARIABLES"""
+
+    def __init__(self, locationIds, dailyData, locationData, cropLocationData, soilData):
+        self.locationIds = locationIds
+        self.dailyData = dailyData
+        self.locationData = locationData
+        self.cropLocationData = cropLocationData
+        self.soilData = soilData
+
+    def __len__(self):
+        return len(self.locationIds)
+
 
 class AbstractDataLoader(ABC):
     """Abstract representation of a data loader class"""
@@ -77,8 +115,56 @@ class AbstractDataLoader(ABC):
         """return a dictionary containing other auxiliary variables"""
         pass
 
+    def iter_units(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Iterates the simulation units in batches of at most chunk_size locations: yields SimulationUnitsBatch objects,
+        with the daily data, the location data, the crop location data and the soil data of the locations of the batch
+        and the indexes of the locations. The variables order, the crop parameters and the other variables are the
+        same for all the batches (see getDailyDataVariables, getLocationDataOrder, getCropLocationDataOrder,
+        getSoilDataOrder, getCropParameters and getOtherVariables).
+
+        This default implementation is an adapter for the data loaders implementing only the array methods: it calls
+        getDailyData, getLocationData, getCropLocationData and getSoilData once and yields views of the arrays, so it
+        does not reduce the memory used by the data loader. A data loader reading the data of a large domain should
+        override this method, reading from the data source only the locations of a batch at a time, so that the
+        memory used depends on chunk_size and not on the size of the domain.
+        """
+        dailyData = self.getDailyData()
+        locationData = self.getLocationData()
+        cropLocationData = self.getCropLocationData()
+        try:
+            soilData = self.getSoilData()
+        except AttributeError:
+            # the data loaders without soil data do not set the soilData property
+            soilData = None
+        numberOfLocations = get_number_of_locations(dailyData, locationData)
+        for first in range(0, numberOfLocations, chunk_size):
+            last = min(first + chunk_size, numberOfLocations)
+            yield SimulationUnitsBatch(np.arange(first, last),
+                                       slice_locations(dailyData, 1, first, last),
+                                       slice_locations(locationData, 2, first, last),
+                                       slice_locations(cropLocationData, 2, first, last),
+                                       slice_locations(soilData, 0, first, last))
+
     @property
     def logger(self):
         loggername = "%s.%s" % (self.__class__.__module__,
                                 self.__class__.__name__)
         return logging.getLogger(loggername)
+
+
+def get_number_of_locations(dailyData, locationData):
+    """Returns the number of locations of the arrays returned by getDailyData or getLocationData"""
+    if isinstance(dailyData, np.ndarray) and dailyData.ndim > 1:
+        return dailyData.shape[1]
+    if isinstance(locationData, np.ndarray) and locationData.ndim > 2:
+        return locationData.shape[2]
+    return 0
+
+
+def slice_locations(data, axis, first, last):
+    """Returns the view of the locations from first to last (excluded) of an array, having the locations on the given
+    axis. The values that are not arrays with the locations axis (e.g. None) are returned unchanged"""
+    if not isinstance(data, np.ndarray) or data.ndim <= axis:
+        return data
+    return data[(slice(None),) * axis + (slice(first, last),)]
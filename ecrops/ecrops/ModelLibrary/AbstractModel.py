@@ -2,6 +2,7 @@ import logging
 import os
 from abc import ABC, abstractmethod
 from ecrops.ModelEngine import ModelEngine
+from ecrops.ModelLibrary.AbstractDataLoader import DEFAULT_CHUNK_SIZE
 import pandas as pd
 
 
@@ -107,6 +108,35 @@ class AbstractModel(ABC):
         """
         pass
 
+    def runUnits(self, dataLoader, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Runs the simulation cycle on the simulation units of a data loader, a batch of locations at a time, so that
+        only the input data of a batch are in memory (if the data loader reads them by batch, see
+        AbstractDataLoader.iter_units). For every batch, runCycle is called with the input data of the batch: the
+        arrays have the same dimensions of the arrays of the whole domain, with only the locations of the batch.
+        Yields a tuple (batch, result of runCycle) for every batch: batch.locationIds are the indexes of the locations
+        in the whole domain.
+
+        Arguments:
+
+        :param dataLoader: the data loader, an implementation of AbstractDataLoader
+        :param chunk_size: the maximum number of locations of a batch
+        """
+        dailyDataVariables = dataLoader.getDailyDataVariables()
+        otherVariables = dataLoader.getOtherVariables()
+        cropLocationDataOrder = dataLoader.getCropLocationDataOrder()
+        locationDataOrder = dataLoader.getLocationDataOrder()
+        try:
+            soilDataOrder = dataLoader.getSoilDataOrder()
+        except AttributeError:
+            # the data loaders without soil data do not set the soilDataOrder property
+            soilDataOrder = None
+        cropParameters = dataLoader.getCropParameters()
+        for batch in dataLoader.iter_units(chunk_size):
+            result = self.runCycle(batch.dailyData, dailyDataVariables, batch.locationData, batch.cropLocationData,
+                                   batch.soilData, otherVariables, cropLocationDataOrder, locationDataOrder,
+                                   soilDataOrder, cropParameters)
+            yield batch, result
+
     @abstractmethod
     def getOutputFileName(self, args):
         """
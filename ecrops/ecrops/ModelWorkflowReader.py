@@ -12,6 +12,10 @@ class ModelWorkflowReader():
     if an input variable X of a step A is an output of a step B, then a directed edge between the two steps is built. The direction of the edge is from B to A, and the label of the step is X, the name of the variable.
 
     The equality of the variables is based on the property 'StatusVariable' defined in each step's getinputslist and getoutputslist methods.
+    The connections are derived from an inverted index StatusVariable -> producers (steps declaring it as output) and
+    consumers (steps declaring it as input), built once reading the declarations of every step (see
+    build_status_variables_index): the index is also available to other analyses through the get_index, get_producers
+    and get_consumers methods.
 
     The display_graph method triggers the creation of the graph by the configured graph builders. The nature of final graph depends on the builder implementation.
     """
@@ -22,6 +26,7 @@ class ModelWorkflowReader():
         :param abstractGraphBuilders:
         """
         self.keys = dict()
+        self.index = None
         self.abstractGraphBuilders = abstractGraphBuilders
         print('Start creation of workflow graph. Initialization of configured graph builders:' + str(
             abstractGraphBuilders))
@@ -40,6 +45,7 @@ class ModelWorkflowReader():
         """
         class_name = type(step_instance).__name__
         self.keys[class_name] = step_instance
+        self.index = None
 
         # Get parameters from class instances if the class implements the required method
         step_parameters_dict = {}
@@ -55,16 +61,71 @@ class ModelWorkflowReader():
 
     def add_all_connections(self):
         """
-        Adds all the connections between the steps
+        Adds all the connections between the steps. The connections are derived from the index of the status variables
+        (see get_index): for every variable, an edge goes from each step producing it to each step consuming it, so
+        the cost is proportional to the number of connections and not to the number of pairs of steps. The edges are
+        passed to the graph builders in the same order of the pairs of steps explored by add_connection.
         :return:
         """
         print('Adding connections between nodes to workflow graph')
-        my_list = self.keys
-        couples = self.get_unique_pairs(my_list)
-        for c in couples:
-            self.add_connection(c[0], c[1])
-        for k in my_list.keys():
-            self.add_connection(k, k, selfConnection=True)
+        index = self.get_index()
+        # number of distinct input and output variables of every step: as in the intersection of the sets of
+        # add_connection, the names of the common variables are the ones of the smaller side (the outputs if equal)
+        input_counts = dict()
+        output_counts = dict()
+        for producers, consumers in index.values():
+            for step_name in set(p[0] for p in producers):
+                output_counts[step_name] = output_counts.get(step_name, 0) + 1
+            for step_name in set(c[0] for c in consumers):
+                input_counts[step_name] = input_counts.get(step_name, 0) + 1
+
+        edges = dict()
+        for statusVariable, (producers, consumers) in index.items():
+            for producer, outputName in producers:
+                for consumer, inputName in consumers:
+                    name = outputName if output_counts[producer] <= input_counts[consumer] else inputName
+                    # the first declaration of the variable is used, as in the sets of add_connection
+                    edges.setdefault((producer, consumer), dict()).setdefault(statusVariable, name)
+
+        # order of the pairs of get_unique_pairs: for the pair (A, B) first the edge B -> A, then A -> B, then the
+        # self connections
+        position = {name: i for i, name in enumerate(self.keys)}
+
+        def edge_order(edge):
+            producer, consumer = edge
+            if producer == consumer:
+                return (1, position[producer], 0, 0)
+            first, second = sorted((position[producer], position[consumer]))
+            return (0, first, second, 0 if position[producer] > position[consumer] else 1)
+
+        for producer, consumer in sorted(edges, key=edge_order):
+            common_variables = [StatusVariableElement((name, {'StatusVariable': statusVariable})) for
+                                statusVariable, name in edges[(producer, consumer)].items()]
+            for gb in self.abstractGraphBuilders:
+                gb.addEdge(producer, consumer, common_variables)
+
+    def get_index(self):
+        """
+        Returns the index of the status variables of the added steps (see build_status_variables_index). The index is
+        built at the first call and rebuilt only when other steps are added.
+        """
+        if self.index is None:
+            self.index = build_status_variables_index(self.keys)
+        return self.index
+
+    def get_producers(self, status_variable):
+        """
+        Returns the list of tuples (step name, variable name) of the steps declaring the status variable (e.g.
+        'status.states.LAI') as output
+        """
+        return self.get_index().get(status_variable, ([], []))[0]
+
+    def get_consumers(self, status_variable):
+        """
+        Returns the list of tuples (step name, variable name) of the steps declaring the status variable (e.g.
+        'status.states.LAI') as input
+        """
+        return self.get_index().get(status_variable, ([], []))[1]
 
     def add_connection(self, from_step, to_step, reverse=True, selfConnection=False):
         """
@@ -88,24 +149,8 @@ class ModelWorkflowReader():
                     return
 
                 # Add connections based on common inputs and outputs. The equality of two variables is based on the 'StatusVariable' attribute
-                class Element:
-                    def __init__(self, v):
-                        self.v = v
-                        if len(self.v) < 2 or 'StatusVariable' not in self.v[1]:
-                            raise Exception('Variable ' + str(
-                                self.v[0]) + ' does not have the StatusVariable attribute properly set')
-
-                    def __eq__(self, other):
-                        return self.v[1]['StatusVariable'] == other.v[1]['StatusVariable']
-
-                    def __hash__(self):
-                        return hash(self.v[1]['StatusVariable'])
-
-                    def getname(self):
-                        return self.v[0]
-
-                i = [Element(myob) for myob in list(from_inputs.items())]
-                o = [Element(myob) for myob in list(to_outputs.items())]
+                i = [StatusVariableElement(myob) for myob in list(from_inputs.items())]
+                o = [StatusVariableElement(myob) for myob in list(to_outputs.items())]
 
                 # intersect the two lists
                 common_variables = set(i) & set(o)
@@ -135,3 +180,53 @@ class ModelWorkflowReader():
         print('Start displaying workflow graph using the configured graph builders')
         for gb in self.abstractGraphBuilders:
             gb.finalize(config_file,runMode)
+
+
+class StatusVariableElement:
+    """
+    A variable declared by getinputslist or getoutputslist, as item (name, attributes) of the dictionary. Two elements
+    are equal if they have the same 'StatusVariable' attribute. These are the elements of the common variables passed
+    to the graph builders.
+    """
+
+    def __init__(self, v):
+        self.v = v
+        if len(self.v) < 2 or 'StatusVariable' not in self.v[1]:
+            raise Exception('Variable ' + str(
+                self.v[0]) + ' does not have the StatusVariable attribute properly set')
+
+    def __eq__(self, other):
+        return self.v[1]['StatusVariable'] == other.v[1]['StatusVariable']
+
+    def __hash__(self):
+        return hash(self.v[1]['StatusVariable'])
+
+    def getname(self):
+        return self.v[0]
+
+
+def build_status_variables_index(steps):
+    """
+    Builds the inverted index of the status variables declared by the steps: a dictionary StatusVariable ->
+    (producers, consumers), where producers is the list of tuples (step name, variable name) of the steps declaring the
+    variable in getoutputslist and consumers the list of the steps declaring it in getinputslist. The declarations of
+    every step are read only once.
+
+    :param steps: dictionary step name -> step instance (in the order of the workflow)
+    :return: the index
+    """
+    index = dict()
+    for step_name, step_instance in steps.items():
+        if not hasattr(step_instance, 'getinputslist') or not hasattr(step_instance, 'getoutputslist'):
+            print(f"Warning: step '{step_name}' does not implement the required methods 'getinputslist' and 'getoutputslist'.")
+            continue
+        inputs = step_instance.getinputslist()
+        outputs = step_instance.getoutputslist()
+        for position, variables in ((1, inputs), (0, outputs)):
+            if variables is None:
+                continue
+            for item in variables.items():
+                element = StatusVariableElement(item)
+                index.setdefault(element.v[1]['StatusVariable'], ([], []))[position].append(
+                    (step_name, element.getname()))
+    return index
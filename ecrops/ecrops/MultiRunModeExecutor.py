@@ -0,0 +1,374 @@
+""" Class MultiRunModeExecutor, used to run all the run modes of a workflow together sharing the common steps """
+import numbers
+import sys
+import traceback
+
+from ecrops.ModelEngine import ModelEngine
+from ecrops.Printable import Printable
+
+
+class MultiRunModeExecutor:
+    """
+    The MultiRunModeExecutor class runs more run modes of the same ModelEngine together, day by day. The run modes of a
+    workflow often start with the same steps (for example weather, co2 data and the links to the crop model steps)
+    and differ only in the last steps (for example potential and water limited runs). The executor detects this
+    common prefix of steps and runs it only once per day, in the first run mode (the 'leader'), then copies the
+    outputs of the prefix steps to the status of the other run modes and runs only the remaining steps of each run mode.
+
+    The common prefix is made by the first steps that have the same class (and the same 'precrop' attribute) in all the
+    run modes. To be shared, the prefix steps must be deterministic functions of the inputs they declare: the prefix
+    is cut at the first step that declares as input a status variable that is declared as output by one of the
+    remaining steps of any run mode (for example a step that reads the crop states to calculate the water balance).
+    Only the outputs declared in getoutputslist (and not written also by the remaining steps) are copied to the other
+    run modes, and only when the prefix steps assign them a new object: variables set once in the initialize method
+    (e.g. soil layers lists) remain the ones created by each run mode.
+
+    If validate is True, every run mode is also run independently (with a separate ModelEngine, created from the same
+    workflow) and, at the end of every day and in the finalize method, the output variables of the shared run are
+    compared with the ones of the independent run: an exception is raised at the first different value. The
+    validation mode is meant to check new workflows, since it doubles the execution time.
+
+    Usage is the same of the ModelEngine, but using a dictionary of statuses (one per run mode):
+
+    - executor = MultiRunModeExecutor(model)
+    - statuses = executor.initialize(timedependantvariables, timeDependantVariableColumn, drivingVariables,
+      allparameters, first_day, simulation_start_day, simulation_end_day)
+    - for each simulation cycle: statuses = executor.executeStep(statuses)
+    - results = executor.finalize(statuses) : a dictionary containing the result of ModelEngine.finalize per run mode
+    """
+
+    modelEngine = None
+    """The ModelEngine whose run modes are executed"""
+
+    runModes = None
+    """The list of run modes to execute. The first one is the leader, that runs the shared steps"""
+
+    validate = False
+    """If True, the output variables are compared every day with the ones of an independent run of each run mode"""
+
+    sharedStepsNumber = 0
+    """Number of steps at the beginning of every run mode that are run only once per day, by the leader run mode"""
+
+    sharedOutputs = None
+    """List of the outputs of the shared steps copied from the leader status to the other statuses. Each item is a
+    tuple (parent attributes, attribute name), e.g. (('weather',), 'RAIN') for status.weather.RAIN"""
+
+    sharedContainers = None
+    """List of the status attributes (e.g. 'weather') written only by the shared steps: these objects are shared by
+    reference between the leader status and the other statuses"""
+
+    referenceModelEngine = None
+    """The ModelEngine used to run the independent run modes in validation mode"""
+
+    def __init__(self, modelEngine, runModes=None, validate=False):
+        """Constructor: sets the ModelEngine and the run modes to execute (all the run modes of the workflow if
+        runModes is None) and detects the steps shared by all the run modes.
+        If validate is True, creates a second ModelEngine from the same workflow, used to run independently every run
+        mode and check that the results are the same."""
+        self.modelEngine = modelEngine
+        self.runModes = list(modelEngine.getRunModeNames() if runModes is None else runModes)
+        for runMode in self.runModes:
+            if modelEngine.getSteps2Run(runMode) is None:
+                raise Exception("Error creating the MultiRunModeExecutor. Run mode '" + str(runMode) + "' not found!")
+        self.validate = validate
+        self.sharedStepsNumber = self.getSharedStepsNumber()
+        self.sharedOutputs = self.getSharedOutputs()
+        self.sharedContainers = self.getSharedContainers()
+        # group the other shared outputs by parent object, to resolve every parent only once per copy
+        self._sharedOutputGroups = []
+        for parents, name in self.sharedOutputs:
+            if len(parents) > 0 and parents[0] in self.sharedContainers:
+                continue
+            group = next((g for g in self._sharedOutputGroups if g[0] == parents), None)
+            if group is None:
+                group = (parents, [])
+                self._sharedOutputGroups.append(group)
+            group[1].append(name)
+        self._sharedStepIds = {}
+        for runMode in self.runModes:
+            self._sharedStepIds[runMode] = set(id(s) for s in modelEngine.getSteps2Run(runMode)[:self.sharedStepsNumber])
+        self._lastSharedValues = {}
+        self._splitStepsCache = {}
+        if validate:
+            self.referenceModelEngine = ModelEngine(modelEngine.XmlWorkflowConfig, modelEngine.file_mode)
+            self.referenceModelEngine.ReturnDailyDetails = modelEngine.ReturnDailyDetails
+            self.referenceModelEngine.ReturnDekadalDetails = modelEngine.ReturnDekadalDetails
+
+    def getSharedStepsNumber(self):
+        """
+        Returns the number of steps at the beginning of the run modes that can be run only once per day for all the
+        run modes. It is 0 if less than two run modes are executed.
+        """
+        if len(self.runModes) < 2:
+            return 0
+
+        stepLists = [self.modelEngine.getSteps2Run(runMode) for runMode in self.runModes]
+        precropSets = []
+        for runMode in self.runModes:
+            precropSteps = self.modelEngine.getPreCropSteps2Run(runMode)
+            precropSets.append(None if precropSteps is None else set(id(s) for s in precropSteps))
+
+        # longest prefix of steps having the same class and the same precrop attribute in all the run modes
+        shared = min(len(steps) for steps in stepLists)
+        for i in range(shared):
+            first = stepLists[0][i]
+            leaderIsPrecrop = None if precropSets[0] is None else id(first) in precropSets[0]
+            for steps, precropSet in zip(stepLists[1:], precropSets[1:]):
+                isPrecrop = None if precropSet is None else id(steps[i]) in precropSet
+                if steps[i].__class__ is not first.__class__ or isPrecrop != leaderIsPrecrop:
+                    shared = i
+                    break
+            if shared == i:
+                break
+
+        # cut the prefix at the first step that depends on a variable written by the remaining steps.
+        # Cutting the prefix adds steps to the remaining ones, so repeat until the prefix does not change
+        while shared > 0:
+            restOutputs = self._getOutputs(stepLists, shared)
+            cut = shared
+            for i in range(shared):
+                if any(v["StatusVariable"] in restOutputs for v in stepLists[0][i].getinputslist().values()):
+                    cut = i
+                    break
+            if cut == shared:
+                break
+            shared = cut
+
+        return shared
+
+    def getSharedOutputs(self):
+        """
+        Returns the outputs of the shared steps, as a list of tuples (parent attributes, attribute name). The outputs
+        that are also written by the remaining steps, and the ones that are not simple attribute paths of status
+        (e.g. dictionary items), are not copied.
+        """
+        sharedOutputs = []
+        if self.sharedStepsNumber == 0:
+            return sharedOutputs
+        restOutputs = self._getOutputs([self.modelEngine.getSteps2Run(runMode) for runMode in self.runModes],
+                                       self.sharedStepsNumber)
+        for s in self.modelEngine.getSteps2Run(self.runModes[0])[:self.sharedStepsNumber]:
+            for v in s.getoutputslist().values():
+                if v["StatusVariable"] in restOutputs:
+                    continue
+                parts = v["StatusVariable"].split('.')
+                if parts[0] != 'status' or len(parts) < 2 or not all(p.isidentifier() for p in parts[1:]):
+                    continue
+                output = (tuple(parts[1:-1]), parts[-1])
+                if output not in sharedOutputs:
+                    sharedOutputs.append(output)
+        return sharedOutputs
+
+    def getSharedContainers(self):
+        """
+        Returns the names of the status attributes (e.g. 'weather' for status.weather) containing shared outputs that
+        are not written at all by the remaining steps. These objects are shared by reference with the other run modes,
+        instead of copying their attributes one by one.
+        """
+        containers = []
+        if self.sharedStepsNumber == 0:
+            return containers
+        restOutputs = self._getOutputs([self.modelEngine.getSteps2Run(runMode) for runMode in self.runModes],
+                                       self.sharedStepsNumber)
+        for parents, name in self.sharedOutputs:
+            if len(parents) == 0 or parents[0] in containers:
+                continue
+            prefix = 'status.' + parents[0]
+            if not any(v == prefix or v.startswith(prefix + '.') or v.startswith(prefix + '[') for v in restOutputs):
+                containers.append(parents[0])
+        return containers
+
+    def initialize(self, timedependantvariables, timeDependantVariableColumn, drivingVariables, allparameters,
+                   first_day, simulation_start_day, simulation_end_day):
+        """
+        Initializes one status for each run mode, by calling the ModelEngine.initialize method with the provided
+        arguments (see ModelEngine.initialize).
+
+        :returns: a dictionary containing the status of each run mode
+        """
+        statuses = {}
+        for runMode in self.runModes:
+            statuses[runMode] = self.modelEngine.initialize(timedependantvariables, timeDependantVariableColumn,
+                                                            drivingVariables, allparameters, first_day,
+                                                            simulation_start_day, simulation_end_day)
+        if self.validate:
+            self._referenceStatuses = {}
+            for runMode in self.runModes:
+                self._referenceStatuses[runMode] = self.referenceModelEngine.initialize(
+                    timedependantvariables, timeDependantVariableColumn, drivingVariables, allparameters, first_day,
+                    simulation_start_day, simulation_end_day)
+        return statuses
+
+    def executeStep(self, statuses):
+        """
+        Runs one day (status.day) of all the run modes. The shared steps are integrated and run only in the leader
+        run mode, then their outputs are copied to the other run modes and the remaining steps of every run mode are
+        integrated and run. Daily details are collected for every run mode as in ModelEngine.executeStep.
+
+        :param statuses: the dictionary containing the status of each run mode
+        :returns: the updated dictionary of statuses
+        """
+        engine = self.modelEngine
+        try:
+            leader = self.runModes[0]
+            leaderStatus = statuses[leader]
+            day = leaderStatus.day
+
+            # only the first day
+            if leaderStatus.simulation_start_day == day:
+                for runMode in self.runModes:
+                    statuses[runMode] = engine.initializeSteps(statuses[runMode], engine.getSteps2Run(runMode), runMode)
+                leaderStatus = statuses[leader]
+                # the shared containers are shared from the beginning, while the other values set in the
+                # initialization are not copied to the other run modes
+                self._lastSharedValues = {}
+                self._updateSharedValues(leaderStatus, [])
+                for name in self.sharedContainers:
+                    if hasattr(leaderStatus, name):
+                        for runMode in self.runModes[1:]:
+                            setattr(statuses[runMode], name, getattr(leaderStatus, name))
+
+            # run steps from start to end day
+            if leaderStatus.simulation_start_day <= day <= leaderStatus.simulation_end_day:
+                # the steps of the day are the pre-crop ones before the crop start event (see getDailySteps2Run)
+                leaderDailySteps = engine.getDailySteps2Run(leaderStatus, leader)
+                dailySharedSteps = self._splitSteps(leader, leaderDailySteps)[0]
+                if engine.profiler is not None:
+                    engine.profiler.phase = 'crop' if leaderDailySteps is engine.getSteps2Run(leader) else 'pre-crop'
+                dailyRestSteps = {}
+                for runMode in self.runModes:
+                    dailyRestSteps[runMode] = self._splitSteps(runMode,
+                                                               engine.getDailySteps2Run(statuses[runMode], runMode))[1]
+                followers = [statuses[runMode] for runMode in self.runModes[1:]]
+
+                if leaderStatus.simulation_start_day != day:  # at start day execute only the run step, without integration
+                    statuses[leader] = engine.integrateSteps(statuses[leader], dailySharedSteps, leader)
+                    self._updateSharedValues(statuses[leader], followers)
+                    for runMode in self.runModes:
+                        statuses[runMode] = engine.integrateSteps(statuses[runMode], dailyRestSteps[runMode], runMode)
+
+                statuses[leader] = engine.runSteps(statuses[leader], dailySharedSteps, leader)
+                self._updateSharedValues(statuses[leader], followers)
+                for runMode in self.runModes:
+                    statuses[runMode] = engine.runSteps(statuses[runMode], dailyRestSteps[runMode], runMode)
+
+            for runMode in self.runModes:
+                status = engine.collectDailyDetails(statuses[runMode], runMode)
+                # get next day, advancing the day index (status.day is derived from it)
+                status.day_index = status.day_index + 1
+                statuses[runMode] = status
+
+            if self.validate:
+                for runMode in self.runModes:
+                    self._referenceStatuses[runMode] = self.referenceModelEngine.executeStep(
+                        self._referenceStatuses[runMode], runMode)
+                    for oVar in engine.getOutputVariables(runMode) or []:
+                        self._checkValue(runMode, day, oVar.name,
+                                         engine.getDailyOutputValue(oVar, statuses[runMode]),
+                                         engine.getDailyOutputValue(oVar, self._referenceStatuses[runMode]))
+
+            return statuses
+        except Exception as exc:
+            print(("\nError executing the MultiRunModeExecutor.executeStep method. Error:" + str(exc)))
+            traceback.print_exc(limit=20, file=sys.stdout)
+            raise exc
+
+    def finalize(self, statuses, unit=None):
+        """
+        Calls ModelEngine.finalize for every run mode. In validation mode, the summary outputs are compared with the
+        ones of the independent runs.
+
+        :param statuses: the dictionary containing the status of each run mode
+        :param unit: optional dictionary with the identifiers of the simulated unit, passed to ModelEngine.finalize
+        :returns: a dictionary containing, for each run mode, the tuple returned by ModelEngine.finalize
+        """
+        results = {}
+        for runMode in self.runModes:
+            results[runMode] = self.modelEngine.finalize(statuses[runMode], runMode, unit)
+        if self.validate:
+            for runMode in self.runModes:
+                reference = self.referenceModelEngine.finalize(self._referenceStatuses[runMode], runMode)
+                names = self.modelEngine.getOutputVariablesNames(runMode) or []
+                for i in range(len(names)):
+                    self._checkValue(runMode, None, names[i], results[runMode][0][i], reference[0][i])
+        return results
+
+    def _splitSteps(self, runMode, steps):
+        """Splits a list of steps of the run mode in the shared steps and the remaining ones. The result is cached, since
+        the lists of steps returned by getDailySteps2Run are always the same objects"""
+        key = (runMode, id(steps))
+        if key not in self._splitStepsCache:
+            self._splitStepsCache[key] = ([s for s in steps if id(s) in self._sharedStepIds[runMode]],
+                                          [s for s in steps if id(s) not in self._sharedStepIds[runMode]])
+        return self._splitStepsCache[key]
+
+    @staticmethod
+    def _getOutputs(stepLists, start):
+        """Returns the set of the status variables declared as output by the steps from position 'start' on"""
+        outputs = set()
+        for steps in stepLists:
+            for s in steps[start:]:
+                outputs.update(v["StatusVariable"] for v in s.getoutputslist().values())
+        return outputs
+
+    def _updateSharedValues(self, leaderStatus, followers):
+        """Copies to the followers statuses the shared outputs that the leader has changed since the last copy"""
+        lastValues = self._lastSharedValues
+        leaderValues = leaderStatus.__dict__
+        for name in self.sharedContainers:
+            if name not in leaderValues:
+                continue
+            value = leaderValues[name]
+            if name in lastValues and lastValues[name] is value:
+                continue
+            lastValues[name] = value
+            for status in followers:
+                setattr(status, name, value)
+        for parents, names in self._sharedOutputGroups:
+            source = leaderStatus
+            for p in parents:
+                source = getattr(source, p, None)
+                if source is None:
+                    break
+            if source is None or not hasattr(source, '__dict__'):
+                continue
+            sourceValues = source.__dict__
+            targets = None
+            for name in names:
+                if name not in sourceValues:
+                    continue
+                value = sourceValues[name]
+                key = (parents, name)
+                if key in lastValues and lastValues[key] is value:
+                    continue
+                lastValues[key] = value
+                if targets is None:
+                    targets = [self._getTarget(status, parents) for status in followers]
+                for target in targets:
+                    target[name] = value
+
+    @staticmethod
+    def _getTarget(status, parents):
+        """Returns the attributes dictionary of the object status.parent1.parent2..., creating the missing parents"""
+        target = status
+        for p in parents:
+            if getattr(target, p, None) is None:
+                setattr(target, p, Printable())
+            target = getattr(target, p)
+        return target.__dict__
+
+    def _checkValue(self, runMode, day, name, value, reference):
+        """Raises an exception if the value of the shared run is different from the one of the independent run"""
+        if isinstance(value, numbers.Number) and isinstance(reference, numbers.Number):
+            same = value == reference or (value != value and reference != reference)  # nan == nan
+        else:
+            try:
+                same = bool(value == reference)
+            except Exception:
+                same = str(value) == str(reference)
+        if not same:
+            msg = "Error validating the MultiRunModeExecutor. Run mode '" + str(runMode) + "', " + \
+                  ("summary output" if day is None else "day " + str(day)) + ", variable '" + name + \
+                  "': shared run value " + str(value) + " is different from independent run value " + str(reference)
+            print(msg)
+            raise Exception(msg)
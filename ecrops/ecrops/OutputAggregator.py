@@ -0,0 +1,121 @@
+""" Class OutputAggregator, used by the ModelEngine to aggregate the daily values of the output variables by dekad or
+month while the simulation runs """
+import math
+import numbers
+
+import numpy as np
+
+AGGREGATES = ['sum', 'mean', 'min', 'max', 'last']
+"""Aggregation functions of the output variables (attribute 'aggregate' of the Output variables)"""
+
+PERIODS = ['dekad', 'month']
+"""Aggregation periods of the output variables (attribute 'period' of the Output variables): the dekads end the 10th,
+the 20th and the last day of the month"""
+
+
+class OutputAggregator:
+    """
+    The OutputAggregator class accumulates the daily values of the aggregated output variables of a run mode (the
+    Output variables having the attributes 'aggregate' and 'period', see ModelEngine.getAggregatedOutputVariables).
+    For every variable only the accumulators of the current period are kept (sum, number of values, minimum, maximum,
+    last value): at the end of the period the aggregated value is appended to the results of the period and the
+    accumulators are reset. The memory used does not depend on the number of days of the period.
+    The aggregator is created by ModelEngine.collectDailyDetails and saved in the status (status.outputaggregator), the
+    results are returned by ModelEngine.finalize (see getResults).
+    """
+
+    def __init__(self, outputVariables):
+        """Constructor: outputVariables is the list of the aggregated output variables (OutputVariable objects)"""
+        self.periods = {}
+        for oVar in outputVariables:
+            self.periods.setdefault(oVar.period, []).append((oVar.name, oVar.aggregate))
+        self.results = {}
+        self.current = {}
+        for period, variables in self.periods.items():
+            self.results[period] = {'START': [], 'END': [], 'DAYS': []}
+            for name, aggregate in variables:
+                self.results[period][name] = []
+            self.current[period] = None
+
+    def _newPeriod(self, day, variables):
+        """Returns the accumulators of a new period starting at day: [start day, last day, number of days, and for every
+        variable [sum, count, min, max, last]]"""
+        return [day, day, 0, [[0.0, 0, None, None, None] for v in variables]]
+
+    def add(self, day, values, dekadEnd, monthEnd):
+        """
+        Adds the values of a day.
+
+        :param day: the date
+        :param values: dictionary variable name -> value of the day
+        :param dekadEnd: True if the day is the last day of a dekad
+        :param monthEnd: True if the day is the last day of a month
+        """
+        for period, variables in self.periods.items():
+            current = self.current[period]
+            if current is None:
+                current = self._newPeriod(day, variables)
+                self.current[period] = current
+            current[1] = day
+            current[2] += 1
+            for (name, aggregate), accumulator in zip(variables, current[3]):
+                value = values[name]
+                accumulator[4] = value
+                if isinstance(value, numbers.Number) and not isinstance(value, bool) and not math.isnan(value):
+                    accumulator[0] += value
+                    accumulator[1] += 1
+                    if accumulator[2] is None or value < accumulator[2]:
+                        accumulator[2] = value
+                    if accumulator[3] is None or value > accumulator[3]:
+                        accumulator[3] = value
+            if (dekadEnd and period == 'dekad') or (monthEnd and period == 'month'):
+                self._closePeriod(period)
+
+    def _closePeriod(self, period):
+        """Appends the aggregated values of the current period to the results and starts a new period"""
+        self._appendPeriod(self.results[period], period, self.current[period])
+        self.current[period] = None
+
+    def _appendPeriod(self, results, period, current):
+        """Appends the aggregated values of the period accumulators to the results"""
+        results['START'].append(current[0])
+        results['END'].append(current[1])
+        results['DAYS'].append(current[2])
+        for (name, aggregate), accumulator in zip(self.periods[period], current[3]):
+            results[name].append(aggregateValue(aggregate, accumulator))
+
+    def getResults(self):
+        """
+        Returns the aggregated values: a dictionary period -> dictionary containing the lists 'START' and 'END' (first
+        and last day of every period), 'DAYS' (number of simulated days of every period) and, for every variable, the
+        numpy array of the aggregated values (a list if the values are not numbers). The last period is included also
+        if it is not complete. The aggregator is not modified, so the simulation can continue.
+        """
+        results = {}
+        for period, periodResults in self.results.items():
+            periodResults = {k: list(v) for k, v in periodResults.items()}
+            if self.current[period] is not None:
+                self._appendPeriod(periodResults, period, self.current[period])
+            for name, aggregate in self.periods[period]:
+                values = periodResults[name]
+                if all(v is None or isinstance(v, numbers.Number) for v in values):
+                    periodResults[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+            results[period] = periodResults
+        return results
+
+
+def aggregateValue(aggregate, accumulator):
+    """Returns the aggregated value from the accumulator [sum, count, min, max, last]. The numeric aggregates of a
+    period without numeric values are None"""
+    total, count, minimum, maximum, last = accumulator
+    if aggregate == 'last':
+        return last
+    if count == 0:
+        return None
+    if aggregate == 'sum':
+        return total
+    if aggregate == 'mean':
+        return total / count
+    if aggregate == 'min':
+        return minimum
+    return maximum
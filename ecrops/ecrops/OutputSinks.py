@@ -0,0 +1,353 @@
+""" Output sinks of the daily details: buffered writers of the daily details of many simulation units to CSV, Parquet
+or NetCDF files """
+import csv
+import datetime
+import math
+import numbers
+import os
+import re
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# the pyarrow package is needed only by the ParquetOutputSink
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# the netCDF4 package is needed only by the NetCDFOutputSink
+try:
+    from netCDF4 import Dataset
+except ImportError:
+    Dataset = None
+
+DEFAULT_BUFFER_ROWS = 100000
+"""Default number of rows kept in memory by the sinks before writing them to the file"""
+
+LAYOUT_WIDE = 'wide'
+"""Layout of the tables with one column per variable of the daily details, and one row per day"""
+
+LAYOUT_LONG = 'long'
+"""Layout of the tables with one row per day and variable of the daily details (see LONG_COLUMNS)"""
+
+LONG_COLUMNS = ['DAY', 'DOY', 'VARIABLE', 'VALUE']
+"""Columns of the daily details in the long layout"""
+
+RUN_MODE_COLUMN = 'RUN_MODE'
+"""Unit identifier column of the run mode"""
+
+
+class OutputTable:
+    """A table written by an output sink: the rows of the run modes having the same columns"""
+
+    fileName = ''
+    """Path of the file of the table"""
+
+    columns = None
+    """Names of the columns of the daily details (after the unit identifier columns)"""
+
+    rowsWritten = 0
+    """Number of rows written to the file"""
+
+    handle = None
+    """Object used by the sink to write the file (e.g. the open file), None before the first block"""
+
+    def __init__(self, fileName, unitColumns, columns):
+        self.fileName = fileName
+        self.columns = columns
+        self.rowsWritten = 0
+        self.handle = None
+        self.buffer = {c: [] for c in unitColumns + columns}
+        self.bufferedRows = 0
+
+
+class OutputSink(ABC):
+    """
+    Base class of the output sinks. A sink receives the daily details of the simulation units (the dictionary
+    status.dailydetails, see ModelEngine.finalize) and writes them to files as tables: the columns are the unit
+    identifier columns (e.g. the grid cell coordinates and the run mode) followed by the columns of the daily details.
+    The rows are kept in a buffer and written to the file in blocks of bufferRows rows, so that a single sink can be
+    shared by all the units simulated by a process (and by all the ModelEngine objects of a process) without opening
+    the file for every unit:
+
+    - sink = CsvOutputSink('details.csv', unitColumns=['X', 'Y', 'RUN_MODE'])
+    - model.DailyDetailsSink = sink
+    - for every unit: ... model.finalize(status, runMode, unit={'X': x, 'Y': y})
+    - sink.close()
+
+    In the wide layout (default) the columns of the daily details are DAY, DOY and the output variables, and they are
+    fixed for every run mode (the RUN_MODE value of the unit) by its first write: the values of the columns missing in
+    the next writes are empty, while a write with a new column raises an exception. The run modes having the columns
+    of the first run mode written are written to fileName, every run mode with different columns (e.g. POT_* and WL_*
+    variables) to its own file, named adding the run mode to fileName (see getFileName).
+    In the long layout all the units are written to fileName, with the columns DAY, DOY, VARIABLE and VALUE: one row
+    per day and output variable.
+    The subclasses implement the methods writeBlock and closeFile.
+    """
+
+    fileName = ''
+    """Path of the output file"""
+
+    unitColumns = None
+    """Names of the unit identifier columns, the first columns of the tables. The values are taken from the unit
+    dictionary passed to the write method (the values missing in the dictionary are empty)"""
+
+    layout = LAYOUT_WIDE
+    """Layout of the tables: LAYOUT_WIDE or LAYOUT_LONG"""
+
+    tables = None
+    """Dictionary run mode -> OutputTable of the run mode (the key is None in the long layout)"""
+
+    bufferRows = DEFAULT_BUFFER_ROWS
+    """Number of rows kept in memory before writing them to the file"""
+
+    rowsWritten = 0
+    """Number of rows written to the files"""
+
+    def __init__(self, fileName, unitColumns=None, bufferRows=DEFAULT_BUFFER_ROWS, layout=LAYOUT_WIDE):
+        """Constructor: fileName is the path of the output file, unitColumns the list of the names of the unit
+        identifier columns (default ['RUN_MODE']), bufferRows the number of rows written to the file at a time, layout
+        the layout of the tables (LAYOUT_WIDE or LAYOUT_LONG)"""
+        if layout not in (LAYOUT_WIDE, LAYOUT_LONG):
+            msg = 'Unknown layout ' + str(layout) + ' of the output sink: use ' + LAYOUT_WIDE + ' or ' + LAYOUT_LONG
+            print(msg)
+            raise Exception(msg)
+        self.fileName = fileName
+        self.unitColumns = list(unitColumns) if unitColumns is not None else [RUN_MODE_COLUMN]
+        self.bufferRows = bufferRows
+        self.layout = layout
+        self.tables = {}
+        self.rowsWritten = 0
+
+    def getFileName(self, runMode):
+        """Returns the path of the file of the run mode having columns different from the ones of the first run mode
+        written: fileName with '_' and the run mode added before the extension (e.g. details_WaterLimited.csv)"""
+        root, extension = os.path.splitext(self.fileName)
+        return root + '_' + re.sub(r'[^\w.-]', '_', str(runMode)) + extension
+
+    def getTable(self, runMode, columns):
+        """Returns the table of the run mode, creating it at the first write of the run mode: the table of another
+        run mode if it has the same columns, otherwise a new table"""
+        table = self.tables.get(runMode)
+        if table is None:
+            table = next((t for t in self.tables.values() if t.columns == columns), None)
+            if table is None:
+                fileName = self.fileName if len(self.tables) == 0 else self.getFileName(runMode)
+                table = OutputTable(fileName, self.unitColumns, columns)
+            self.tables[runMode] = table
+        else:
+            newColumns = [c for c in columns if c not in table.columns]
+            if len(newColumns) > 0:
+                raise Exception('The columns ' + ', '.join(newColumns) + ' are not in the output file ' + str(
+                    table.fileName) + ' (columns ' + ', '.join(table.columns) + ')')
+        return table
+
+    def write(self, dailyDetails, unit=None):
+        """
+        Adds the daily details of a unit to the buffer of its table, writing the buffer to the file when it is full.
+
+        :param dailyDetails: the daily details dictionary (column name -> list of the daily values)
+        :param unit: dictionary unit identifier column -> value of the unit
+        """
+        if dailyDetails is None or len(dailyDetails) == 0:
+            return
+        unit = unit or {}
+        if self.layout == LAYOUT_LONG:
+            dailyDetails = toLongLayout(dailyDetails)
+            table = self.getTable(None, LONG_COLUMNS)
+        else:
+            table = self.getTable(unit.get(RUN_MODE_COLUMN), list(dailyDetails.keys()))
+
+        rows = max(len(v) for v in dailyDetails.values())
+        if rows == 0:
+            return
+        for c in self.unitColumns:
+            table.buffer[c].extend([unit.get(c)] * rows)
+        for c in table.columns:
+            values = dailyDetails.get(c, [])
+            table.buffer[c].extend(values)
+            if len(values) < rows:
+                table.buffer[c].extend([None] * (rows - len(values)))
+        table.bufferedRows += rows
+        if table.bufferedRows >= self.bufferRows:
+            self.flushTable(table)
+
+    def flushTable(self, table):
+        """Writes the buffered rows of the table to its file"""
+        if table.bufferedRows == 0:
+            return
+        self.writeBlock(table, table.buffer, table.bufferedRows)
+        table.rowsWritten += table.bufferedRows
+        self.rowsWritten += table.bufferedRows
+        table.buffer = {c: [] for c in table.buffer}
+        table.bufferedRows = 0
+
+    def flush(self):
+        """Writes the buffered rows of all the tables to the files"""
+        for table in self.getDistinctTables():
+            self.flushTable(table)
+
+    def close(self):
+        """Writes the buffered rows and closes the files"""
+        self.flush()
+        for table in self.getDistinctTables():
+            self.closeFile(table)
+
+    def getDistinctTables(self):
+        """Returns the list of the tables, without repetitions (more run modes can share a table)"""
+        tables = []
+        for table in self.tables.values():
+            if all(t is not table for t in tables):
+                tables.append(table)
+        return tables
+
+    @abstractmethod
+    def writeBlock(self, table, block, rows):
+        """Writes a block of rows to the file of the table: block is the dictionary column name -> list of the values
+        (unit columns first)"""
+        pass
+
+    @abstractmethod
+    def closeFile(self, table):
+        """Closes the file of the table"""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.close()
+
+
+class CsvOutputSink(OutputSink):
+    """
+    Writes the daily details to a CSV file. The file is created at the first block (or, if append is True and the file
+    exists, the rows are appended to it without writing the header again). Empty values are written as empty fields.
+    """
+
+    def __init__(self, fileName, unitColumns=None, bufferRows=DEFAULT_BUFFER_ROWS, append=False, delimiter=',',
+                 layout=LAYOUT_WIDE):
+        """Constructor: see OutputSink. If append is True the rows are appended to the existing files"""
+        OutputSink.__init__(self, fileName, unitColumns, bufferRows, layout)
+        self.append = append
+        self.delimiter = delimiter
+
+    def writeBlock(self, table, block, rows):
+        if table.handle is None:
+            writeHeader = not (self.append and os.path.exists(table.fileName) and os.path.getsize(table.fileName) > 0)
+            f = open(table.fileName, mode='a' if self.append else 'w', newline='')
+            table.handle = (f, csv.writer(f, delimiter=self.delimiter, quotechar='"', quoting=csv.QUOTE_MINIMAL,
+                                          lineterminator='\n'))
+            if writeHeader:
+                table.handle[1].writerow(list(block.keys()))
+        table.handle[1].writerows(zip(*block.values()))
+
+    def closeFile(self, table):
+        if table.handle is not None:
+            table.handle[0].close()
+            table.handle = None
+
+
+class ParquetOutputSink(OutputSink):
+    """
+    Writes the daily details to a Parquet file, one row group per block. It requires the pyarrow package. The schema
+    of the file is inferred from the first block.
+    """
+
+    def __init__(self, fileName, unitColumns=None, bufferRows=DEFAULT_BUFFER_ROWS, compression='snappy',
+                 layout=LAYOUT_WIDE):
+        """Constructor: see OutputSink. compression is the compression codec of the Parquet files"""
+        if pyarrow is None:
+            raise Exception('The ParquetOutputSink requires the pyarrow package, which is not installed')
+        OutputSink.__init__(self, fileName, unitColumns, bufferRows, layout)
+        self.compression = compression
+
+    def writeBlock(self, table, block, rows):
+        if table.handle is None:
+            arrowTable = pyarrow.table(block)
+            table.handle = pyarrow.parquet.ParquetWriter(table.fileName, arrowTable.schema,
+                                                         compression=self.compression)
+        else:
+            arrowTable = pyarrow.table(block, schema=table.handle.schema_arrow)
+        table.handle.write_table(arrowTable)
+
+    def closeFile(self, table):
+        if table.handle is not None:
+            table.handle.close()
+            table.handle = None
+
+
+class NetCDFOutputSink(OutputSink):
+    """
+    Writes the daily details to a NetCDF file as one variable per column along the unlimited dimension 'row'. It
+    requires the netCDF4 package. The type of every variable is inferred from the first block: the numeric columns are
+    saved as float64 variables (empty values are NaN), the other columns (e.g. DAY and the run mode) as string
+    variables (dates in ISO format).
+    """
+
+    def __init__(self, fileName, unitColumns=None, bufferRows=DEFAULT_BUFFER_ROWS, description='',
+                 layout=LAYOUT_WIDE):
+        """Constructor: see OutputSink. description is saved as attribute of the files"""
+        if Dataset is None:
+            raise Exception('The NetCDFOutputSink requires the netCDF4 package, which is not installed')
+        OutputSink.__init__(self, fileName, unitColumns, bufferRows, layout)
+        self.description = description
+
+    def writeBlock(self, table, block, rows):
+        if table.handle is None:
+            dataset = Dataset(table.fileName, 'w', format='NETCDF4')
+            dataset.description = self.description
+            dataset.createDimension('row', None)
+            numeric = {}
+            for name, values in block.items():
+                numeric[name] = all(v is None or (isinstance(v, numbers.Number) and not isinstance(v, bool))
+                                    for v in values)
+                if numeric[name]:
+                    dataset.createVariable(name, 'f8', ('row',), zlib=True)
+                else:
+                    dataset.createVariable(name, str, ('row',))
+            table.handle = (dataset, numeric)
+        dataset, numeric = table.handle
+        start = table.rowsWritten
+        for name, values in block.items():
+            if numeric[name]:
+                dataset.variables[name][start:start + rows] = np.array([np.nan if v is None else v for v in values],
+                                                                       dtype=np.float64)
+            else:
+                dataset.variables[name][start:start + rows] = np.array([toText(v) for v in values], dtype=object)
+
+    def closeFile(self, table):
+        if table.handle is not None:
+            table.handle[0].close()
+            table.handle = None
+
+
+def toLongLayout(dailyDetails):
+    """Returns the daily details (column name -> list of the daily values) in the long layout: the columns DAY, DOY,
+    VARIABLE and VALUE, with the rows of every variable one after the other"""
+    days = dailyDetails.get('DAY', [])
+    doys = dailyDetails.get('DOY', [])
+    long = {c: [] for c in LONG_COLUMNS}
+    for name, values in dailyDetails.items():
+        if name in ('DAY', 'DOY'):
+            continue
+        rows = len(values)
+        long['DAY'].extend(days[:rows])
+        long['DAY'].extend([None] * (rows - len(days[:rows])))
+        long['DOY'].extend(doys[:rows])
+        long['DOY'].extend([None] * (rows - len(doys[:rows])))
+        long['VARIABLE'].extend([name] * rows)
+        long['VALUE'].extend(values)
+    return long
+
+
+def toText(value):
+    """Converts a value of the daily details to the text saved in the string variables (dates in ISO format, empty
+    values and NaN as empty strings)"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
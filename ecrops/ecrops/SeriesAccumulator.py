@@ -1,4 +1,7 @@
-class SeriesAccumulator:
+from ecrops.Step import Step
+
+
+class SeriesAccumulator(Step):
     """
     SeriesAccumulator is a step used to collect some particular output variables into arrays which are organized by
     variable, and not by day. In this step we accumulate variables of Wofost (LAI, roots) and water balance (Soil
@@ -57,8 +60,78 @@ class SeriesAccumulator:
 
         return status
 
-
-
     def integrate(self, status):
         """Does nothing"""
         return status
+
+    def getinputslist(self):
+        return {
+            "doy": {"Description": "Current day of the year", "Type": "Number", "UnitOfMeasure": "doy",
+                    "StatusVariable": "status.doy"},
+            "LAI": {"Description": "Leaf area index", "Type": "Number", "UnitOfMeasure": "ha/ha",
+                    "StatusVariable": "status.states.LAI"},
+            "TAGP": {"Description": "Total above-ground production", "Type": "Number", "UnitOfMeasure": "kg/ha",
+                     "StatusVariable": "status.states.TAGP"},
+            "ClassicSM": {"Description": "Volumetric soil moisture content in rooted zone (classic water balance)",
+                          "Type": "Number", "UnitOfMeasure": "cm3/cm3",
+                          "StatusVariable": "status.classicwaterbalance.states.SM"},
+            "ClassicSMUR": {"Description": "Volumetric soil moisture content in unrooted zone (classic water balance)",
+                            "Type": "Number", "UnitOfMeasure": "cm3/cm3",
+                            "StatusVariable": "status.classicwaterbalance.states.SMUR"},
+            "ClassicRD": {"Description": "Rooting depth (classic water balance)", "Type": "Number",
+                          "UnitOfMeasure": "cm", "StatusVariable": "status.classicwaterbalance.states.RD"},
+            "ClassicLOSS": {"Description": "Water loss to deeper soil (classic water balance)", "Type": "Number",
+                            "UnitOfMeasure": "cm/day", "StatusVariable": "status.classicwaterbalance.rates.LOSS"},
+            "ClassicRAIN": {"Description": "Precipitation (classic water balance)", "Type": "Number",
+                            "UnitOfMeasure": "cm/day", "StatusVariable": "status.classicwaterbalance.rates.RAIN"},
+            "ClassicEVS": {"Description": "Actual evaporation from soil (classic water balance)", "Type": "Number",
+                           "UnitOfMeasure": "cm/day", "StatusVariable": "status.classicwaterbalance.rates.EVS"},
+            "ClassicWTRA": {"Description": "Actual transpiration (classic water balance)", "Type": "Number",
+                            "UnitOfMeasure": "cm/day", "StatusVariable": "status.classicwaterbalance.rates.WTRA"},
+            "LayeredSOIL_LAYERS": {"Description": "Soil layers (layered water balance)", "Type": "Number",
+                                   "UnitOfMeasure": "-",
+                                   "StatusVariable": "status.layeredwaterbalance.parameters.SOIL_LAYERS"},
+            "LayeredRD": {"Description": "Rooting depth (layered water balance)", "Type": "Number",
+                          "UnitOfMeasure": "cm", "StatusVariable": "status.layeredwaterbalance.states.RD"},
+            "LayeredLOSS": {"Description": "Water loss to deeper soil (layered water balance)", "Type": "Number",
+                            "UnitOfMeasure": "cm/day", "StatusVariable": "status.layeredwaterbalance.rates.LOSS"},
+            "LayeredRAIN": {"Description": "Precipitation (layered water balance)", "Type": "Number",
+                            "UnitOfMeasure": "cm/day", "StatusVariable": "status.layeredwaterbalance.rates.RAIN"},
+            "LayeredEVS": {"Description": "Actual evaporation from soil (layered water balance)", "Type": "Number",
+                           "UnitOfMeasure": "cm/day", "StatusVariable": "status.layeredwaterbalance.rates.EVS"},
+            "LayeredWTRA": {"Description": "Actual transpiration (layered water balance)", "Type": "Number",
+                            "UnitOfMeasure": "cm/day", "StatusVariable": "status.layeredwaterbalance.rates.WTRA"},
+            "LayeredSR": {"Description": "Surface runoff (layered water balance)", "Type": "Number",
+                          "UnitOfMeasure": "cm/day", "StatusVariable": "status.layeredwaterbalance.rates.SR"},
+        }
+
+    def getoutputslist(self):
+        return {
+            "dailyValuesOfSM": {"Description": "Daily values [doy, soil moisture...] of soil moisture",
+                                "Type": "Number", "UnitOfMeasure": "cm3/cm3",
+                                "StatusVariable": "status.dailyValuesOfSM"},
+            "dailyValuesOfLOSS": {"Description": "Daily values [doy, value] of water loss to deeper soil",
+                                  "Type": "Number", "UnitOfMeasure": "cm/day",
+                                  "StatusVariable": "status.dailyValuesOfLOSS"},
+            "dailyValuesOfRAIN": {"Description": "Daily values [doy, value] of precipitation",
+                                  "Type": "Number", "UnitOfMeasure": "cm/day",
+                                  "StatusVariable": "status.dailyValuesOfRAIN"},
+            "dailyValuesOfEVAPOR": {"Description": "Daily values [doy, value] of evaporation from soil",
+                                    "Type": "Number", "UnitOfMeasure": "cm/day",
+                                    "StatusVariable": "status.dailyValuesOfEVAPOR"},
+            "dailyValuesOfTRAS": {"Description": "Daily values [doy, value] of transpiration",
+                                  "Type": "Number", "UnitOfMeasure": "cm/day",
+                                  "StatusVariable": "status.dailyValuesOfTRAS"},
+            "dailyValuesOfRUNOFF": {"Description": "Daily values [doy, value] of surface runoff",
+                                    "Type": "Number", "UnitOfMeasure": "cm/day",
+                                    "StatusVariable": "status.dailyValuesOfRUNOFF"},
+            "dailyValuesOfROOT": {"Description": "Daily values [doy, value] of rooting depth",
+                                  "Type": "Number", "UnitOfMeasure": "cm",
+                                  "StatusVariable": "status.dailyValuesOfROOT"},
+            "dailyValuesOfLAI": {"Description": "Daily values [doy, value] of leaf area index",
+                                 "Type": "Number", "UnitOfMeasure": "ha/ha",
+                                 "StatusVariable": "status.dailyValuesOfLAI"},
+            "dailyValuesOfTAGP": {"Description": "Daily values [doy, value] of total above-ground production",
+                                  "Type": "Number", "UnitOfMeasure": "kg/ha",
+                                  "StatusVariable": "status.dailyValuesOfTAGP"},
+        }
@@ -0,0 +1,127 @@
+""" Classes SimulationCalendar and ModelStatus, used by the ModelEngine to advance the simulation day as an integer
+index on calendar arrays computed once per simulation """
+import calendar
+from datetime import timedelta
+
+from ecrops.Printable import Printable
+
+
+class SimulationCalendar:
+    """
+    The SimulationCalendar class contains the calendar of the simulation window, from the first day to the simulation
+    end day, as arrays indexed by the day index (number of days from the first day): the dates, the days of the year,
+    the dekadal days (10th, 20th and last day of the month) and the last days of the
+    months. The arrays are computed once when the status is initialized, so that the engine and the steps do not
+    compute them every day. The days out of the window (e.g. when executeStep is called after the simulation end day)
+    are computed when requested.
+    """
+
+    first_day = None
+    """First day of the simulation (day index 0)"""
+
+    dates = None
+    """List of the dates of the window (same type of first_day)"""
+
+    doys = None
+    """List of the days of the year of the window (Jan 1st = 1)"""
+
+    dekadal = None
+    """List of booleans, True for the 10th, the 20th and the last day of the month"""
+
+    monthEnd = None
+    """List of booleans, True for the last day of the month"""
+
+    def __init__(self, first_day, last_day):
+        """Constructor: computes the arrays of the days from first_day to last_day (included)"""
+        self.first_day = first_day
+        numberOfDays = (last_day - first_day).days + 1 if last_day is not None and last_day >= first_day else 1
+        self.dates = [first_day + timedelta(days=i) for i in range(numberOfDays)]
+        self.doys = [d.timetuple().tm_yday for d in self.dates]
+        self.monthEnd = [d.day == calendar.monthrange(d.year, d.month)[1] for d in self.dates]
+        self.dekadal = [d.day == 10 or d.day == 20 or m for d, m in zip(self.dates, self.monthEnd)]
+        self.length = numberOfDays
+
+    def getIndex(self, day):
+        """Returns the day index of the date"""
+        return (day - self.first_day).days
+
+    def getDate(self, index):
+        """Returns the date of the day index"""
+        if 0 <= index < self.length:
+            return self.dates[index]
+        return self.first_day + timedelta(days=index)
+
+    def getDoy(self, index):
+        """Returns the day of the year of the day index"""
+        if 0 <= index < self.length:
+            return self.doys[index]
+        return self.getDate(index).timetuple().tm_yday
+
+    def isDekadal(self, index):
+        """Returns True if the day index is the 10th, the 20th or the last day of the month"""
+        if 0 <= index < self.length:
+            return self.dekadal[index]
+        d = self.getDate(index)
+        return d.day == 10 or d.day == 20 or d.day == calendar.monthrange(d.year, d.month)[1]
+
+    def isMonthEnd(self, index):
+        """Returns True if the day index is the last day of the month"""
+        if 0 <= index < self.length:
+            return self.monthEnd[index]
+        d = self.getDate(index)
+        return d.day == calendar.monthrange(d.year, d.month)[1]
+
+    def __str__(self):
+        return 'SimulationCalendar(' + str(self.first_day) + ', ' + str(self.length) + ' days)'
+
+
+class _CalendarDay:
+    """Descriptor of ModelStatus.day: the date is derived from the calendar and the day index at the first read of
+    the day and then kept in the status until the day index changes"""
+
+    def __get__(self, status, owner=None):
+        if status is None:
+            return self
+        values = status.__dict__
+        if 'calendar' not in values or 'day_index' not in values:
+            raise AttributeError('day')
+        day = values['calendar'].getDate(values['day_index'])
+        values['day'] = day
+        return day
+
+
+class ModelStatus(Printable):
+    """
+    The status of the model created by ModelEngine.initialize. Besides the variables of the model, it contains the
+    calendar of the simulation window (status.calendar, a SimulationCalendar object) and the integer index of the
+    current day (status.day_index, number of days from status.first_day), that is the time axis advanced by the engine.
+    status.day, the current date, is derived from them when it is read, so it can be used as before by the steps;
+    setting status.day also sets status.day_index.
+    """
+
+    day = _CalendarDay()
+
+    def __setattr__(self, name, value):
+        if name == 'day_index':
+            # the date of the previous day is derived again at the next read
+            self.__dict__.pop('day', None)
+        elif name == 'day' and value is not None and 'calendar' in self.__dict__:
+            self.__dict__['day_index'] = self.__dict__['calendar'].getIndex(value)
+        self.__dict__[name] = value
+
+
+def toModelStatus(status, simulation_end_day=None):
+    """
+    Returns a ModelStatus with the variables of the status (e.g. a Printable status created by a previous version of
+    the engine and deserialized), creating its calendar from status.first_day to status.simulation_end_day
+    """
+    if isinstance(status, ModelStatus) and 'calendar' in status.__dict__:
+        return status
+    modelStatus = ModelStatus()
+    values = dict(vars(status))
+    day = values.pop('day', status.first_day)
+    modelStatus.__dict__.update(values)
+    modelStatus.calendar = SimulationCalendar(status.first_day, getattr(status, 'simulation_end_day',
+                                                                        simulation_end_day))
+    modelStatus.day = day
+    return modelStatus
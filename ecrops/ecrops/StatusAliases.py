@@ -0,0 +1,133 @@
+""" Functions used by the ModelEngine to apply the aliases of the status variables declared by the workflow (Alias tag):
+an aliased variable is a view of another variable of the status, read and written without copying it """
+from ecrops.Printable import Printable
+
+
+class AliasView(Printable):
+    """
+    Base class of the containers of the status (e.g. status.states) exposing aliased variables. For every container a
+    subclass is created by make_alias_view, having a property for every aliased variable: reading the property returns
+    the current value of the source variable, setting it sets the source variable. The aliased variables are not
+    stored in the container, so they are not printed with the other variables.
+    The subclass keeps the status the sources are read from, and it is created again when the status is copied
+    (copy.deepcopy) or pickled, so that the copy reads the variables of the copied status.
+    """
+
+    _aliasStatus = None
+    """The status containing the source variables"""
+
+    _aliases = None
+    """Dictionary aliased variable name -> list of the attribute names of the source variable, from the status (e.g.
+    ['weather', 'TEMP_MAX'] for status.weather.TEMP_MAX)"""
+
+    def __reduce__(self):
+        return restore_alias_view, (self._aliasStatus, self._aliases, vars(self))
+
+
+def parse_alias_path(path):
+    """
+    Returns the list of the attribute names of a status variable path (e.g. ['states', 'TEMP_MAX'] for
+    'status.states.TEMP_MAX'). An exception is raised if the path is not a status variable.
+    """
+    parts = path.strip().split('.')
+    if parts[0] != 'status' or len(parts) < 2 or not all(p.isidentifier() for p in parts[1:]):
+        raise Exception('Invalid alias variable "' + path + '": it must be a variable of the status (e.g. '
+                                                            'status.weather.TEMP_MAX)')
+    return parts[1:]
+
+
+def check_alias(source, target):
+    """Checks the source and the target of an alias (see the Alias tag of the workflow), raising an exception if they
+    are not valid"""
+    sourceParts = parse_alias_path(source)
+    targetParts = parse_alias_path(target)
+    if len(targetParts) < 2:
+        raise Exception('Invalid alias "' + target + '": the aliased variable must be in a container of the status '
+                                                     '(e.g. status.states.TEMP_MAX)')
+    if targetParts == sourceParts[:len(targetParts)] or sourceParts == targetParts[:len(sourceParts)]:
+        raise Exception('Invalid alias from "' + source + '" to "' + target + '": a variable cannot be an alias of '
+                                                                              'itself or of a variable it contains')
+
+
+def make_getter(status, parts):
+    """Returns the getter of the property of an aliased variable, reading the source variable from the status"""
+    if len(parts) == 1:
+        name = parts[0]
+        return lambda view: getattr(status, name)
+    if len(parts) == 2:
+        container, name = parts
+        return lambda view: getattr(getattr(status, container), name)
+
+    def getter(view):
+        value = status
+        for p in parts:
+            value = getattr(value, p)
+        return value
+
+    return getter
+
+
+def make_setter(status, parts):
+    """Returns the setter of the property of an aliased variable, setting the source variable of the status"""
+    containerParts, name = parts[:-1], parts[-1]
+
+    def setter(view, value):
+        container = status
+        for p in containerParts:
+            container = getattr(container, p)
+        setattr(container, name, value)
+
+    return setter
+
+
+def make_alias_view(status, container, aliases):
+    """
+    Returns a view of the container exposing the aliased variables (see AliasView): an object with the same variables
+    of the container (the aliased variables are removed) whose class has a property for every aliased variable.
+
+    :param status: the status containing the source variables
+    :param container: the container of the aliased variables (a Printable object or an AliasView)
+    :param aliases: dictionary aliased variable name -> list of the attribute names of the source variable
+    :returns: the view
+    """
+    if isinstance(container, AliasView):
+        aliases = dict(container._aliases, **aliases)
+    attributes = {'_aliasStatus': status, '_aliases': aliases}
+    for name, parts in aliases.items():
+        attributes[name] = property(make_getter(status, parts), make_setter(status, parts),
+                                    doc='Alias of status.' + '.'.join(parts))
+    view = Printable.__new__(type('AliasView', (AliasView,), attributes))
+    view.__dict__.update((k, v) for k, v in vars(container).items() if k not in aliases)
+    return view
+
+
+def restore_alias_view(status, aliases, values):
+    """Creates again a view of a container (used when the status is copied or unpickled, see AliasView)"""
+    container = Printable()
+    container.__dict__.update(values)
+    return make_alias_view(status, container, aliases)
+
+
+def apply_aliases(status, aliases):
+    """
+    Applies the aliases to the status: the containers of the aliased variables are replaced by views (see AliasView).
+    The containers that do not exist are created.
+
+    :param status: the status of the model
+    :param aliases: list of tuples (source, target) of the aliases, e.g. ('status.weather.TEMP_MAX',
+    'status.states.TEMP_MAX')
+    :returns: the status
+    """
+    groups = {}
+    for source, target in aliases:
+        targetParts = parse_alias_path(target)
+        groups.setdefault(tuple(targetParts[:-1]), {})[targetParts[-1]] = parse_alias_path(source)
+    for containerPath, containerAliases in groups.items():
+        parent = status
+        for p in containerPath[:-1]:
+            parent = getattr(parent, p)
+        container = getattr(parent, containerPath[-1], None)
+        if container is None:
+            container = Printable()
+        setattr(parent, containerPath[-1], make_alias_view(status, container, containerAliases))
+    return status
@@ -1,8 +1,35 @@
 from abc import ABC, abstractmethod
 
+ACTIVITY_ALWAYS = 'always'
+"""Activity window of the steps whose runstep does something every day"""
+
+ACTIVITY_AFTER_SOWING = 'after_sowing'
+"""Activity window of the steps whose runstep does something only from the day of sowing (status.states.DOS) or of
+emergence (status.states.DOE) on"""
+
+ACTIVITY_EMERGENCE_TO_MATURITY = 'emergence_to_maturity'
+"""Activity window of the steps whose runstep does something only from the day of emergence (status.states.DOE) to
+the day before maturity (status.states.DOM)"""
+
+ACTIVITY_AFTER_ANTHESIS = 'after_anthesis'
+"""Activity window of the steps whose runstep does something only from the day of anthesis (status.states.DOA) on"""
+
+ACTIVITY_WINDOWS = [ACTIVITY_ALWAYS, ACTIVITY_AFTER_SOWING, ACTIVITY_EMERGENCE_TO_MATURITY, ACTIVITY_AFTER_ANTHESIS]
+"""The activity windows that can be declared by the steps (see Step.activity_window)"""
+
 
 class Step(ABC):
     """Abstract class that rapresents a generic step of the model workflow"""
+
+    activity_window = ACTIVITY_ALWAYS
+    """Days in which the runstep method of the step does something (one of ACTIVITY_WINDOWS). Outside the window the
+    ModelEngine does not call the runstep method (see is_in_activity_window): a step can declare a window only if its
+    runstep returns the status unchanged outside it. The integrate method is always called"""
+
+    batch_step = None
+    """Array version of the step, as 'module|class' (e.g. 'ecrops.FPWarm.batch.LeafLife|LeafLife'): a step computing
+    the same values with the variables of the status stored as NumPy arrays over many simulation units. It is used in
+    place of the step by the BatchModelEngine. None if the step has no array version"""
     @abstractmethod
     def getparameterslist(self):
         """Return the list of the parameters of the steps"""
@@ -37,3 +64,31 @@ class Step(ABC):
     def integrate(self, status):
         """Merge the values of the previous time interval before the calculation of the current time interval step operations"""
         pass
+
+
+def is_in_activity_window(activity_window, status):
+    """
+    Returns True if the current day (status.day) is in the activity window, evaluating the crop phase dates of
+    status.states (DOS, DOE, DOA, DOM). It returns True also if the status does not contain the dates needed to
+    evaluate the window: in this case the step decides by itself.
+    """
+    if activity_window == ACTIVITY_ALWAYS:
+        return True
+    states = getattr(status, 'states', None)
+    if states is None or not hasattr(states, 'DOE'):
+        return True
+    day = status.day
+    if activity_window == ACTIVITY_EMERGENCE_TO_MATURITY:
+        if states.DOE is None or day < states.DOE:
+            return False
+        DOM = getattr(states, 'DOM', None)
+        return DOM is None or day < DOM
+    if activity_window == ACTIVITY_AFTER_SOWING:
+        DOS = getattr(states, 'DOS', None)
+        return (DOS is not None and day >= DOS) or (states.DOE is not None and day >= states.DOE)
+    if activity_window == ACTIVITY_AFTER_ANTHESIS:
+        if not hasattr(states, 'DOA'):
+            return True
+        return states.DOA is not None and day >= states.DOA
+    raise Exception('Unknown activity window ' + str(activity_window) + ' (valid values: ' + ', '.join(
+        ACTIVITY_WINDOWS) + ')')
@@ -0,0 +1,207 @@
+""" Class StepProfiler, used to measure the execution time of the steps run by the ModelEngine """
+import csv
+import json
+import random
+import time
+import tracemalloc
+
+
+class StepProfiler:
+    """
+    The StepProfiler class collects the execution times of the steps run by a ModelEngine. It is attached to an
+    engine by setting its 'profiler' property:
+
+    - model = ModelEngine(config_file)
+    - model.profiler = StepProfiler()
+    - ... run the model ...
+    - print(model.profiler.report()), model.profiler.toJson(path), model.profiler.toCsv(path),
+      model.profiler.toFolded(path)
+
+    Every call of the step methods (setparameters, initialize, integrate, runstep) is recorded by run mode, step,
+    method and phase. The phase is 'init' for setparameters and initialize, 'pre-crop' for the days run with the
+    pre-crop plan (see ModelEngine.getDailySteps2Run) and 'crop' for the other days. The steps are identified by
+    their class name: when the same class is used more than once in the same run mode, the following instances are
+    named ClassName#2, ClassName#3,... in the order of the workflow. The whole day is also recorded, with step name
+    'ModelEngine' and method 'day'.
+
+    For every record the profiler keeps the number of calls, the total, minimum and maximum time (nanoseconds,
+    measured with time.perf_counter_ns) and a random sample of at most max_samples durations, used to calculate the
+    percentiles. If trace_memory is True, the allocations of every call are also measured with tracemalloc (net
+    allocated bytes and peak increase): this slows down the execution a lot, so it should be used only to
+    look for memory issues.
+
+    When no profiler is attached to the ModelEngine (default) the steps are run without any measurement.
+    """
+
+    PERCENTILES = [50, 90, 99]
+    """Percentiles reported by the profiler"""
+
+    def __init__(self, trace_memory=False, max_samples=10000):
+        """Constructor: if trace_memory is True, the memory allocations of the steps are traced with tracemalloc
+        (started by the profiler if it is not already tracing). max_samples is the maximum number of durations kept
+        for each record to calculate the percentiles"""
+        self.trace_memory = trace_memory
+        self.max_samples = max_samples
+        self.phase = 'init'
+        self.records = {}
+        self._stepNames = {}
+        self._callRecords = {}
+        self._random = random.Random(0)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def getStepName(self, runMode, step):
+        """Returns the name used for the step in the records of the run mode (ClassName, ClassName#2,...)"""
+        key = (runMode, id(step))
+        if key not in self._stepNames:
+            className = step.__class__.__name__
+            count = sum(1 for (r, s, n) in self._stepNames.values() if r == runMode and s.__class__ is step.__class__)
+            # the step object is kept in the dictionary, so that its id cannot be reused by another object
+            self._stepNames[key] = (runMode, step, className if count == 0 else className + '#' + str(count + 1))
+        return self._stepNames[key][2]
+
+    def start(self):
+        """Returns the token to pass to the stop method at the end of the measured call"""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            return time.perf_counter_ns(), tracemalloc.get_traced_memory()[0]
+        return time.perf_counter_ns(), 0
+
+    def stop(self, token, runMode, step, method):
+        """Records a call of method of the step, started when the token was created by the start method. If step is
+        None, the call is recorded as the whole day of the ModelEngine"""
+        elapsed = time.perf_counter_ns() - token[0]
+        allocated = peak = 0
+        if self.trace_memory:
+            current, peakMemory = tracemalloc.get_traced_memory()
+            allocated = current - token[1]
+            peak = peakMemory - token[1]
+        # the records are cached by step object, to avoid resolving the step name at every call
+        callKey = (runMode, id(step), method, self.phase)
+        record = self._callRecords.get(callKey)
+        if record is None:
+            stepName = 'ModelEngine' if step is None else self.getStepName(runMode, step)
+            key = (runMode, stepName, method, self.phase)
+            record = self.records.get(key)
+            if record is None:
+                record = self.records[key] = StepProfilerRecord()
+            self._callRecords[callKey] = record
+        record.count += 1
+        record.total_ns += elapsed
+        if elapsed < record.min_ns or record.count == 1:
+            record.min_ns = elapsed
+        if elapsed > record.max_ns:
+            record.max_ns = elapsed
+        if self.trace_memory:
+            record.allocated_bytes += allocated
+            if peak > record.peak_bytes:
+                record.peak_bytes = peak
+        # reservoir sampling: every call has the same probability to be in the samples
+        if record.count <= self.max_samples:
+            record.samples.append(elapsed)
+        else:
+            i = self._random.randrange(record.count)
+            if i < self.max_samples:
+                record.samples[i] = elapsed
+
+    def reset(self):
+        """Removes all the records"""
+        self.records = {}
+        self._stepNames = {}
+        self._callRecords = {}
+        self.phase = 'init'
+
+    def getRows(self):
+        """
+        Returns the records as a list of dictionaries, one per run mode, step, method and phase, in the order they
+        were first recorded. Times are in nanoseconds, memory in bytes.
+        """
+        rows = []
+        for (runMode, stepName, method, phase), record in self.records.items():
+            row = {'run_mode': runMode, 'step': stepName, 'method': method, 'phase': phase,
+                   'count': record.count, 'total_ns': record.total_ns, 'mean_ns': record.total_ns // record.count,
+                   'min_ns': record.min_ns, 'max_ns': record.max_ns}
+            samples = sorted(record.samples)
+            for p in self.PERCENTILES:
+                row['p' + str(p) + '_ns'] = samples[min(len(samples) - 1, (len(samples) * p) // 100)]
+            if self.trace_memory:
+                row['allocated_bytes'] = record.allocated_bytes
+                row['peak_bytes'] = record.peak_bytes
+            rows.append(row)
+        return rows
+
+    def report(self):
+        """Returns a textual report of the records, sorted by total time"""
+        lines = []
+        rows = sorted(self.getRows(), key=lambda r: -r['total_ns'])
+        for r in rows:
+            line = str(r['run_mode']) + ' ' + r['phase'] + ' ' + r['step'] + '.' + r['method'] + ': ' + str(
+                r['count']) + ' calls, total ' + '%.6f' % (r['total_ns'] / 1e9) + ' s, mean ' + '%.1f' % (
+                           r['mean_ns'] / 1e3) + ' us, ' + ', '.join(
+                'p' + str(p) + ' ' + '%.1f' % (r['p' + str(p) + '_ns'] / 1e3) + ' us' for p in self.PERCENTILES)
+            if self.trace_memory:
+                line += ', allocated ' + str(r['allocated_bytes']) + ' bytes, peak ' + str(r['peak_bytes']) + ' bytes'
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def toJson(self, path):
+        """Saves the records in a JSON file"""
+        with open(path, 'w') as f:
+            json.dump({'percentiles': self.PERCENTILES, 'trace_memory': self.trace_memory, 'records': self.getRows()},
+                      f, indent=1)
+
+    def toCsv(self, path):
+        """Saves the records in a CSV file, one row per run mode, step, method and phase"""
+        rows = self.getRows()
+        with open(path, 'w', newline='') as f:
+            if len(rows) == 0:
+                return
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def toFolded(self, path):
+        """Saves the total times (microseconds) in the folded stack format used by the flamegraph tools
+        (e.g. flamegraph.pl, speedscope): one line 'ModelEngine;run mode;phase;step;method time' per record.
+        The time of the days is reported as the time not spent in the steps"""
+        stepsTime = {}
+        for (runMode, stepName, method, phase), record in self.records.items():
+            if method != 'day':
+                stepsTime[(runMode, phase)] = stepsTime.get((runMode, phase), 0) + record.total_ns
+        with open(path, 'w') as f:
+            for (runMode, stepName, method, phase), record in self.records.items():
+                if method == 'day':
+                    value = record.total_ns - stepsTime.get((runMode, phase), 0)
+                    frames = ['ModelEngine', str(runMode), phase]
+                else:
+                    value = record.total_ns
+                    frames = ['ModelEngine', str(runMode), phase, stepName, method]
+                if value // 1000 > 0:
+                    f.write(';'.join(frame.replace(';', '_').replace(' ', '_') for frame in frames) + ' ' + str(
+                        value // 1000) + '\n')
+
+
+class StepProfilerRecord:
+    """
+    Measures of the calls of a step method, for a run mode and a phase
+    """
+    count = 0
+    """Number of calls"""
+
+    total_ns = 0
+    """Total time of the calls, in nanoseconds"""
+
+    min_ns = 0
+    """Minimum time of a call, in nanoseconds"""
+
+    max_ns = 0
+    """Maximum time of a call, in nanoseconds"""
+
+    allocated_bytes = 0
+    """Total net memory allocated by the calls, in bytes (only if trace_memory is True)"""
+
+    peak_bytes = 0
+    """Maximum increase of the allocated memory during a call, in bytes (only if trace_memory is True)"""
+
+    def __init__(self):
+        self.samples = []
@@ -0,0 +1,573 @@
+""" Classes StepRecorder and StepReplay, used to record the inputs and outputs of the steps during a simulation and
+to execute again the steps on the recorded values """
+import collections
+import copy
+import datetime
+import gzip
+import hashlib
+import itertools
+import math
+import numbers
+import pickle
+import time
+import types
+import weakref
+
+import numpy as np
+
+from ecrops.Printable import Printable
+
+IMMUTABLE_TYPES = (numbers.Number, str, bytes, datetime.date, datetime.timedelta, np.generic)
+"""Types of the values of the status variables that are compared without copying them"""
+
+NONE_TYPE = type(None)
+
+_immutableTypes = {}
+"""Cache of isImmutableType: type -> True if the values of the type are immutable"""
+
+MAX_FINGERPRINT_DEPTH = 8
+"""Maximum depth of the containers explored by fingerprintValue: the deeper values are pickled"""
+
+PACKED_TYPES = {float: np.float64, int: np.int64, bool: np.bool_}
+"""Types of the numbers saved in numpy arrays by packColumns (the python types, with their numpy type, and the numpy
+number types)"""
+
+_MISSING = object()
+"""Marker of the status variables missing in the previous status (see getChangedVariables)"""
+
+
+class StepRecorder:
+    """
+    The StepRecorder class records, for the selected steps and days, the values of the input variables of the steps
+    (as declared by getinputslist) before the call of integrate and runstep, and the values of the output variables
+    (as declared by getoutputslist) after the call. The variables that the steps read without declaring them (e.g. the
+    parameters, or the states written by other steps) are recorded too: for every simulation unit (status object) a
+    copy of the whole status is saved at the first recorded call, then at every recorded call the status variables
+    changed since the previous recorded call of the unit are added to the timeline of the unit, so that the status of
+    every call can be rebuilt. It is attached to an engine by setting its 'recorder' property:
+
+    - model = ModelEngine(config_file)
+    - model.recorder = StepRecorder(steps=['WOFOST_Assimilation'], every=5)
+    - ... run the model, also for many units ...
+    - model.recorder.save('assimilation.ecrec')
+
+    The saved file can be executed again with StepReplay, to check that a step still produces the recorded outputs or
+    to measure a new implementation of the step on realistic values.
+    The values are copies of the status variables, and the status is compared before every recorded call with the
+    previous one, so recording slows down the simulation: it is meant to be used on a limited number of steps and
+    days.
+    """
+
+    FORMAT_VERSION = 2
+    """Version of the format of the saved files"""
+
+    def __init__(self, steps=None, every=1, max_records=None):
+        """Constructor: steps is the list of the class names of the steps to record (None to record all the steps),
+        every is the sampling interval in days (counted from the simulation start day), max_records is the maximum
+        number of records kept for every step (None for no limit)"""
+        self.steps = None if steps is None else set(steps)
+        self.every = every
+        self.max_records = max_records
+        self.reset()
+
+    def getStepKey(self, runMode, step):
+        """Returns the key used for the step in the records (run mode, step name), where the step name is the class
+        name, followed by #2, #3,... when the same class is used more than once in the same run mode"""
+        key = (runMode, id(step))
+        if key not in self._stepKeys:
+            className = step.__class__.__name__
+            count = sum(1 for (r, s, k) in self._stepKeys.values() if r == runMode and s.__class__ is step.__class__)
+            stepKey = (runMode, className if count == 0 else className + '#' + str(count + 1))
+            # the step object is kept in the dictionary, so that its id cannot be reused by another object
+            self._stepKeys[key] = (runMode, step, stepKey)
+            self.stepsInfo[stepKey] = {'module': step.__class__.__module__, 'class': className,
+                                       'inputs': getVariablePaths(step.getinputslist()),
+                                       'outputs': getVariablePaths(step.getoutputslist())}
+            self.records[stepKey] = []
+        return self._stepKeys[key][2]
+
+    def isRecorded(self, status, runMode, step):
+        """Returns True if the call of the step in the current day has to be recorded"""
+        if self.steps is not None and step.__class__.__name__ not in self.steps:
+            return False
+        if (status.day - status.simulation_start_day).days % self.every != 0:
+            return False
+        return self.max_records is None or len(self.records[self.getStepKey(runMode, step)]) < self.max_records
+
+    def captureInputs(self, status, runMode, step):
+        """Returns a copy of the values of the input variables of the step and the position of the call in the
+        timeline of the unit, where the status variables changed since the previous recorded call are added (see
+        getChangedVariables). At the first call for the status, a copy of the whole status is saved"""
+        stepKey = self.getStepKey(runMode, step)
+        unit = self.getUnitIndex(status)
+        if unit not in self.bases:
+            self.bases[unit] = copy.deepcopy(status)
+            self.timelines[unit] = []
+            self._fingerprints[unit] = {p: fingerprintValue(v) for p, v in getStatusLeaves(status).items()}
+        changed, removed, self._fingerprints[unit] = getChangedVariables(status, self._fingerprints[unit])
+        self.timelines[unit].append((changed, removed))
+        return tuple(copy.deepcopy(getStatusValue(status, p)) for p in self.stepsInfo[stepKey]['inputs']), len(
+            self.timelines[unit]) - 1
+
+    def addRecord(self, status, runMode, step, method, inputs):
+        """Records the call of the method of the step: inputs are the values returned by captureInputs before the
+        call, the outputs are read from the status"""
+        stepKey = self.getStepKey(runMode, step)
+        inputValues, position = inputs
+        outputs = tuple(copy.deepcopy(getStatusValue(status, p)) for p in self.stepsInfo[stepKey]['outputs'])
+        self.records[stepKey].append((self.getUnitIndex(status), (status.day - status.simulation_start_day).days,
+                                      method, inputValues, outputs, position))
+
+    def getUnitIndex(self, status):
+        """Returns the index of the simulation unit of the status, in the order the statuses were first recorded"""
+        unit = self._units.get(status)
+        if unit is None:
+            unit = self._units[status] = self._unitsCount
+            self._unitsCount += 1
+        return unit
+
+    def reset(self):
+        """Removes all the records"""
+        self.stepsInfo = {}
+        self.records = {}
+        self.bases = {}
+        self.timelines = {}
+        self._fingerprints = {}
+        self._units = weakref.WeakKeyDictionary()
+        self._unitsCount = 0
+        self._stepKeys = {}
+
+    def save(self, path):
+        """Saves the records in a compressed binary file (pickle protocol, gzip compression). The units, days,
+        methods, positions in the timelines and the values of the input and output variables are saved in columns, as
+        numpy arrays when the values of a variable are numbers of the same type (see packColumns)"""
+        records = {}
+        for stepKey, stepRecords in self.records.items():
+            info = self.stepsInfo[stepKey]
+            records[stepKey] = {'unit': np.array([r[0] for r in stepRecords], dtype=np.int32),
+                                'day': np.array([r[1] for r in stepRecords], dtype=np.int32),
+                                'method': np.array([r[2] for r in stepRecords], dtype=str),
+                                'inputs': packColumns([r[3] for r in stepRecords], len(info['inputs'])),
+                                'outputs': packColumns([r[4] for r in stepRecords], len(info['outputs'])),
+                                'position': np.array([r[5] for r in stepRecords], dtype=np.int32)}
+        with gzip.open(path, 'wb') as f:
+            pickle.dump({'version': self.FORMAT_VERSION, 'steps': self.stepsInfo, 'bases': self.bases,
+                         'timelines': self.timelines, 'records': records}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class StepReplay:
+    """
+    The StepReplay class executes again the steps recorded by a StepRecorder, on the recorded input values:
+
+    - replay = StepReplay('assimilation.ecrec')
+    - results = replay.run()  # checks the outputs against the recorded ones and measures the calls
+    - print(replay.report(results))
+
+    For every recorded step and simulation unit, an instance of the step is created (or of the class passed in the
+    implementations argument of run, to test a new implementation) and its setparameters method is called on a copy
+    of the status saved at the first recorded call. Then for every record the status of the call is rebuilt from a
+    copy of that status, setting the status variables changed until the recorded call (from the timeline of the unit)
+    and the recorded inputs, and the recorded method (integrate or runstep) is called. Every record, and every repetition of a record, runs on its own
+    copy, so the calls do not change the status of the following ones: replaying an unchanged step gives the recorded
+    outputs. The outputs are compared with the recorded ones: numbers are equal if their difference is not greater
+    than tolerance * max(1, abs(recorded value)).
+    """
+
+    def __init__(self, path):
+        """Constructor: loads the file saved by StepRecorder.save"""
+        with gzip.open(path, 'rb') as f:
+            data = pickle.load(f)
+        if data['version'] != StepRecorder.FORMAT_VERSION:
+            raise Exception('Unsupported version ' + str(data['version']) + ' of the recorded file ' + path)
+        self.stepsInfo = data['steps']
+        self.bases = data['bases']
+        self.timelines = data['timelines']
+        self._dumpedTimelines = {}
+        self.records = {}
+        for stepKey, columns in data['records'].items():
+            count = len(columns['unit'])
+            self.records[stepKey] = list(zip(columns['unit'].tolist(), columns['day'].tolist(),
+                                             columns['method'].tolist(), unpackColumns(columns['inputs'], count),
+                                             unpackColumns(columns['outputs'], count),
+                                             columns['position'].tolist()))
+
+    def run(self, steps=None, implementations=None, repeat=1, check=True, tolerance=1e-9):
+        """
+        Executes the recorded calls of the steps.
+
+        :param steps: list of the step names (as in the records, e.g. 'WOFOST_Assimilation') to replay, None for all
+        :param implementations: dictionary step class name -> class to use instead of the recorded one
+        :param repeat: number of times every recorded call is executed (the outputs are checked at the last one)
+        :param check: if True the outputs are compared with the recorded ones
+        :param tolerance: relative tolerance of the comparison of numbers
+        :returns: a dictionary (run mode, step name) -> {'calls', 'total_ns', 'per_method', 'mismatches'}, where
+        per_method is a dictionary method -> [calls, total nanoseconds] and mismatches is a list of
+        (day, method, variable, recorded value, replayed value)
+        """
+        results = {}
+        for stepKey, info in self.stepsInfo.items():
+            if steps is not None and stepKey[1] not in steps:
+                continue
+            stepClass = None if implementations is None else implementations.get(info['class'])
+            if stepClass is None:
+                from ecrops.ModelEngine import load_step_class
+                stepClass = load_step_class(info['module'], info['class'])
+            results[stepKey] = self._runStep(stepClass, info, self.records[stepKey], repeat, check, tolerance)
+        return results
+
+    def getDumpedTimeline(self, unit):
+        """Returns the timeline of the unit with the values of the changed status variables dumped by dumpValue (the
+        whole list for the lists that were extended), so that the status of every call is rebuilt without copying the
+        values that did not change. The result is computed at the first call and kept"""
+        if unit not in self._dumpedTimelines:
+            status = copyValue(self.bases[unit])
+            dumped = []
+            for changedVariables, removedVariables in self.timelines[unit]:
+                StepReplay._applyChanges(status, changedVariables, removedVariables)
+                dumped.append(({path: dumpValue(getStatusValue(status, path)) for path in changedVariables},
+                               removedVariables))
+            self._dumpedTimelines[unit] = dumped
+        return self._dumpedTimelines[unit]
+
+    def _runStep(self, stepClass, info, records, repeat, check, tolerance):
+        """Replays the records of a step"""
+        result = {'calls': 0, 'total_ns': 0, 'per_method': {}, 'mismatches': []}
+        units = {}
+        for unit, day, method, inputs, outputs, position in records:
+            if unit not in units:
+                step = stepClass()
+                units[unit] = (step, dumpValue(step.setparameters(copyValue(self.bases[unit]))), {}, set(), [-1])
+            step, dumpedBase, changed, removed, applied = units[unit]
+            # the status variables changed since the saved status, until the recorded call
+            for changedVariables, removedVariables in self.getDumpedTimeline(unit)[applied[0] + 1:position + 1]:
+                changed.update(changedVariables)
+                removed.difference_update(changedVariables)
+                for path in removedVariables:
+                    changed.pop(path, None)
+                    removed.add(path)
+            applied[0] = position
+            function = getattr(step, method)
+            methodResult = result['per_method'].setdefault(method, [0, 0])
+            for r in range(repeat):
+                # every execution runs on a new copy of the status of the call
+                target = loadValue(dumpedBase)
+                for path, value in changed.items():
+                    setStatusValue(target, path, loadValue(value))
+                StepReplay._removeVariables(target, removed)
+                StepReplay._setInputs(target, info['inputs'], inputs)
+                t0 = time.perf_counter_ns()
+                target = function(target)
+                elapsed = time.perf_counter_ns() - t0
+                result['calls'] += 1
+                result['total_ns'] += elapsed
+                methodResult[0] += 1
+                methodResult[1] += elapsed
+            if check:
+                for path, expected in zip(info['outputs'], outputs):
+                    value = getStatusValue(target, path)
+                    if not sameValue(value, expected, tolerance):
+                        result['mismatches'].append((day, method, path, expected, value))
+        return result
+
+    @staticmethod
+    def _applyChanges(status, changedVariables, removedVariables):
+        """Applies to the status the changed status variables (dictionary path -> value) and the removed ones (list of
+        paths) of an entry of the timeline. The values of the timeline are set without copying them, except for the
+        lists that are extended"""
+        for path, value in changedVariables.items():
+            if isinstance(value, AppendedItems):
+                items = copy.copy(getStatusValue(status, path))
+                items.extend(value.items)
+                value = items
+            setStatusValue(status, path, value)
+        StepReplay._removeVariables(status, removedVariables)
+
+    @staticmethod
+    def _removeVariables(status, paths):
+        """Removes the status variables (list of paths) from the status"""
+        for path in paths:
+            parent, name = path.rsplit('.', 1)
+            obj = getStatusValue(status, parent)
+            if obj is not None and hasattr(obj, name):
+                delattr(obj, name)
+
+    @staticmethod
+    def _setInputs(status, paths, values):
+        """Sets a copy of the recorded input values in the status. The None values of the variables that do not exist
+        in the status are skipped: the status is rebuilt as it was at the recorded call, so the variables did not
+        exist"""
+        for path, value in zip(paths, values):
+            if value is None:
+                parent, name = path.rsplit('.', 1)
+                if not hasattr(getStatusValue(status, parent), name):
+                    continue
+            setStatusValue(status, path, copy.deepcopy(value))
+
+    @staticmethod
+    def report(results):
+        """Returns a textual report of the results of the run method, one line per step, sorted by total time"""
+        lines = []
+        for (runMode, stepName), r in sorted(results.items(), key=lambda item: -item[1]['total_ns']):
+            line = str(runMode) + ' ' + stepName + ': ' + str(r['calls']) + ' calls, total ' + '%.6f' % (
+                    r['total_ns'] / 1e9) + ' s, ' + ', '.join(
+                method + ' mean ' + '%.1f' % (total / calls / 1e3) + ' us' for method, (calls, total) in
+                r['per_method'].items()) + ', ' + str(len(r['mismatches'])) + ' mismatches'
+            lines.append(line)
+            for day, method, path, expected, value in r['mismatches'][0:5]:
+                lines.append('    day ' + str(day) + ' ' + method + ' ' + path + ': recorded ' + str(
+                    expected)[0:80] + ', replayed ' + str(value)[0:80])
+        return '\n'.join(lines)
+
+
+def getVariablePaths(variables):
+    """Returns the status paths of the variables declared by getinputslist or getoutputslist. The paths including
+    list items (e.g. 'status.a.LIST[].X') are reduced to the list ('status.a.LIST')"""
+    paths = []
+    for name, attributes in variables.items():
+        path = attributes.get('StatusVariable') if isinstance(attributes, dict) else None
+        if path is None or not path.startswith('status.'):
+            continue
+        path = path.split('[')[0]
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+def getStatusValue(status, path):
+    """Returns the value of the status variable (e.g. 'status.states.DVS'), or None if it does not exist"""
+    obj = status
+    for part in path.split('.')[1:]:
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return None
+    return obj
+
+
+def setStatusValue(status, path, value):
+    """Sets the value of the status variable (e.g. 'status.states.DVS'), creating the missing intermediate objects as
+    Printable objects"""
+    parts = path.split('.')
+    obj = status
+    for part in parts[1:-1]:
+        if not hasattr(obj, part) or getattr(obj, part) is None:
+            setattr(obj, part, Printable())
+        obj = getattr(obj, part)
+    setattr(obj, parts[-1], value)
+
+
+class AppendedItems:
+    """Items appended to a list or a deque of the status since the previous recorded call (see
+    getChangedVariables)"""
+
+    items = None
+    """List of the appended items"""
+
+    def __init__(self, items):
+        self.items = items
+
+
+def dumpValue(value):
+    """Returns the pickled value, that loadValue copies faster than copy.deepcopy. The immutable values are returned
+    in a tuple, and not copied by loadValue; the values that cannot be pickled are returned in a list, and copied by
+    loadValue with copy.deepcopy"""
+    if isImmutableType(type(value)):
+        return (value,)
+    try:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return [value]
+
+
+def loadValue(dumped):
+    """Returns a new copy of the value dumped by dumpValue"""
+    if isinstance(dumped, tuple):
+        return dumped[0]
+    if isinstance(dumped, list):
+        return copy.deepcopy(dumped[0])
+    return pickle.loads(dumped)
+
+
+def copyValue(value):
+    """Returns a deep copy of the value"""
+    return loadValue(dumpValue(value))
+
+
+def getStatusLeaves(obj, path='status', leaves=None):
+    """Returns a dictionary path -> value of all the variables of the status: the containers (Printable objects) are
+    explored, the other values are returned as they are (not copied)"""
+    if leaves is None:
+        leaves = {}
+    for name, value in vars(obj).items():
+        if isinstance(value, Printable):
+            getStatusLeaves(value, path + '.' + name, leaves)
+        else:
+            leaves[path + '.' + name] = value
+    return leaves
+
+
+def getChangedVariables(status, previous):
+    """
+    Compares the status with the fingerprints of a previous status (see fingerprintValue).
+
+    :param status: the status
+    :param previous: dictionary path -> fingerprint of the variables of the previous status
+    :returns: a tuple (dictionary path -> copy of the value of the variables changed or added, list of the paths of
+    the removed variables, dictionary path -> fingerprint of the variables of the status). The lists and deques that
+    only grew (e.g. the daily series) are returned as the AppendedItems object of the new items
+    """
+    fingerprints = {}
+    changed = {}
+    leaves = getStatusLeaves(status)
+    for path, value in leaves.items():
+        fingerprint = fingerprints[path] = fingerprintValue(value)
+        before = previous.get(path, _MISSING)
+        if before is not _MISSING and sameFingerprint(fingerprint, before):
+            continue
+        if isinstance(value, (list, collections.deque)) and isinstance(before, tuple) and len(before) == 2 and \
+                before[0] == fingerprint[0] and len(before[1]) < len(fingerprint[1]) and \
+                fingerprint[1][0:len(before[1])] == before[1]:
+            value = AppendedItems(list(value)[len(before[1]):])
+        if isImmutableType(type(value)):
+            changed[path] = value
+            continue
+        try:
+            changed[path] = copy.deepcopy(value)
+        except Exception:
+            changed[path] = value
+    return changed, [p for p in previous if p not in leaves], fingerprints
+
+
+def packColumns(rows, width):
+    """Returns the columns of the rows (tuples of width values, e.g. the inputs of the records of a step): a column is
+    a tuple (type, numpy array) when all its values are numbers of the same type (see PACKED_TYPES), (None, list of
+    the values) otherwise"""
+    columns = []
+    for c in range(width):
+        values = [row[c] for row in rows]
+        valueTypes = set(map(type, values))
+        column = (None, values)
+        if len(valueTypes) == 1:
+            valueType = valueTypes.pop()
+            if valueType in PACKED_TYPES or (issubclass(valueType, np.generic) and np.dtype(valueType).kind in 'biuf'):
+                try:
+                    column = (valueType, np.array(values, dtype=PACKED_TYPES.get(valueType, valueType)))
+                except OverflowError:
+                    pass
+        columns.append(column)
+    return columns
+
+
+def unpackColumns(columns, count):
+    """Returns the count rows of the columns created by packColumns, with the values of the original types"""
+    if len(columns) == 0:
+        return [()] * count
+    values = []
+    for valueType, column in columns:
+        if valueType is None:
+            values.append(column)
+        elif valueType in PACKED_TYPES:
+            values.append(column.tolist())
+        else:
+            values.append(list(column))
+    return list(zip(*values))
+
+
+def sameValue(value, expected, tolerance):
+    """Returns True if the replayed value is equal to the recorded one (numbers within the relative tolerance)"""
+    if isinstance(expected, numbers.Number) and not isinstance(expected, bool) and isinstance(value, numbers.Number):
+        if math.isnan(expected) or math.isnan(value):
+            return math.isnan(expected) and math.isnan(value)
+        return abs(value - expected) <= tolerance * max(1, abs(expected))
+    if isinstance(expected, np.ndarray) or isinstance(value, np.ndarray):
+        try:
+            return np.allclose(value, expected, rtol=tolerance, atol=tolerance, equal_nan=True)
+        except Exception:
+            return False
+    if isinstance(expected, (list, tuple)) or type(expected).__name__ == 'deque':
+        if type(value) is not type(expected) or len(value) != len(expected):
+            return False
+        if isEqual(value, expected):
+            return True
+        return all(sameValue(v, e, tolerance) for v, e in zip(value, expected))
+    if isinstance(expected, dict):
+        if not isinstance(value, dict) or value.keys() != expected.keys():
+            return False
+        if isEqual(value, expected):
+            return True
+        return all(sameValue(value[k], expected[k], tolerance) for k in expected)
+    if hasattr(expected, '__dict__') and not isinstance(expected, type):
+        if type(value) is not type(expected):
+            return False
+        return sameValue(vars(value), vars(expected), tolerance)
+    try:
+        return bool(value == expected)
+    except Exception:
+        return False
+
+
+def isEqual(value, expected):
+    """Returns True if the values are equal (False if they cannot be compared, e.g. lists of numpy arrays): a fast
+    check done before comparing the items one by one"""
+    try:
+        return (value == expected) is True
+    except Exception:
+        return False
+
+
+def fingerprintValue(value, depth=0):
+    """Returns a value that changes when the value of a status variable changes, without copying the whole value: the
+    value itself for the immutable values (numbers, strings, dates), a digest of the bytes for the numpy arrays, a
+    tuple of the items for the lists, tuples and deques of immutable values (or of lists of immutable values), a
+    tuple of the fingerprints of the items for the dictionaries and objects (their attributes), a digest of the
+    pickled value for the other values. Functions, classes and the objects that cannot be pickled are returned as they
+    are"""
+    valueType = type(value)
+    if isImmutableType(valueType):
+        return value
+    if valueType is np.ndarray and value.dtype != object:
+        return value.dtype.str, value.shape, hashlib.sha1(np.ascontiguousarray(value)).digest()
+    if isinstance(value, (types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.ModuleType, type)):
+        return value
+    if depth < MAX_FINGERPRINT_DEPTH:
+        if isinstance(value, (list, tuple, collections.deque)):
+            # the sequences of immutable values and of lists of immutable values (e.g. the daily series) are their own
+            # fingerprint, the other ones are pickled
+            items = tuple(value)
+            itemTypes = set(map(type, items))
+            if all(map(isImmutableType, itemTypes)):
+                return valueType.__name__, items
+            if itemTypes <= {list, tuple}:
+                items = tuple(map(tuple, items))
+                if all(map(isImmutableType, set(map(type, itertools.chain.from_iterable(items))))):
+                    return valueType.__name__, items
+        elif isinstance(value, dict):
+            if all(map(isImmutableType, set(map(type, value.values())))):
+                return 'dict', tuple(value.items())
+            return 'dict', tuple((k, fingerprintValue(v, depth + 1)) for k, v in value.items())
+        elif hasattr(value, '__dict__') and not isinstance(value, (set, frozenset, bytearray, np.ndarray)):
+            return valueType.__name__, fingerprintValue(vars(value), depth + 1)
+    try:
+        return hashlib.sha1(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).digest()
+    except Exception:
+        return value
+
+
+def isImmutableType(valueType):
+    """Returns True if the values of the type are immutable (see IMMUTABLE_TYPES)"""
+    immutable = _immutableTypes.get(valueType)
+    if immutable is None:
+        immutable = _immutableTypes[valueType] = valueType is NONE_TYPE or issubclass(valueType, IMMUTABLE_TYPES)
+    return immutable
+
+
+def sameFingerprint(after, before):
+    """Returns True if the fingerprints of a status variable taken before and after a call are equal (NaN values
+    are equal)"""
+    if after is before:
+        return True
+    if isinstance(after, float) and isinstance(before, float):
+        return after == before or (math.isnan(after) and math.isnan(before))
+    try:
+        return bool(after == before)
+    except Exception:
+        return False
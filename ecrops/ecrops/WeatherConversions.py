@@ -0,0 +1,241 @@
+""" Conversions of the units of measure of the weather data, declared by the workflow (WeatherConversions section) and
+applied once to whole arrays of weather data (e.g. the weather of all the cells of a grid or of a tile), recording the
+conversions on the memory of the arrays so that no value is converted twice """
+import weakref
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from ecrops.wofost_util.util import wind10to2
+
+UNIT_CONVERSIONS = {
+    ('kJ/m2', 'J/m2'): lambda values: values * 1000,
+    ('kJ/m2', 'MJ/m2'): lambda values: values / 1000.,
+    ('J/m2', 'kJ/m2'): lambda values: values / 1000.,
+    ('MJ/m2', 'kJ/m2'): lambda values: values * 1000,
+    ('MJ/m2', 'J/m2'): lambda values: values * 1000000,
+    ('mm', 'cm'): lambda values: values / 10.,
+    ('cm', 'mm'): lambda values: values * 10,
+    ('K', 'C'): lambda values: values - 273.15,
+    ('m/s@10m', 'm/s@2m'): wind10to2,
+}
+"""Known conversions: (source unit, target unit) -> function converting an array of values. The units of the wind
+speed include the height of the measure"""
+
+
+class ConvertedMemory:
+    """
+    The record of the conversions applied to the memory of a root array (the array owning the memory of the weather
+    data, e.g. the array of a grid or of a tile, whose views are the weather of the cells): the elements already
+    converted and the unit of measure of every converted variable. The record belongs to the memory and not to the
+    array objects, so it is shared by all the views of the root array (also the plain numpy views, e.g. np.asarray)
+    """
+
+    root = None
+    """Weak reference to the root array"""
+
+    converted = None
+    """One dimensional boolean array with an item per element of the root array, True if the element was converted"""
+
+    units = None
+    """Dictionary variable -> unit of measure of the converted values of the variable"""
+
+    regions = None
+    """Dictionary variable -> list of the regions of the root array converted for the variable, as tuples (offset,
+    shape, strides) in elements"""
+
+    def __init__(self, root):
+        key = id(root)
+        self.root = weakref.ref(root, lambda r: _convertedMemories.pop(key, None))
+        self.converted = np.zeros(root.size, dtype=bool)
+        self.units = {}
+        self.regions = {}
+
+    def getRegion(self, values):
+        """Returns the region (offset, shape, strides) in elements of the root array of the values (a view of the root
+        array), None if the values cannot be mapped on the elements of the root array (e.g. a view with another
+        type)"""
+        root = self.root()
+        itemsize = root.dtype.itemsize
+        offset = values.__array_interface__['data'][0] - root.__array_interface__['data'][0]
+        if values.dtype.itemsize != itemsize or offset % itemsize != 0 or any(s % itemsize for s in values.strides):
+            return None
+        return offset // itemsize, values.shape, tuple(s // itemsize for s in values.strides)
+
+    def getConverted(self, region):
+        """Returns the view of the converted flags of the elements of the region"""
+        offset, shape, strides = region
+        itemsize = self.converted.dtype.itemsize
+        return as_strided(self.converted[offset:], shape=shape, strides=tuple(s * itemsize for s in strides))
+
+    def getValues(self, region):
+        """Returns the view of the values of the root array of the region"""
+        offset, shape, strides = region
+        root = self.root().reshape(-1, order='A')
+        return as_strided(root[offset:], shape=shape, strides=tuple(s * root.dtype.itemsize for s in strides))
+
+
+_convertedMemories = {}
+"""Dictionary id of the root array -> ConvertedMemory of the root arrays converted by a WeatherConversionStage. The
+items are removed when the root arrays are released"""
+
+
+def get_root_array(array):
+    """Returns the array owning the memory of the array (the array itself if it is not a view)"""
+    root = array
+    while isinstance(root.base, np.ndarray):
+        root = root.base
+    return root
+
+
+def get_converted_memory(array, create=False):
+    """Returns the ConvertedMemory of the memory of the array (None if the memory was never converted and create is
+    False, or if the root array is not contiguous, so its memory cannot be recorded)"""
+    root = get_root_array(array)
+    memory = _convertedMemories.get(id(root))
+    if memory is not None and memory.root() is root:
+        return memory
+    if not create or not (root.flags.c_contiguous or root.flags.f_contiguous) or root.size == 0:
+        return None
+    memory = _convertedMemories[id(root)] = ConvertedMemory(root)
+    return memory
+
+
+def find_converted_series(series, variable, unit):
+    """
+    Returns a boolean array with an item per series (rows of the two dimensional array series, e.g. the daily values
+    of a variable in the units), True if the series has the same values of a series of the variable converted to the
+    unit of measure in the memory of another array: the series of a copy of converted weather data (e.g.
+    np.array(weather) of the weather of a converted cell), which must not be converted again
+    """
+    found = np.zeros(series.shape[0], dtype=bool)
+    keys = None
+    for memory in list(_convertedMemories.values()):
+        if memory.root() is None or memory.units.get(variable) != unit:
+            continue
+        for region in memory.regions.get(variable, []):
+            values = memory.getValues(region)
+            if values.ndim == 0 or values.shape[-1] != series.shape[1]:
+                continue
+            if keys is None:
+                keys = [row.tobytes() for row in np.asarray(series, dtype=np.float64)]
+            convertedSeries = set(row.tobytes() for row in np.asarray(values, dtype=np.float64).reshape(
+                -1, series.shape[1]))
+            found |= np.array([key in convertedSeries for key in keys], dtype=bool)
+            if found.all():
+                return found
+    return found
+
+
+class WeatherConversion:
+    """Conversion of the unit of measure of a weather variable (a Conversion tag of the WeatherConversions section)"""
+
+    variable = ''
+    """Name of the weather variable, as in the dictionary of the columns of the weather array (e.g. IRRAD)"""
+
+    source = ''
+    """Unit of measure of the input data"""
+
+    target = ''
+    """Unit of measure expected by the model"""
+
+    conversion = None
+    """Python expression of the converted values, using the array 'values' and numpy as 'np' (e.g. 'values * 1000').
+    None if the conversion is one of UNIT_CONVERSIONS"""
+
+    function = None
+    """Function converting an array of values"""
+
+    def __init__(self, variable, source, target, conversion=None):
+        self.variable = variable
+        self.source = source
+        self.target = target
+        self.conversion = conversion
+        if conversion is not None:
+            code = compile(conversion, '<weather conversion ' + variable + '>', 'eval')
+            self.function = lambda values: eval(code, {'np': np}, {'values': values})
+        elif (source, target) in UNIT_CONVERSIONS:
+            self.function = UNIT_CONVERSIONS[(source, target)]
+        else:
+            msg = 'Weather conversion of ' + variable + ': unknown conversion from "' + source + '" to "' + target + \
+                  '". Set the conversion attribute or use one of ' + ', '.join(
+                [s + ' -> ' + t for s, t in UNIT_CONVERSIONS])
+            print(msg)
+            raise Exception(msg)
+
+
+class WeatherConversionStage:
+    """
+    The conversions of the units of measure of the weather data declared in the WeatherConversions section of the
+    workflow:
+
+        <WeatherConversions>
+            <Conversion variable="IRRAD" from="kJ/m2" to="J/m2"/>
+            <Conversion variable="WIND" from="m/s@10m" to="m/s@2m"/>
+            <Conversion variable="TEMP_MAX" from="F" to="C" conversion="(values - 32) / 1.8"/>
+        </WeatherConversions>
+
+    The method apply converts a whole array of weather data with numpy, one variable (column) at a time. The
+    conversions applied are recorded on the memory of the array (see ConvertedMemory), so every value is converted
+    once: applying the stage again to the array, to one of its views (e.g. the weather of a cell of a converted grid)
+    or to an array whose views were converted (e.g. the grid after the weather of some cells) converts only the values
+    not converted yet. The series of daily values equal to converted series of the same variable (e.g. in a copy of the
+    weather of a converted cell made with np.array) are not converted again.
+    """
+
+    conversions = None
+    """List of the WeatherConversion objects"""
+
+    def __init__(self, conversions):
+        """Constructor: conversions is a list of tuples (variable, source unit, target unit, conversion expression or
+        None)"""
+        self.conversions = [WeatherConversion(*c) for c in conversions]
+        variables = [c.variable for c in self.conversions]
+        duplicated = sorted(set(v for v in variables if variables.count(v) > 1))
+        if len(duplicated) > 0:
+            msg = 'More weather conversions for the variables ' + ', '.join(duplicated)
+            print(msg)
+            raise Exception(msg)
+
+    def apply(self, weather, weatherColumnForVariable, copy=False):
+        """
+        Converts the weather data. The variables not in weatherColumnForVariable are skipped.
+
+        :param weather: the weather array, having the days on the second last axis and the variables on the last
+        axis: (days, variables) for a unit, (units, days, variables) or (nx, ny, days, variables) for many units
+        :param weatherColumnForVariable: dictionary variable -> column of the weather array
+        :param copy: if False, the values are converted in place; if True, the array is copied first
+        :return: the converted array (the array itself or its copy)
+        """
+        if not isinstance(weather, np.ndarray) or not np.issubdtype(weather.dtype, np.floating):
+            raise Exception('The weather conversions require a numpy array of floating point values')
+        if copy:
+            weather = np.array(weather)
+        memory = get_converted_memory(weather, create=True)
+        for c in self.conversions:
+            if c.variable not in weatherColumnForVariable:
+                continue
+            values = weather[..., weatherColumnForVariable[c.variable]]
+            region = memory.getRegion(values) if memory is not None else None
+            converted = np.array(memory.getConverted(region)) if region is not None else np.zeros(values.shape, bool)
+            if converted.any() and memory.units[c.variable] != c.target:
+                msg = 'Weather conversion of ' + c.variable + ': the data are in ' + memory.units[
+                    c.variable] + ', expected ' + c.source
+                print(msg)
+                raise Exception(msg)
+            if not converted.any() and values.ndim > 0:
+                # the series of a copy of converted data
+                series = values.reshape(-1, values.shape[-1])
+                converted = np.repeat(find_converted_series(series, c.variable, c.target),
+                                      values.shape[-1]).reshape(values.shape)
+            if not converted.any():
+                values[...] = c.function(np.asarray(values))
+            elif not converted.all():
+                values[~converted] = c.function(np.asarray(values[~converted]))
+            if region is not None:
+                memory.getConverted(region)[...] = True
+                memory.units[c.variable] = c.target
+                regions = memory.regions.setdefault(c.variable, [])
+                if region not in regions:
+                    regions.append(region)
+        return weather
@@ -0,0 +1,373 @@
+""" Classes WorkflowAnalyzer and WorkflowPlan, used to find the steps of a run mode that do not contribute to the
+output variables and to build an optimized plan without them """
+import copy
+import re
+
+from ecrops.Step import ACTIVITY_ALWAYS, is_in_activity_window
+from ecrops.StepRecorder import fingerprintValue, getStatusLeaves, getVariablePaths, sameFingerprint
+
+STATUS_PATH_PATTERN = re.compile(r'status(?:\.[A-Za-z_]\w*)+')
+"""Regular expression of the status variables referenced by the source of an output variable"""
+
+
+class WorkflowPlan:
+    """
+    Result of the analysis of a run mode (see WorkflowAnalyzer.analyze): the steps to keep, in the original order, and
+    the steps that can be dropped because none of their outputs is used, directly or through other steps, by the
+    output variables of the run mode.
+    """
+
+    runMode = ''
+    """Name of the analyzed run mode"""
+
+    outputPaths = None
+    """List of the status variables read by the output variables of the run mode"""
+
+    requiredPaths = None
+    """Set of the status variables required to compute the output variables: the output paths and the inputs of the
+    kept steps"""
+
+    steps = None
+    """List of the steps of the optimized plan, in the original order"""
+
+    prunedSteps = None
+    """List of tuples (step, reason) of the steps dropped from the plan"""
+
+    keptSteps = None
+    """List of tuples (step, reason) of the steps kept in the plan: the reason is the first required variable written
+    by the step, or the reason why the step could not be pruned"""
+
+    undeclaredSideEffects = None
+    """Dictionary step -> list of descriptions of the side effects not declared by the step: missing or invalid
+    getoutputslist, status variables changed by the step but not declared as outputs (found only when the analysis
+    runs some days of the simulation, see WorkflowAnalyzer.analyze)"""
+
+    strict = True
+    """True if the plan was built in strict mode (the default): the steps with undeclared side effects are never
+    pruned"""
+
+    def getPrunedStepNames(self):
+        """Returns the class names of the pruned steps"""
+        return [s.__class__.__name__ for s, reason in self.prunedSteps]
+
+    def report(self):
+        """Returns a textual report of the plan"""
+        lines = ['Run mode ' + self.runMode + ': ' + str(len(self.steps)) + ' steps kept, ' + str(
+            len(self.prunedSteps)) + ' pruned' + (' (strict mode)' if self.strict else '')]
+        lines.append('Output variables read: ' + ', '.join(self.outputPaths))
+        for step, reason in self.keptSteps:
+            lines.append('  KEEP   ' + step.__class__.__name__ + ': ' + reason)
+        for step, reason in self.prunedSteps:
+            lines.append('  PRUNE  ' + step.__class__.__name__ + ': ' + reason)
+        for step, effects in self.undeclaredSideEffects.items():
+            for effect in effects:
+                lines.append('  WARNING ' + step.__class__.__name__ + ': ' + effect)
+        return '\n'.join(lines)
+
+
+class WorkflowAnalyzer:
+    """
+    The WorkflowAnalyzer class analyzes the run modes of a ModelEngine using the inputs and outputs declared by the
+    steps (the 'StatusVariable' of getinputslist and getoutputslist, the same information used by ModelWorkflowReader
+    to build the graph of the workflow). Starting from the status variables read by the output variables of a run
+    mode, it finds the steps that write them and, transitively, the steps that write the inputs of those steps. All
+    the other steps (e.g. SeriesAccumulator when its series are not returned) do not contribute to the outputs and
+    are pruned from the optimized plan:
+
+    - model = ModelEngine(config_file)
+    - analyzer = WorkflowAnalyzer(model)
+    - plan = analyzer.analyze('PotentialRun', status=model.initialize(...), days=365)
+    - print(plan.report())
+    - analyzer.applyPlan(plan)
+
+    Two variables match when they are equal or one of them contains the other (e.g. 'status.states' and
+    'status.states.LAI'); list items are reduced to the list (e.g. 'status.a.LIST[].X' is 'status.a.LIST').
+    The analysis relies on the declarations of the steps: a step that changes the status without declaring it has
+    undeclared side effects. The steps without a valid getoutputslist are always reported; the status variables
+    changed but not declared are found by running some days of the simulation (arguments status and days of analyze).
+    In strict mode (the default) the steps with undeclared side effects are never pruned: e.g. the steps linking the
+    CO2 effect to the assimilation (LinkCo2DataToAssimilation) declare no outputs, and pruning them would silently
+    drop the CO2 effect. They are pruned only if the caller asks it with strict=False. Note that the variables read
+    but not declared as inputs cannot be detected: the steps reading them should declare them.
+    """
+
+    def __init__(self, engine):
+        """Constructor: engine is the ModelEngine whose run modes are analyzed"""
+        self.engine = engine
+
+    def getOutputPaths(self, runMode, outputVariables=None):
+        """Returns the status variables read by the output variables of the run mode, including the aggregated ones
+        (all of them, or the ones whose name is in the outputVariables list)"""
+        paths = []
+        for oVar in (self.engine.getOutputVariables(runMode) or []) + (
+                self.engine.getAggregatedOutputVariables(runMode) or []):
+            if outputVariables is not None and oVar.name not in outputVariables:
+                continue
+            source = oVar.source.split('[')[0]
+            for match in STATUS_PATH_PATTERN.finditer(source):
+                path = match.group(0)
+                # a method call (e.g. status.states.DOM.timetuple()) reads the object of the method
+                if source[match.end():match.end() + 1] == '(':
+                    path = path.rsplit('.', 1)[0]
+                if path not in paths:
+                    paths.append(path)
+        return paths
+
+    def getDeclaredPaths(self, step):
+        """Returns a tuple (inputs, outputs, problems) with the status variables declared as inputs and outputs by
+        the step and the list of the problems of the declarations"""
+        problems = []
+        declared = []
+        for method in ['getinputslist', 'getoutputslist']:
+            variables = getattr(step, method)() if hasattr(step, method) else None
+            if not isinstance(variables, dict):
+                problems.append(method + ' is not implemented or does not return a dictionary')
+                declared.append([])
+                continue
+            for name, attributes in variables.items():
+                if not isinstance(attributes, dict) or 'StatusVariable' not in attributes:
+                    problems.append('variable ' + str(name) + ' of ' + method + ' does not declare the StatusVariable')
+            declared.append(getVariablePaths(variables))
+        # the steps reading nothing are possible, the steps writing nothing are not: they would be useless
+        if len(declared[1]) == 0 and len(problems) == 0:
+            problems.append('getoutputslist does not declare any status variable')
+        return declared[0], declared[1], problems
+
+    def analyze(self, runMode, outputVariables=None, strict=True, status=None, days=0):
+        """
+        Analyzes the run mode and returns the optimized plan (WorkflowPlan).
+
+        :param runMode: the run mode to analyze
+        :param outputVariables: names of the output variables that must be computed (None for all the output
+        variables of the run mode)
+        :param strict: if True (default), the steps with undeclared side effects are kept in the plan; if False, they
+        are pruned when none of their declared outputs is required
+        :param status: optional status returned by the initialize method of the engine: if provided, the run mode is
+        executed for the given number of days on a copy of the status to find the status variables changed by the steps
+        but not declared as outputs
+        :param days: number of days to execute on the copy of the status
+        :returns: the plan (WorkflowPlan)
+        """
+        steps = self.engine.getSteps2Run(runMode)
+        if steps is None:
+            raise Exception('Run mode ' + str(runMode) + ' not found in the loaded workflow')
+
+        undeclaredSideEffects = {}
+        declarations = []
+        for step in steps:
+            inputs, outputs, problems = self.getDeclaredPaths(step)
+            declarations.append((step, inputs, outputs))
+            if len(problems) > 0:
+                undeclaredSideEffects[step] = problems
+        if status is not None and days > 0:
+            for step, paths in self.findUndeclaredWrites(runMode, status, days, declarations).items():
+                undeclaredSideEffects.setdefault(step, []).extend(
+                    'writes the undeclared status variable ' + p for p in paths)
+
+        plan = WorkflowPlan()
+        plan.runMode = runMode
+        plan.strict = strict
+        plan.outputPaths = self.getOutputPaths(runMode, outputVariables)
+        plan.undeclaredSideEffects = undeclaredSideEffects
+
+        # propagate the requirements backwards until no other step becomes required; the aliased variables require
+        # their sources
+        aliases = self.engine.getAliases(runMode) or []
+        required = addAliasSources(set(plan.outputPaths), aliases)
+        reasons = {}
+        changed = True
+        while changed:
+            changed = False
+            for step, inputs, outputs in declarations:
+                if step in reasons:
+                    continue
+                written = [o for o in outputs if any(matchPaths(o, r) for r in required)]
+                if len(written) > 0:
+                    reasons[step] = 'writes ' + written[0]
+                elif strict and step in undeclaredSideEffects:
+                    reasons[step] = 'undeclared side effects'
+                else:
+                    continue
+                required.update(inputs)
+                required = addAliasSources(required, aliases)
+                changed = True
+
+        plan.requiredPaths = required
+        plan.steps = [step for step in steps if step in reasons]
+        plan.keptSteps = [(step, reasons[step]) for step in plan.steps]
+        plan.prunedSteps = [(step, 'no output required (' + (', '.join(outputs) or 'no outputs declared') + ')')
+                            for step, inputs, outputs in declarations if step not in reasons]
+        return plan
+
+    def findUndeclaredWrites(self, runMode, status, days, declarations):
+        """Executes the run mode for some days on a copy of the status, comparing the status before and after every
+        integrate and runstep call of the steps
+        :returns: a dictionary step -> list of the status variables changed by the step and not declared as outputs
+        """
+        probe = UndeclaredWritesProbe(declarations)
+        savedRecorder = self.engine.recorder
+        self.engine.recorder = probe
+        try:
+            status = copy.deepcopy(status)
+            for d in range(days):
+                status = self.engine.executeStep(status, runMode)
+        finally:
+            self.engine.recorder = savedRecorder
+        return probe.undeclared
+
+    def checkActivityWindows(self, runMode, status, days):
+        """
+        Checks the activity windows declared by the steps of the run mode (see Step.activity_window): the run mode is
+        executed for some days on a copy of the status calling the runstep of all the steps every day, and the runstep
+        calls out of the declared window are compared with the status before the call.
+
+        :param runMode: the run mode to check
+        :param status: the status returned by the initialize method of the engine
+        :param days: number of days to execute
+        :returns: a dictionary step -> list of the descriptions of the disagreements between the declared window and
+        the observed behaviour: the status variables changed by the runstep out of the window and the days in which
+        the window changes between the evaluation of the engine (at the first step declaring it) and the call
+        """
+        steps = self.engine.getSteps2Run(runMode)
+        if steps is None:
+            raise Exception('Run mode ' + str(runMode) + ' not found in the loaded workflow')
+        windows = {}
+        for step in steps:
+            window = getattr(step, 'activity_window', ACTIVITY_ALWAYS)
+            if window != ACTIVITY_ALWAYS:
+                windows[step] = window
+        probe = ActivityWindowsProbe(windows)
+        if len(windows) == 0:
+            return probe.problems
+        savedRecorder = self.engine.recorder
+        savedActivityWindows = self.engine.activity_windows
+        self.engine.recorder = probe
+        self.engine.activity_windows = False
+        try:
+            status = copy.deepcopy(status)
+            for d in range(days):
+                status = self.engine.executeStep(status, runMode)
+        finally:
+            self.engine.recorder = savedRecorder
+            self.engine.activity_windows = savedActivityWindows
+        return probe.problems
+
+    def applyPlan(self, plan):
+        """Replaces the steps of the run mode of the engine (and its pre-crop steps) with the steps of the plan"""
+        for workflow in self.engine.Workflows:
+            if workflow.name == plan.runMode:
+                workflow.steps = list(plan.steps)
+                if workflow.precropSteps is not None:
+                    workflow.precropSteps = [s for s in workflow.precropSteps if s in plan.steps]
+
+
+class UndeclaredWritesProbe:
+    """
+    Finds the status variables changed by the steps and not declared as outputs. It implements the methods of
+    StepRecorder called by the ModelEngine (see ModelEngine.callStepMethod), so it is attached to the engine as its
+    recorder: before every call it takes the fingerprints of the status variables (path -> fingerprint, see
+    flattenStatus) that are compared with the ones after the call.
+    """
+
+    def __init__(self, declarations):
+        self.outputs = {step: outputs for step, inputs, outputs in declarations}
+        self.undeclared = {}
+
+    def isRecorded(self, status, runMode, step):
+        return step in self.outputs
+
+    def captureInputs(self, status, runMode, step):
+        return flattenStatus(status)
+
+    def addRecord(self, status, runMode, step, method, inputs):
+        after = flattenStatus(status)
+        outputs = self.outputs[step]
+        for path in set(inputs) | set(after):
+            if path in inputs and path in after and sameFingerprint(after[path], inputs[path]):
+                continue
+            if any(matchPaths(path, o) for o in outputs):
+                continue
+            paths = self.undeclared.setdefault(step, [])
+            if path not in paths:
+                paths.append(path)
+
+
+class ActivityWindowsProbe:
+    """
+    Compares the behaviour of the steps declaring an activity window with the declaration (see
+    WorkflowAnalyzer.checkActivityWindows). It implements the methods of StepRecorder called by the ModelEngine, so it is
+    attached to the engine as its recorder: before every call of the steps it takes the fingerprints of the status
+    variables and evaluates the window; after the runstep calls out of the window it reports the status variables changed.
+    """
+
+    def __init__(self, windows):
+        self.windows = windows
+        self.problems = {}
+        self._day = None
+        self._dayWindows = {}
+
+    def isRecorded(self, status, runMode, step):
+        return step in self.windows
+
+    def captureInputs(self, status, runMode, step):
+        active = is_in_activity_window(self.windows[step], status)
+        # the status is compared only for the calls out of the window
+        return None if active else flattenStatus(status), active
+
+    def addRecord(self, status, runMode, step, method, inputs):
+        if method != 'runstep':
+            return
+        # the engine evaluates every window once per day, before the runstep of the first step declaring it
+        if status.day != self._day:
+            self._day = status.day
+            self._dayWindows = {}
+        before, active = inputs
+        window = self.windows[step]
+        engineActive = self._dayWindows.setdefault(window, active)
+        if engineActive != active:
+            self._addProblem(step, 'the window ' + window + ' is ' + ('open' if active else 'closed') + ' at the call '
+                             + 'but ' + ('open' if engineActive else 'closed') + ' for the engine: the step runs after '
+                             + 'a step changing the crop phase dates (on ' + str(status.day) + ')')
+        if active:
+            return
+        after = flattenStatus(status)
+        changed = [path for path in sorted(set(before) | set(after)) if
+                   path not in before or path not in after or not sameFingerprint(after[path], before[path])]
+        if len(changed) > 0:
+            self._addProblem(step, 'runstep changes ' + ', '.join(changed) + ' out of the window ' + window + ' (on ' +
+                             str(status.day) + ')')
+
+    def _addProblem(self, step, description):
+        """Adds the description to the problems of the step, reporting only the first day of the same problem"""
+        problems = self.problems.setdefault(step, [])
+        if not any(p.split(' (on ')[0] == description.split(' (on ')[0] for p in problems):
+            problems.append(description)
+
+
+def flattenStatus(status):
+    """Returns a dictionary path -> fingerprint of the value of all the variables of the status (see
+    ecrops.StepRecorder.fingerprintValue), that is compared with the fingerprints taken at another time to find the
+    changed variables without copying the status"""
+    return {path: fingerprintValue(value) for path, value in getStatusLeaves(status).items()}
+
+
+def addAliasSources(paths, aliases):
+    """Adds to the set of status variables the sources of the aliases (tuples (source, target), see StatusAliases)
+    whose target matches one of the variables"""
+    changed = True
+    while changed:
+        changed = False
+        for source, target in aliases:
+            if source not in paths and any(matchPaths(target, p) for p in paths):
+                paths.add(source)
+                changed = True
+    return paths
+
+
+def matchPaths(path, other):
+    """Returns True if the two status variables are equal or one of them contains the other"""
+    if len(path) == len(other):
+        return path == other
+    if len(path) < len(other):
+        return other.startswith(path) and other[len(path)] == '.'
+    return path.startswith(other) and path[len(other)] == '.'
@@ -1,4 +1,4 @@
-from ecrops.Step import Step
+from ecrops.Step import Step, ACTIVITY_EMERGENCE_TO_MATURITY
 from ..Printable import Printable
 
 class CalculateNewPartitioning(Step):
@@ -24,6 +24,9 @@ class CalculateNewPartitioning(Step):
 
     """
 
+    activity_window = ACTIVITY_EMERGENCE_TO_MATURITY
+    """The runstep is executed only after emergence and before maturity"""
+
     def getparameterslist(self):
         return {
             "CVL": {"Description": "Conversion factor for assimilates to leaves", "Type": "Number", "Mandatory": "True",
@@ -0,0 +1,140 @@
+""" Loader of the weather CSV files (e.g. SampleWeatherSantaLucia1959-2019.csv of EcropsWofostExampleConsole), with a
+binary cache of the parsed values saved next to the file """
+import glob
+import io
+import os
+import re
+
+import numpy as np
+
+# the pandas package is optional: when installed, its C parser reads the files
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+REQUIRED_VARIABLES = ['TEMP_MAX', 'TEMP_MIN', 'IRRAD', 'RAIN']
+"""Weather variables always read by the Weather step"""
+
+CACHE_EXTENSION = '.npy'
+"""Extension of the cache files"""
+
+_EMPTY_FIELD = re.compile(r'(?<=;)[ \t]*(?=;|$)|^[ \t]*(?=;)', re.MULTILINE)
+"""Empty fields (also made only of spaces and tabs) of the lines of a CSV file delimited by ';', replaced by nan before
+parsing the numbers. The blank lines are not matched"""
+
+
+def load_csv_weather(fileName, weatherColumnForVariable=None, delimiter=';', cache=True,
+                     requiredVariables=REQUIRED_VARIABLES):
+    """
+    Loads a weather CSV file: a header line with the names of the columns, then one line per day with the values of
+    the columns. The empty values (also made only of spaces and tabs) are NaN. The result is the same of
+    np.genfromtxt(fileName, delimiter=delimiter, skip_header=1, dtype=float), read faster: with the C parser of pandas,
+    if installed, otherwise with np.loadtxt.
+
+    If cache is True, the parsed array is saved next to the file (in the file fileName.SIZE.MTIME.npy, where SIZE and
+    MTIME are the size and the modification time in nanoseconds of the CSV file), and it is loaded from there by the
+    next calls, as long as the CSV file is not changed. The caches of the older versions of the file are removed.
+    If the cache cannot be written (e.g. read-only folder) a warning is printed.
+
+    The dictionary of the columns of the weather variables, if given, is checked against the file: its values can be
+    the indexes of the columns or the names of the header, and the variables in requiredVariables must be present. An
+    exception is raised if a column does not exist.
+
+    :param fileName: path of the CSV file
+    :param weatherColumnForVariable: optional dictionary variable -> column index or column name
+    :param delimiter: the delimiter of the columns
+    :param cache: True to use the cache file
+    :param requiredVariables: the variables that must be in weatherColumnForVariable
+    :return: the weather array (days, columns) if weatherColumnForVariable is None, otherwise a tuple (weather array,
+    dictionary variable -> column index)
+    """
+    with open(fileName) as f:
+        header = [c.strip() for c in f.readline().strip().split(delimiter)]
+
+    data = None
+    cacheFileName = None
+    if cache:
+        st = os.stat(fileName)
+        cacheFileName = fileName + '.' + str(st.st_size) + '.' + str(st.st_mtime_ns) + CACHE_EXTENSION
+        if os.path.exists(cacheFileName):
+            try:
+                data = np.load(cacheFileName)
+            except (OSError, ValueError) as exc:
+                print('Warning: could not read the weather cache ' + cacheFileName + ': ' + str(exc))
+                data = None
+            if data is not None and (data.ndim != 2 or data.shape[1] != len(header)):
+                data = None
+
+    if data is None:
+        data = parse_csv_weather(fileName, len(header), delimiter)
+        if cache:
+            save_cache(fileName, cacheFileName, data)
+
+    if weatherColumnForVariable is None:
+        return data
+    return data, check_weather_columns(fileName, header, weatherColumnForVariable, requiredVariables)
+
+
+def parse_csv_weather(fileName, numberOfColumns, delimiter=';'):
+    """Parses the values of a weather CSV file (skipping the header line) and returns the array (days, columns)"""
+    if pandas is not None:
+        data = pandas.read_csv(fileName, sep=delimiter, header=0, names=list(range(numberOfColumns)), dtype=float,
+                               skipinitialspace=True, engine='c').to_numpy()
+    else:
+        with open(fileName) as f:
+            f.readline()
+            text = f.read()
+        if delimiter != ';':
+            text = text.replace(delimiter, ';')
+        data = np.loadtxt(io.StringIO(_EMPTY_FIELD.sub('nan', text)), delimiter=';', dtype=float, ndmin=2)
+    if data.shape[1] != numberOfColumns:
+        msg = 'The file ' + fileName + ' has ' + str(data.shape[1]) + ' columns of values and ' + str(
+            numberOfColumns) + ' names in the header'
+        print(msg)
+        raise Exception(msg)
+    return data
+
+
+def save_cache(fileName, cacheFileName, data):
+    """Saves the parsed array to the cache file and removes the caches of the older versions of the CSV file"""
+    # write to a temporary file and then rename it, so that concurrent processes never read a partial file
+    tmp = cacheFileName + '.' + str(os.getpid()) + CACHE_EXTENSION
+    try:
+        np.save(tmp, data)
+        os.replace(tmp, cacheFileName)
+        for oldCache in glob.glob(glob.escape(fileName) + '.*.*' + CACHE_EXTENSION):
+            if oldCache != cacheFileName and re.fullmatch(r'\.\d+\.\d+' + re.escape(CACHE_EXTENSION),
+                                                          oldCache[len(fileName):]):
+                os.remove(oldCache)
+    except OSError as exc:
+        print('Warning: could not save the weather cache ' + cacheFileName + ': ' + str(exc))
+
+
+def check_weather_columns(fileName, header, weatherColumnForVariable, requiredVariables=REQUIRED_VARIABLES):
+    """
+    Checks the dictionary of the columns of the weather variables against the header of a CSV file and returns it with
+    the column names replaced by their indexes. An exception is raised if a column does not exist or if a required
+    variable is missing.
+    """
+    columns = {}
+    for variable, column in weatherColumnForVariable.items():
+        if isinstance(column, str):
+            if column not in header:
+                msg = 'Weather variable ' + variable + ': the column ' + column + ' is not in the file ' + fileName + \
+                      ' (columns ' + ', '.join(header) + ')'
+                print(msg)
+                raise Exception(msg)
+            column = header.index(column)
+        elif not 0 <= column < len(header):
+            msg = 'Weather variable ' + variable + ': the column ' + str(column) + ' is not in the file ' + fileName + \
+                  ', which has ' + str(len(header)) + ' columns'
+            print(msg)
+            raise Exception(msg)
+        columns[variable] = int(column)
+    missing = [v for v in requiredVariables if v not in columns]
+    if len(missing) > 0:
+        msg = 'The weather variables ' + ', '.join(missing) + ' are missing in the columns of the file ' + fileName
+        print(msg)
+        raise Exception(msg)
+    return columns
@@ -1,2 +1,2 @@
 """eCrops vesion file"""
-__version__ = '1.9.0'
\ No newline at end of file
+__version__ = '1.10.0'
\ No newline at end of file
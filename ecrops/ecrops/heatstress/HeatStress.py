@@ -1,8 +1,109 @@
+import collections
+
+import numpy as np
+
 from ..Printable import Printable
 from ecrops.Step import Step
 
+
+def linear_reduction_factor(canopyTemperature, tdamage, tkill):
+    """Returns the daily heat stress reduction factor, decreasing linearly from 1 (canopy temperature <= tdamage) to 0
+    (canopy temperature >= tkill)"""
+    if (canopyTemperature <= tdamage):
+        return 1
+    if (canopyTemperature >= tkill):
+        return 0
+
+    if (tdamage < canopyTemperature and canopyTemperature < tkill):
+        return (1 / (tdamage - tkill)) * canopyTemperature - (tkill / (tdamage - tkill))
+
+    raise Exception(
+        "Inconsistent status: canopytemp=" + str(canopyTemperature) + " tdamage=" + str(tdamage) + " tkill= " + str(
+            tkill))  # should never happen
+
+
+def quadratic_reduction_factor(canopyTemperature, tdamage, tkill):
+    """Returns the daily heat stress reduction factor, decreasing quadratically from 1 (canopy temperature <= tdamage)
+    to 0 (canopy temperature >= tkill)"""
+    if (canopyTemperature <= tdamage):
+        return 1
+    if (canopyTemperature >= tkill):
+        return 0
+
+    if (tdamage < canopyTemperature and canopyTemperature < tkill):
+        return 1 - (((canopyTemperature - tdamage) / (tkill - tdamage)) ** 2)
+
+    raise Exception(
+        "Inconsistent status: canopytemp=" + str(canopyTemperature) + " tdamage=" + str(tdamage) + " tkill= " + str(
+            tkill))  # should never happen
+
+
+def get_reduction_factor_function(reductionFactorMethod):
+    """Returns the function calculating the daily reduction factor for the ReductionFactorMethod parameter: the linear
+    one for "Linear", the quadratic one otherwise"""
+    if (reductionFactorMethod == "Linear"):
+        return linear_reduction_factor
+    return quadratic_reduction_factor
+
+
+def reduction_factors(canopyTemperatures, tdamage, tkill, reductionFactorMethod):
+    """
+    Returns the daily heat stress reduction factors of a whole series of canopy temperatures at once, as the HeatStress
+    step calculates them day by day: for example the canopy temperatures of all the days of the season of many grid
+    cells, to screen the heat stress across a grid.
+
+    :param canopyTemperatures: array of canopy temperatures (any shape, e.g. (cells, days))
+    :param tdamage: damage base temperature, a number or an array broadcastable to the temperatures (e.g. with shape
+    (cells, 1))
+    :param tkill: kill threshold temperature, a number or an array broadcastable to the temperatures
+    :param reductionFactorMethod: "Linear" or "Quadratic" (as the ReductionFactorMethod parameter)
+    :return: array of the reduction factors, with the shape of the temperatures
+    """
+    canopyTemperatures = np.asarray(canopyTemperatures, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if (reductionFactorMethod == "Linear"):
+            factors = (1 / (tdamage - tkill)) * canopyTemperatures - (tkill / (tdamage - tkill))
+        else:
+            factors = 1 - (((canopyTemperatures - tdamage) / (tkill - tdamage)) ** 2)
+    return np.where(canopyTemperatures <= tdamage, 1., np.where(canopyTemperatures >= tkill, 0., factors))
+
+
+def anthesis_period_stress_factors(dailyFactors, anthesysPeriodDamegeComputationMethod, axis=-1):
+    """
+    Returns the stress factors of the anthesis periods from their daily reduction factors (see reduction_factors), as
+    the HeatStress step calculates them on the last day of the anthesis period: only the days with factor lower than 1
+    are considered, combined with the AnthesysPeriodDamegeComputationMethod parameter. The sums and the products are
+    calculated by NumPy, so the results can differ from the ones of the step in the last digits.
+
+    :param dailyFactors: array of the daily reduction factors of the anthesis periods (e.g. shape (cells, days))
+    :param anthesysPeriodDamegeComputationMethod: "Average of the damages", "Greater of the damages", "Product of the
+    damages" or "Sum of the damages"
+    :param axis: axis of the days of the anthesis periods
+    :return: array of the stress factors of the anthesis periods
+    """
+    dailyFactors = np.asarray(dailyFactors, dtype=float)
+    stressed = dailyFactors < 1
+    count = np.count_nonzero(stressed, axis=axis)
+    if (anthesysPeriodDamegeComputationMethod == "Average of the damages"):
+        total = np.sum(np.where(stressed, dailyFactors, 0.), axis=axis)
+        return np.where(count > 0, total / np.maximum(count, 1), 1.)
+    if (anthesysPeriodDamegeComputationMethod == "Sum of the damages"):
+        return np.sum(np.where(stressed, 1 - dailyFactors, 0.), axis=axis)
+    if (anthesysPeriodDamegeComputationMethod == "Greater of the damages"):
+        return np.where(count > 0, np.max(np.where(stressed, dailyFactors, -np.inf), axis=axis), 1.)
+    if (anthesysPeriodDamegeComputationMethod == "Product of the damages"):
+        return np.prod(np.where(stressed, dailyFactors, 1.), axis=axis)
+    return np.ones(count.shape)
+
+
 class HeatStress(Step):
-    """Calculation of the Heat Stress"""
+    """Calculation of the Heat Stress
+
+    The canopy temperatures of the days before anthesis are kept in a ring buffer of NUMBER_OF_DAYS_AROUND_FLOWERING + 1
+    days (a deque with maximum length) and the function of the reduction factor is selected once, from the
+    ReductionFactorMethod parameter, in setparameters. The stress factor of the anthesis period is updated every day
+    with a stress, with the configured AnthesysPeriodDamegeComputationMethod. The functions reduction_factors and
+    anthesis_period_stress_factors of this module calculate the same factors on whole arrays at once."""
 
     def getparameterslist(self):
         return {
@@ -31,13 +132,17 @@ class HeatStress(Step):
         status.heatstress.params.TKill = status.TKill
         status.heatstress.params.AnthesysPeriodDamegeComputationMethod = status.AnthesysPeriodDamegeComputationMethod
         status.heatstress.params.ReductionFactorMethod = status.ReductionFactorMethod
+        # function calculating the daily reduction factor, selected once
+        status.heatstress.params.ReductionFactor = get_reduction_factor_function(status.ReductionFactorMethod)
         return status
 
     def initialize(self, status):
         status.heatstress.canopytemperature = 0
         status.heatstress.DailyHeatStressFactor = 1
-        status.heatstress.CanopyTemperatureLastNdays = []
+        status.heatstress.CanopyTemperatureLastNdays = collections.deque(
+            maxlen=int(status.heatstress.params.NUMBER_OF_DAYS_AROUND_FLOWERING) + 1)  # ring buffer of the last days
         status.heatstress.DailyStressesAroundAnthesis = []
+        status.heatstress.RunningStressAroundAnthesis = self.getInitialRunningStress(status.heatstress.params)
         status.heatstress.CanopyTemperatureSinceNDaysAfterAnthesis = []
         status.heatstress.HIMAX = 1  # maximum attainable heat stress (always 1 by convention)
         status.heatstress.AnthesisReached = False
@@ -50,30 +155,48 @@ class HeatStress(Step):
         return status
 
     def CalculateLinearReductionFactor(self, canopyTemperature, tdamage, tkill):
-
-        if (canopyTemperature <= tdamage):
-            return 1
-        if (canopyTemperature >= tkill):
-            return 0
-
-        if (tdamage < canopyTemperature and canopyTemperature < tkill):
-            return (1 / (tdamage - tkill)) * canopyTemperature - (tkill / (tdamage - tkill))
-
-        raise Exception(
-            "Inconsistent status: canopytemp=" + canopyTemperature + " tdamage=" + tdamage + " tkill= " + tkill)  # should never happen
+        return linear_reduction_factor(canopyTemperature, tdamage, tkill)
 
     def CalculateQuadraticReductionFactor(self, canopyTemperature, tdamage, tkill):
-
-        if (canopyTemperature <= tdamage):
-            return 1
-        if (canopyTemperature >= tkill):
+        return quadratic_reduction_factor(canopyTemperature, tdamage, tkill)
+
+    def getInitialRunningStress(self, p):
+        """Returns the value of the stress factor of the anthesis period before any stress: the sum of the stresses for
+        "Average of the damages", the sum of the damages for "Sum of the damages" and the product of the stresses for
+        "Product of the damages" start from 0, 0 and 1, the greater stress is set by the first stress"""
+        if (p.AnthesysPeriodDamegeComputationMethod == "Average of the damages" or
+                p.AnthesysPeriodDamegeComputationMethod == "Sum of the damages"):
             return 0
-
-        if (tdamage < canopyTemperature and canopyTemperature < tkill):
-            return 1 - (((canopyTemperature - tdamage) / (tkill - tdamage)) ** 2)
-
-        raise Exception(
-            "Inconsistent status: canopytemp=" + canopyTemperature + " tdamage=" + tdamage + " tkill= " + tkill)  # should never happen
+        return 1
+
+    def addDailyStress(self, heatstress, dailyStress):
+        """Saves the stress factor of a day of the anthesis period (if different from 1) to the list of stress factors
+        around anthesys and updates the running value of the configured AnthesysPeriodDamegeComputationMethod"""
+        heatstress.DailyStressesAroundAnthesis.append(dailyStress)
+        method = heatstress.params.AnthesysPeriodDamegeComputationMethod
+        if (method == "Average of the damages"):
+            heatstress.RunningStressAroundAnthesis = heatstress.RunningStressAroundAnthesis + dailyStress
+        elif (method == "Sum of the damages"):
+            heatstress.RunningStressAroundAnthesis = heatstress.RunningStressAroundAnthesis + (1 - dailyStress)
+        elif (method == "Greater of the damages"):
+            if (len(heatstress.DailyStressesAroundAnthesis) == 1 or dailyStress > heatstress.RunningStressAroundAnthesis):
+                heatstress.RunningStressAroundAnthesis = dailyStress
+        elif (method == "Product of the damages"):
+            heatstress.RunningStressAroundAnthesis = dailyStress * heatstress.RunningStressAroundAnthesis
+
+    def getStressAroundAnthesis(self, heatstress):
+        """Returns the final stress factor of the anthesys period from the running value (1 if no stress happened,
+        except for "Sum of the damages" that is 0)"""
+        method = heatstress.params.AnthesysPeriodDamegeComputationMethod
+        if (method == "Average of the damages"):
+            # the final stress factor during anthesys is the average of the stress factors happened during the anthesys period.If no stress happened, then is 1
+            if (len(heatstress.DailyStressesAroundAnthesis) > 0):
+                return heatstress.RunningStressAroundAnthesis / len(heatstress.DailyStressesAroundAnthesis)
+            return 1
+        if (method == "Sum of the damages" or method == "Greater of the damages" or method == "Product of the damages"):
+            # the sum of the damages, the greater or the product of the stress factors happened during the anthesys period
+            return heatstress.RunningStressAroundAnthesis
+        return 1
 
     def runstep(self, status):
 
@@ -83,18 +206,16 @@ class HeatStress(Step):
         if (status.states.DVS == 0):  # when there is no crop
             # clear all the lists
             status.heatstress.DailyStressesAroundAnthesis = []
+            status.heatstress.RunningStressAroundAnthesis = self.getInitialRunningStress(p)
             status.heatstress.CanopyTemperatureSinceNDaysAfterAnthesis = []
-            status.heatstress.CanopyTemperatureLastNdays = []
+            status.heatstress.CanopyTemperatureLastNdays.clear()
 
         # before anthesis store the canopy temp of previous NUMBER_OF_DAYS_AROUND_FLOWERING days
         if (status.states.DVS < 1):
-            # add canopy temperature  of current day
+            # add canopy temperature  of current day: the ring buffer keeps NUMBER_OF_DAYS_AROUND_FLOWERING + 1 days,
+            # removing the oldest value
             status.heatstress.CanopyTemperatureLastNdays.append(status.heatstress.canopytemperature)
 
-            # if the lenght of the list is greater than the  NUMBER_OF_DAYS_AROUND_FLOWERING parameter
-            if (len(status.heatstress.CanopyTemperatureLastNdays) > (p.NUMBER_OF_DAYS_AROUND_FLOWERING + 1)):
-                del status.heatstress.CanopyTemperatureLastNdays[0]  # remove the oldest value
-
         if (status.states.DVS < 1):  # before anthesis initialize the ouputs
             status.heatstress.AnthesisReached = False
             status.heatstress.MaturityReached = False
@@ -114,71 +235,27 @@ class HeatStress(Step):
 
                 for canopyTemperatureLast7Day in status.heatstress.CanopyTemperatureLastNdays:  # at this day, the list contains NUMBER_OF_DAYS_AROUND_FLOWERING elements, all NUMBER_OF_DAYS_AROUND_FLOWERING the days before anthesys
 
-                    linearHeatStressFactor2 = self.CalculateLinearReductionFactor(canopyTemperatureLast7Day, p.TDamage,
-                                                                                  p.TKill)
-                    quadraticHeatStessFactor2 = self.CalculateQuadraticReductionFactor(canopyTemperatureLast7Day,
-                                                                                       p.TDamage, p.TKill)
-                    if (p.ReductionFactorMethod == "Linear"):
-                        status.heatstress.DailyHeatStressFactor = linearHeatStressFactor2
-                    else:
-                        status.heatstress.DailyHeatStressFactor = quadraticHeatStessFactor2
+                    status.heatstress.DailyHeatStressFactor = p.ReductionFactor(canopyTemperatureLast7Day, p.TDamage,
+                                                                                p.TKill)
 
                     if (status.heatstress.DailyHeatStressFactor < 1):
-                        status.heatstress.DailyStressesAroundAnthesis.append(
-                            status.heatstress.DailyHeatStressFactor)  # save the stress factor ( if different from 1) to the list of stress factors around anthesys
+                        self.addDailyStress(status.heatstress, status.heatstress.DailyHeatStressFactor)
 
         # the NUMBER_OF_DAYS_AROUND_FLOWERING days after the anthesis day (do the calculation on current day)
         if (
                 status.heatstress.DaysAfterAnthesis > 0 and status.heatstress.DaysAfterAnthesis <= p.NUMBER_OF_DAYS_AROUND_FLOWERING):
 
-            linearHeatStressFactor2 = self.CalculateLinearReductionFactor(status.heatstress.canopytemperature,
-                                                                          p.TDamage, p.TKill)
-            quadraticHeatStessFactor2 = self.CalculateQuadraticReductionFactor(status.heatstress.canopytemperature,
-                                                                               p.TDamage, p.TKill)
-            if (p.ReductionFactorMethod == "Linear"):
-                status.heatstress.DailyHeatStressFactor = linearHeatStressFactor2
-            else:
-                status.heatstress.DailyHeatStressFactor = quadraticHeatStessFactor2
+            status.heatstress.DailyHeatStressFactor = p.ReductionFactor(status.heatstress.canopytemperature, p.TDamage,
+                                                                        p.TKill)
 
             if (status.heatstress.DailyHeatStressFactor < 1):
-                status.heatstress.DailyStressesAroundAnthesis.append(
-                    status.heatstress.DailyHeatStressFactor)  # save the stress factor ( if different from 1) to the list of stress factors around anthesys
+                self.addDailyStress(status.heatstress, status.heatstress.DailyHeatStressFactor)
 
             if (
                     status.heatstress.DaysAfterAnthesis == p.NUMBER_OF_DAYS_AROUND_FLOWERING):  # the last day of the anthesis period (from this day HarvestIndexAfterAnthesis does not change anymore)
 
-                cumulativeStressFactorAroundAnthesys = 1;
-
-                if (
-                        p.AnthesysPeriodDamegeComputationMethod == "Average of the damages"):  # the final stress factor during anthesys is the average of the stress factors happened during the anthesys period.If no stress happened, then is 1
-
-                    if (len(status.heatstress.DailyStressesAroundAnthesis) > 0):
-                        cumulativeStressFactorAroundAnthesys = sum(status.heatstress.DailyStressesAroundAnthesis) / len(
-                            status.heatstress.DailyStressesAroundAnthesis)
-                else:
-                    if (
-                            p.AnthesysPeriodDamegeComputationMethod == "Sum of the damages"):  # the final stress factor during anthesys is the average of the stress factors happened during the anthesys period.If no stress happened, then is 1
-
-                        cumulativeStressFactorAroundAnthesys = 0
-                        if (len(status.heatstress.DailyStressesAroundAnthesis) > 0):
-                            for u in status.heatstress.DailyStressesAroundAnthesis:
-                                cumulativeStressFactorAroundAnthesys += (1 - u)
-
-                    else:
-                        if (
-                                p.AnthesysPeriodDamegeComputationMethod == "Greater of the damages"):  # the final stress factor during anthesys is the greater of the stress factors happened during the anthesys period.If no stress happened, then is 1
-
-                            if (len(status.heatstress.DailyStressesAroundAnthesis) > 0):
-                                cumulativeStressFactorAroundAnthesys = max(
-                                    status.heatstress.DailyStressesAroundAnthesis)
-
-                        else:
-                            if (
-                                    p.AnthesysPeriodDamegeComputationMethod == "Product of the damages"):  # the final stress factor during anthesys is the product of the stress factors happened during the anthesys period.If no stress happened, then is 1
-
-                                if (len(status.heatstress.DailyStressesAroundAnthesis) > 0):
-                                    for v in status.heatstress.DailyStressesAroundAnthesis:
-                                        cumulativeStressFactorAroundAnthesys = v * cumulativeStressFactorAroundAnthesys
+                # the stress factor of the anthesys period, calculated with the configured method on the running value
+                cumulativeStressFactorAroundAnthesys = self.getStressAroundAnthesis(status.heatstress)
 
                 status.heatstress.HarvestIndexAfterAnthesis = cumulativeStressFactorAroundAnthesys * status.heatstress.HarvestIndexAfterAnthesis
                 status.heatstress.FinalHarvestIndex = status.heatstress.HarvestIndexAfterAnthesis
@@ -6,11 +6,14 @@
 
 from ..Printable import Printable
 import math
-from ecrops.Step import Step
+from ecrops.Step import Step, ACTIVITY_EMERGENCE_TO_MATURITY
 
 class HermesRootDepth(Step):
     """Calculation of root distribution and root length density. Used by HERMES for water uptake"""
 
+    activity_window = ACTIVITY_EMERGENCE_TO_MATURITY
+    """The runstep is executed only after emergence and before maturity"""
+
     def getparameterslist(self):
         return {
             "IncreaseRootingDepth": {
@@ -0,0 +1,212 @@
+""" Tiled reader of the weather data of a NetCDF file: the grid is read one spatial tile at a time, following the chunks
+of the file, while the next tile is read on a background thread """
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# the netCDF4 package is needed to read the NetCDF files
+try:
+    from netCDF4 import Dataset
+except ImportError:
+    Dataset = None
+
+DEFAULT_TILE_CELLS = 4096
+"""Default maximum number of grid cells of a tile (when a chunk of the file is larger, the tile is a chunk)"""
+
+
+class WeatherTile:
+    """A rectangular tile of the grid, with the weather data of its cells"""
+
+    x_from = 0
+    """First index of the tile along the first grid dimension"""
+
+    x_to = 0
+    """Index after the last one of the tile along the first grid dimension"""
+
+    y_from = 0
+    """First index of the tile along the second grid dimension"""
+
+    y_to = 0
+    """Index after the last one of the tile along the second grid dimension"""
+
+    data = None
+    """The weather data of the cells of the tile, an array with shape (x_to - x_from, y_to - y_from, days,
+    variables)"""
+
+    def __init__(self, x_from, x_to, y_from, y_to, data=None):
+        self.x_from = x_from
+        self.x_to = x_to
+        self.y_from = y_from
+        self.y_to = y_to
+        self.data = data
+
+    def getCell(self, x, y):
+        """Returns the weather array (days, variables) of the cell (x, y), in grid coordinates: a view of the tile
+        data"""
+        return self.data[x - self.x_from, y - self.y_from]
+
+    def getCells(self):
+        """Returns the list of the grid coordinates (x, y) of the cells of the tile"""
+        return [(x, y) for x in range(self.x_from, self.x_to) for y in range(self.y_from, self.y_to)]
+
+
+class TiledNetCDFWeatherReader:
+    """
+    Reads the weather variables of a NetCDF file, having dimensions (time, x, y) like the sample file
+    weatherSample_2003.nc of EcropsWofostExampleConsole, one spatial tile at a time, so that the memory used depends on
+    the size of the tiles and not on the size of the grid:
+
+    - reader = TiledNetCDFWeatherReader('weather.nc', ['temperature_max', 'temperature_min', ...], days=365)
+    - for tile in reader:
+          for x, y in tile.getCells():
+              weather = tile.getCell(x, y)
+              ...
+
+    The tiles are made of whole chunks of the file (see getTileShape), so every chunk is read and decompressed once.
+    The file is opened once for all the tiles, and all the variables of a tile are read together. The conversions of
+    the units of measure (dictionary variable -> function of an array returning the converted array) are applied to
+    the values of the whole tile.
+
+    When prefetch is True (default), the next tile is read on a background thread while the caller uses the current
+    one (e.g. running the simulations of its cells), so at most two tiles are in memory. All the calls to the netCDF4
+    package are done by the same background thread.
+    """
+
+    fileName = ''
+    """Path of the NetCDF file"""
+
+    variables = None
+    """Names of the weather variables read, in the order of the columns of the weather arrays"""
+
+    day_from = 0
+    """Index of the first day read"""
+
+    days = None
+    """Number of days read"""
+
+    shape = None
+    """Shape (nx, ny) of the grid"""
+
+    chunkShape = None
+    """Shape (x, y) of the chunks of the file, (1, ny) if the variables are not chunked"""
+
+    tileShape = None
+    """Shape (x, y) of the tiles"""
+
+    conversions = None
+    """Dictionary variable -> function converting the array of the values of the variable"""
+
+    dtype = np.float32
+    """Type of the values of the weather arrays"""
+
+    prefetch = True
+    """If True, the next tile is read on a background thread"""
+
+    def __init__(self, fileName, variables, day_from=0, days=None, tileShape=None, maxTileCells=DEFAULT_TILE_CELLS,
+                 conversions=None, dtype=np.float32, prefetch=True):
+        """
+        Constructor: reads the dimensions and the chunks of the variables.
+
+        :param fileName: path of the NetCDF file
+        :param variables: names of the weather variables to read, with dimensions (time, x, y)
+        :param day_from: index of the first day read
+        :param days: number of days read (default: all the days from day_from)
+        :param tileShape: shape (x, y) of the tiles. If None, it is calculated from the chunks of the file and
+        maxTileCells
+        :param maxTileCells: maximum number of cells of a tile, used when tileShape is None
+        :param conversions: dictionary variable -> function converting the array of the values of the variable
+        :param dtype: type of the values of the weather arrays
+        :param prefetch: if True, the next tile is read on a background thread
+        """
+        if Dataset is None:
+            raise Exception('The TiledNetCDFWeatherReader requires the netCDF4 package, which is not installed')
+        self.fileName = fileName
+        self.variables = list(variables)
+        self.day_from = day_from
+        self.conversions = dict(conversions) if conversions is not None else {}
+        self.dtype = dtype
+        self.prefetch = prefetch
+        unknown = [v for v in self.conversions if v not in self.variables]
+        if len(unknown) > 0:
+            msg = 'Conversions defined for variables not read: ' + ', '.join(unknown)
+            print(msg)
+            raise Exception(msg)
+
+        rootgrp = Dataset(fileName, 'r')
+        try:
+            first = rootgrp.variables[self.variables[0]]
+            for v in self.variables:
+                if rootgrp.variables[v].dimensions != first.dimensions or len(first.dimensions) != 3:
+                    msg = 'The weather variables must have the same dimensions (time, x, y): ' + v + ' has ' + str(
+                        rootgrp.variables[v].dimensions) + ', ' + self.variables[0] + ' has ' + str(first.dimensions)
+                    print(msg)
+                    raise Exception(msg)
+            self.days = days if days is not None else first.shape[0] - day_from
+            self.shape = tuple(first.shape[1:])
+            chunking = first.chunking()
+            self.chunkShape = (1, self.shape[1]) if chunking == 'contiguous' else (chunking[1], chunking[2])
+        finally:
+            rootgrp.close()
+        self.tileShape = tuple(tileShape) if tileShape is not None else self.getTileShape(maxTileCells)
+
+    def getTileShape(self, maxTileCells):
+        """Returns the shape of the tiles: whole chunks along the second dimension of the grid (the fastest varying in
+        the file) up to the size of the grid, then whole chunks along the first dimension, with at most maxTileCells
+        cells (at least one chunk)"""
+        nx, ny = self.shape
+        cx, cy = self.chunkShape
+        ty = min(ny, max(cy, maxTileCells // cx // cy * cy))
+        tx = min(nx, max(cx, maxTileCells // ty // cx * cx))
+        return tx, ty
+
+    def getTiles(self):
+        """Returns the list of the (empty) tiles of the grid"""
+        tx, ty = self.tileShape
+        return [WeatherTile(x, min(x + tx, self.shape[0]), y, min(y + ty, self.shape[1]))
+                for x in range(0, self.shape[0], tx) for y in range(0, self.shape[1], ty)]
+
+    def getWeatherColumnForVariable(self, names=None):
+        """Returns the dictionary variable name -> column of the weather arrays. The names of the variables (default:
+        the names in the NetCDF file) can be replaced by a dictionary NetCDF name -> name"""
+        return {(names or {}).get(v, v): i for i, v in enumerate(self.variables)}
+
+    def readTile(self, rootgrp, tile):
+        """Reads the weather data of all the variables of a tile from the open dataset and converts their units of
+        measure. Returns the tile"""
+        tile.data = np.empty((tile.x_to - tile.x_from, tile.y_to - tile.y_from, self.days, len(self.variables)),
+                             dtype=self.dtype)
+        for i, v in enumerate(self.variables):
+            values = rootgrp.variables[v][self.day_from:self.day_from + self.days, tile.x_from:tile.x_to,
+                                          tile.y_from:tile.y_to]
+            tile.data[:, :, :, i] = np.ma.filled(values.astype(self.dtype), np.nan).transpose(1, 2, 0)
+            if v in self.conversions:
+                tile.data[:, :, :, i] = self.conversions[v](tile.data[:, :, :, i])
+        return tile
+
+    def __iter__(self):
+        """Iterates the tiles of the grid, with their weather data"""
+        tiles = self.getTiles()
+        if not self.prefetch:
+            rootgrp = Dataset(self.fileName, 'r')
+            try:
+                for tile in tiles:
+                    yield self.readTile(rootgrp, tile)
+            finally:
+                rootgrp.close()
+            return
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        rootgrp = None
+        try:
+            rootgrp = executor.submit(Dataset, self.fileName, 'r').result()
+            future = executor.submit(self.readTile, rootgrp, tiles[0])
+            for i in range(len(tiles)):
+                tile = future.result()
+                if i + 1 < len(tiles):
+                    future = executor.submit(self.readTile, rootgrp, tiles[i + 1])
+                yield tile
+        finally:
+            if rootgrp is not None:
+                # waits for the tile being read, then closes the file
+                executor.submit(rootgrp.close).result()
+            executor.shutdown()
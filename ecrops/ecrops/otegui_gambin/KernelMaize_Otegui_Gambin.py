@@ -1,3 +1,4 @@
+import bisect
 import math
 from datetime import timedelta
 
@@ -84,6 +85,8 @@ class KernelMaize_Otegui_Gambin(Step):
         status.kernel.DaysGrade = list()  # day grade for all days until the calculation of yield estimation moment
         status.kernel.DaysIPAR = list()  # list to store all IPAR values untill of yield estimation moment
         status.kernel.AllTAGP = list()  # store all TAGP values
+        status.kernel.DaysGradeCumulative = [status.kernel.DaysGradeCum]  # running sum of the days grade (DaysGradeCum before each day)
+        status.kernel.DaysIPARCumulative = [0]  # running sum of the IPAR values
         status.kernel.KernelIPAR = 0  # sum of daily IPAR values for the interval of days for which we have -227 : 100 day grades relative to value cumulated on DOA
         status.kernel.KernelNumber = None
         status.kernel.KernelWeight = None
@@ -97,6 +100,7 @@ class KernelMaize_Otegui_Gambin(Step):
         status.kernel.KernelWeight_AfterGrainFilling_WithTranslocation = None  # kernel weigth after grain filling considering translocation
         status.kernel.dailySO_BiomassRates = []
         status.kernel.dailyDTSUMs = []
+        status.kernel.dailyDTSUMsCumulative = [0]  # running sum of the daily increase of TSUMs
         return status
 
     def integrate(self, status):
@@ -122,23 +126,27 @@ class KernelMaize_Otegui_Gambin(Step):
         if DOA is not None and DOA == status.day - timedelta(days=1):
             status.kernel.DOAGrade = status.kernel.DaysGradeCum
 
-            # calculate the sum of daily IPAR values , backward, until the difference of DayGradeDOA and daily values >= -227
-            tmpCumDaysGrade = 0
-            iparIndex = len(status.kernel.DaysIPAR) - 1
-            while (tmpCumDaysGrade <= 227 and iparIndex >= 0):
-                tmpCumDaysGrade = tmpCumDaysGrade + status.kernel.DaysGrade[iparIndex]
-                status.kernel.KernelIPAR = status.kernel.KernelIPAR + status.kernel.DaysIPAR[iparIndex]
-                iparIndex = iparIndex - 1
+            # calculate the sum of daily IPAR values , backward, until the difference of DayGradeDOA and daily values >= -227:
+            # the interval starts from the last day with running sum of days grade < DOAGrade - 227, and the IPAR values of
+            # the interval are summed as difference of the running sums
+            daysCounter = len(status.kernel.DaysGrade)
+            firstDay = daysCounter - 1
+            while firstDay > 0 and status.kernel.DaysGradeCumulative[firstDay] >= status.kernel.DaysGradeCum - 227:
+                firstDay = firstDay - 1
+            status.kernel.KernelIPAR = status.kernel.KernelIPAR + status.kernel.DaysIPARCumulative[daysCounter] - \
+                                       status.kernel.DaysIPARCumulative[firstDay]
 
         # calculate the day grade
         dayGrade = (status.weather.TEMP_MAX + status.weather.TEMP_MIN) / 2 - status.kernel.TBASE
         status.kernel.DaysGrade.append(dayGrade)
         status.kernel.DaysGradeCum = status.kernel.DaysGradeCum + dayGrade
+        status.kernel.DaysGradeCumulative.append(status.kernel.DaysGradeCum)
 
         # calculate IPAR for plant (IRRAD expressed in MJ)
         dayIPAR = (status.weather.IRRAD / 1000000 * 0.45) * (
                 1 - math.exp(-1 * status.states.KDIF * status.states.LAI)) / status.kernel.PlantDensity
         status.kernel.DaysIPAR.append(dayIPAR)
+        status.kernel.DaysIPARCumulative.append(status.kernel.DaysIPARCumulative[-1] + dayIPAR)
 
         # add IPAR values to the KernelIPAR total for the days untill the difference of daysgrade relative to DOA are >= 100
         if DOA is not None and status.day > DOA \
@@ -158,12 +166,10 @@ class KernelMaize_Otegui_Gambin(Step):
             daysCounter = len(status.kernel.AllTAGP)
             biomassIncrement = status.kernel.AllTAGP[daysCounter - 1] - status.kernel.AllTAGP[daysCounter - 31]
 
-            # calculate the sum of days grade on the same interval
-            totalDaysGrade = 0
+            # calculate the sum of days grade on the same interval (last 30 days), as difference of the running sums
             indexDaysGrade = len(status.kernel.DaysGrade)
-            for i in range(1, 31):
-                totalDaysGrade = totalDaysGrade + status.kernel.DaysGrade[indexDaysGrade - i]
-                i = i + 1
+            totalDaysGrade = status.kernel.DaysGradeCumulative[indexDaysGrade] - \
+                             status.kernel.DaysGradeCumulative[max(indexDaysGrade - 30, 0)]
 
             plantGrowthRateAroundFlowering = biomassIncrement * (
                         1000000 / (10000 * status.kernel.PlantDensity)) / totalDaysGrade
@@ -189,6 +195,7 @@ class KernelMaize_Otegui_Gambin(Step):
         if status.states.DVS >= 1 and status.states.DVS < 2:
             status.kernel.dailySO_BiomassRates.append(status.rates.GRSO)
             status.kernel.dailyDTSUMs.append(status.rates.DTSUM)
+            status.kernel.dailyDTSUMsCumulative.append(status.kernel.dailyDTSUMsCumulative[-1] + status.rates.DTSUM)
 
         if status.states.DVS >= 2:
 
@@ -197,24 +204,24 @@ class KernelMaize_Otegui_Gambin(Step):
             # calculate the potential graing growth rate per degree day as the yield calculated by outegui-gambin divided by TSUM2
             potentialGrainGrowthRateGDD = status.kernel.YLDES / (status.phenology.params.TSUM2 - DELTA_GDD)
 
-            cumGDD = 0
-            for i in range(0, len(status.kernel.dailySO_BiomassRates)):
+            # the days with cumulated GDD > DELTA_GDD start from the first one found (binary search) on the running sum of
+            # the daily increase of TSUMs, that never decreases
+            for i in range(bisect.bisect_right(status.kernel.dailyDTSUMsCumulative, DELTA_GDD) - 1,
+                           len(status.kernel.dailySO_BiomassRates)):
 
                 # get the daily storage organs biomass as calculated by wofost
                 dailySO_BiomassRate = status.kernel.dailySO_BiomassRates[i]
                 dailyGDD = status.kernel.dailyDTSUMs[i]
-                cumGDD += dailyGDD
-
-                if cumGDD > DELTA_GDD:
-                    # calculate the actual daily graing growth rate per degree day as the daily storage organs biomass rate divided by the daily increase of TSUMs
-                    if dailyGDD == 0:
-                        dailyGDD = 1  # avoid division by zero
-                    actualGrainGrowthRateGDD = dailySO_BiomassRate / dailyGDD
-
-                    if actualGrainGrowthRateGDD < potentialGrainGrowthRateGDD:
-                        status.kernel.YLDES_AfterGrainFilling += actualGrainGrowthRateGDD * dailyGDD
-                    else:
-                        status.kernel.YLDES_AfterGrainFilling += potentialGrainGrowthRateGDD * dailyGDD
+
+                # calculate the actual daily graing growth rate per degree day as the daily storage organs biomass rate divided by the daily increase of TSUMs
+                if dailyGDD == 0:
+                    dailyGDD = 1  # avoid division by zero
+                actualGrainGrowthRateGDD = dailySO_BiomassRate / dailyGDD
+
+                if actualGrainGrowthRateGDD < potentialGrainGrowthRateGDD:
+                    status.kernel.YLDES_AfterGrainFilling += actualGrainGrowthRateGDD * dailyGDD
+                else:
+                    status.kernel.YLDES_AfterGrainFilling += potentialGrainGrowthRateGDD * dailyGDD
 
             status.kernel.YLDES_AfterGrainFilling = status.kernel.YLDES_AfterGrainFilling * 1.039  # before GDD 200 we estimate we allocate 3.9% of final yield
             status.kernel.YLDES_AfterGrainFilling_WithTranslocation = min(
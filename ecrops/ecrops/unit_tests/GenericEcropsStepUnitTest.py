@@ -38,59 +38,19 @@ class GenericEcropsStepUnitTest:
         :return: this method returns the "Ok" string if all the tests succeeded, otherwise an AssertionError is raised
         """
 
-        # Parse the XML
-        root = ET.parse(xml_file)
-
-        stepmodule = root._root.attrib['StepModule']
-        stepname = root._root.attrib['Step']
+        stepmodule, stepname, testsets = read_test_sets(xml_file)
         fullStep = stepmodule + '.' + stepname
 
-        testsets = root.findall(".//TestSets/TestSet")
-
         i=0
-        for testset in testsets:
-            parameters = {}
-            inputs = {}
-            outputs = {}
+        for parameters, inputs, outputs in testsets:
             i+=1
-            # Extract parameters
-            for param in testset.findall(".//Parameters/Parameter"):
-                name = param.get("Name")
-                value = parse_value(param.get("Value"))
-                parameters[name] = value
-
-            # Extract inputs
-            for input_elem in testset.findall(".//Inputs/Input"):
-                name = input_elem.get("Name")
-                value = parse_value(input_elem.get("Value"))
-                inputs[name] = value
-
-            # Extract outputs
-            for output in testset.findall(".//Outputs/Output"):
-                name = output.get("Name")
-                value = parse_value(output.get("Value"))
-                outputs[name] = value
-
-            status = Printable()
-            status.rates = Printable()
-            status.states = Printable()
-            status.allparameters = {}
+            status = create_status(parameters)
 
             #create instance
             step_instance = ModelEngine.create_instance(stepmodule, stepname)
 
-
-            status.allparameters.update(parameters)
-
             #set input values before setparameters and initialize, because these two methods may need some of the input values
-            for key, value in inputs.items():
-                path = key.split('.')
-                obj = status
-                for part in path[1:-1]:  # exclude the first token, which is always status
-                    if not hasattr(obj, part):
-                        setattr(obj, part, Printable())
-                    obj = getattr(obj, part)
-                setattr(obj, path[-1], value)
+            set_status_values(status, inputs)
 
             try:
                 # set the parameters
@@ -101,14 +61,7 @@ class GenericEcropsStepUnitTest:
                 print('Error on initialize of class ' + stepname+' '+str(e))
 
             # set again the input values after the initialization, to avoid the states is full of zeros but there are the correct initial values
-            for key, value in inputs.items():
-                path = key.split('.')
-                obj = status
-                for part in path[1:-1]:  # exclude the first token, which is always status
-                    if not hasattr(obj, part):
-                        setattr(obj, part, Printable())
-                    obj = getattr(obj, part)
-                setattr(obj, path[-1], value)
+            set_status_values(status, inputs)
 
             status = step_instance.integrate(status)
             status = step_instance.runstep(status)
@@ -143,6 +96,64 @@ class GenericEcropsStepUnitTest:
         print(("End of tests for step '" + fullStep + "'"))
         return "Ok"
 
+
+def read_test_sets(xml_file):
+    """
+    Reads the test sets of a unit test xml file
+    :param xml_file: the file containing the test sets
+    :return: a tuple (step module, step class name, list of test sets), where every test set is a tuple of three
+    dictionaries (parameters, inputs, expected outputs)
+    """
+    root = ET.parse(xml_file)
+
+    stepmodule = root._root.attrib['StepModule']
+    stepname = root._root.attrib['Step']
+
+    testsets = []
+    for testset in root.findall(".//TestSets/TestSet"):
+        parameters = {}
+        inputs = {}
+        outputs = {}
+        # Extract parameters
+        for param in testset.findall(".//Parameters/Parameter"):
+            parameters[param.get("Name")] = parse_value(param.get("Value"))
+        # Extract inputs
+        for input_elem in testset.findall(".//Inputs/Input"):
+            inputs[input_elem.get("Name")] = parse_value(input_elem.get("Value"))
+        # Extract outputs
+        for output in testset.findall(".//Outputs/Output"):
+            outputs[output.get("Name")] = parse_value(output.get("Value"))
+        testsets.append((parameters, inputs, outputs))
+    return stepmodule, stepname, testsets
+
+
+def create_status(parameters):
+    """
+    Creates an empty status, with rates, states and the provided parameters in status.allparameters
+    """
+    status = Printable()
+    status.rates = Printable()
+    status.states = Printable()
+    status.allparameters = {}
+    status.allparameters.update(parameters)
+    return status
+
+
+def set_status_values(status, values):
+    """
+    Sets the values in the status. The keys of the dictionary are the status variables paths (e.g. 'status.states.DVS'):
+    the missing intermediate objects are created as Printable objects
+    """
+    for key, value in values.items():
+        path = key.split('.')
+        obj = status
+        for part in path[1:-1]:  # exclude the first token, which is always status
+            if not hasattr(obj, part):
+                setattr(obj, part, Printable())
+            obj = getattr(obj, part)
+        setattr(obj, path[-1], value)
+
+
 def parse_value(value):
     """
     Auxiliary method to parse the values read from the xml files
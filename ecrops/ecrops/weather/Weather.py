@@ -24,6 +24,9 @@ class Weather(Step):
     SOIL_TEMPERATURE_MIN, SOIL_TEMPERATURE_MAX Celsius
     """
 
+    batch_step = 'ecrops.weather.batch.Weather|Weather'
+    """Array version of the step, used by the BatchModelEngine"""
+
     def getparameterslist(self):
         """no parameters in this step"""
         return {}
@@ -72,8 +75,13 @@ class Weather(Step):
     def setweatherdata(self, status):
 
         """ Every day moves data from status.weather.WeatherDataArray to the proper status weather variables"""
-        status.doy = doy(status.day)
-        number_progr_days = (status.day - status.first_day).days
+        if hasattr(status, 'calendar'):
+            # status created by the ModelEngine: the day index and the day of the year are taken from the calendar
+            number_progr_days = status.day_index
+            status.doy = status.calendar.getDoy(number_progr_days)
+        else:
+            status.doy = doy(status.day)
+            number_progr_days = (status.day - status.first_day).days
 
         # extract data from input data array
         status.weather.TEMP_MAX = (status.weather.WeatherDataArray[number_progr_days][
@@ -215,7 +223,8 @@ class Weather(Step):
 
     def getoutputslist(self):
         return {
-
+            "doy": {"Description": "Current day of the year", "Type": "Number", "UnitOfMeasure": "doy",
+                    "StatusVariable": "status.doy"},
             "RAIN": {"Description": "Precipitation",
                      "Type": "Number", "UnitOfMeasure": "cm",
                      "StatusVariable": "status.weather.RAIN"},
@@ -228,6 +237,9 @@ class Weather(Step):
             "RH": {"Description": "Relative humidity",
                    "Type": "Number", "UnitOfMeasure": "%",
                    "StatusVariable": "status.weather.RH"},
+            "VAP": {"Description": "Vapour pressure",
+                    "Type": "Number", "UnitOfMeasure": "hPa",
+                    "StatusVariable": "status.weather.VAP"},
 
             "E0": {"Description": "Open water evapotranspiration",
                    "Type": "Number", "UnitOfMeasure": "cm",
@@ -253,7 +265,7 @@ class Weather(Step):
                      "StatusVariable": "status.weather.TEMP"},
             "DTEMP": {"Description": "Max temperature plus average daily temperature, divided by 2", "Type": "Number",
                       "UnitOfMeasure": "C",
-                      "StatusVariable": "status.states.DTEMP"},
+                      "StatusVariable": "status.weather.DTEMP"},
             "SOIL_TEMPERATURE_MIN": {"Description": "Minimum soil temperature",
                                      "Type": "Number", "UnitOfMeasure": "C",
                                      "StatusVariable": "status.weather.SOIL_TEMPERATURE_MIN"},
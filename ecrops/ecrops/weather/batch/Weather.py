@@ -0,0 +1,77 @@
+import numpy as np
+
+from ecrops.weather import Weather as scalar
+
+
+class Weather(scalar.Weather):
+    """Array version of the Weather step (see ecrops.weather.Weather), run by the BatchModelEngine. It reads the weather
+    of the current day of all the units from 'status.weather.WeatherDataArray' (shape (days, columns, units)) and fills
+    the status weather variables with arrays of one value per unit.
+
+    The evapotranspiration (E0, ES0, ET0) must be in the weather array. The astronomical data (status.astrodata) and
+    the 7-days running mean of the minimum temperature (TMINRA) are not calculated."""
+
+    def initialize(self, status):
+        status.weather.TMINRA = None
+        return self.setweatherdata(status)
+
+    def runstep(self, status):
+        return self.setweatherdata(status)
+
+    def setweatherdata(self, status):
+        number_progr_days = status.day_index
+        status.doy = status.calendar.getDoy(number_progr_days)
+        dayData = status.weather.WeatherDataArray[number_progr_days]
+        columns = status.weather.WeatherColumnForVariable
+
+        status.weather.TEMP_MAX = self.readvariable(status, dayData, 'TEMP_MAX', 'max temperature')  # C
+        status.weather.TEMP_MIN = self.readvariable(status, dayData, 'TEMP_MIN', 'min temperature')  # C
+
+        # if daily avg temperature is in the input use it, otherwise calculate it as (tmax+tmin)/2
+        if 'TEMP_AVG' in columns:
+            status.weather.TEMP = self.readvariable(status, dayData, 'TEMP_AVG', 'avg temperature')  # C
+        else:
+            status.weather.TEMP = ((status.weather.TEMP_MAX + status.weather.TEMP_MIN) / 2)
+        status.weather.DTEMP = ((status.weather.TEMP_MAX + status.weather.TEMP) / 2)
+
+        status.weather.IRRAD = self.readvariable(status, dayData, 'IRRAD', 'radiation')  # J/m^2 *day
+        status.weather.RAIN = self.readvariable(status, dayData, 'RAIN', 'precipitation')  # cm
+
+        # if wind is not present in the weather dataset, it is set to zero
+        if 'WIND' in columns:
+            status.weather.WIND = self.readvariable(status, dayData, 'WIND', 'wind')  # m/s
+        else:
+            status.weather.WIND = np.zeros(status.batch_size)
+
+        # if snow depth is not present in the weather dataset, it is set to 0
+        status.weather.SD = dayData[columns['SD']] if 'SD' in columns else np.zeros(status.batch_size)
+
+        # if relative humidity is not present in the weather dataset, it is set to 80%
+        status.weather.RH = dayData[columns['RH']] if 'RH' in columns else np.full(status.batch_size, 80.)
+
+        # calculate here saturated VAP from temperatures and RH
+        SVAP = 6.10588 * np.exp(17.32491 * status.weather.TEMP / (status.weather.TEMP + 238.102))
+        status.weather.VAP = (SVAP * status.weather.RH / 100)
+
+        # the evapotraspiration values are taken from the input array
+        if 'E0' not in columns or 'ES0' not in columns or 'ET0' not in columns:
+            raise Exception('The batch Weather step requires E0, ES0 and ET0 in the weather array')
+        status.weather.E0 = dayData[columns['E0']]  # cm
+        status.weather.ES0 = dayData[columns['ES0']]  # cm
+        status.weather.ET0 = dayData[columns['ET0']]  # cm
+
+        # if soil temperature is present, add it to the status
+        if 'SOIL_TEMPERATURE_MIN' in columns:
+            status.weather.SOIL_TEMPERATURE_MIN = dayData[columns['SOIL_TEMPERATURE_MIN']]  # C
+        if 'SOIL_TEMPERATURE_MAX' in columns:
+            status.weather.SOIL_TEMPERATURE_MAX = dayData[columns['SOIL_TEMPERATURE_MAX']]  # C
+
+        return status
+
+    def readvariable(self, status, dayData, name, description):
+        """Returns the values of a weather variable of the current day, raising an exception if a unit has no value"""
+        values = dayData[status.weather.WeatherColumnForVariable[name]]
+        if np.isnan(values).any():
+            raise Exception(description + ' not defined for day ' + str(status.day) + ' in the units ' + str(
+                np.flatnonzero(np.isnan(values)).tolist()) + '!')
+        return values
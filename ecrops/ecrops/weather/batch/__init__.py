@@ -0,0 +1 @@
+"""This sub package contain the array versions of the weather steps, run by the BatchModelEngine"""
\ No newline at end of file
@@ -0,0 +1,393 @@
+""" Weather store: memory-mapped binary archive of the weather data of many simulation units (e.g. the cells of a grid
+or the stations of a network), giving random access to the weather array of every unit """
+import argparse
+import datetime
+import json
+import sys
+
+import numpy as np
+
+# the netCDF4 package is needed only to build a weather store from a NetCDF file
+try:
+    from netCDF4 import Dataset
+except ImportError:
+    Dataset = None
+
+FORMAT_NAME = 'ecrops-weatherstore'
+"""Value of the 'format' item of the header"""
+
+FORMAT_VERSION = 1
+"""Version of the format, saved in the header"""
+
+HEADER_EXTENSION = '.json'
+"""Extension of the header file"""
+
+DATA_EXTENSION = '.bin'
+"""Extension of the data file"""
+
+DTYPE = '<f8'
+"""Default type of the values of the data file (little endian float64, the type of the values used by the model)"""
+
+DTYPES = ['<f8', '<f4']
+"""Types of the values of the data file: float64 or float32 (half the size, values rounded to float32)"""
+
+DATE_FORMAT = '%Y-%m-%d'
+"""Format of the first date in the header"""
+
+
+class WeatherStore:
+    """
+    A weather store is made of two files with the same name and different extension:
+
+    - name.json, the header: a JSON object with the names and the units of measure of the weather variables, the first
+      date and the number of days, and the geometry of the grid of the units (names of the two dimensions, shape and
+      optional coordinates, e.g. longitude and latitude)
+    - name.bin, the data: the values of all the units (float64, or float32 to halve the size of the file, see the
+      dtype item of the header), with no header, in cell-major order, i.e. an array with shape (nx, ny, days,
+      variables). The weather array of a unit (days, variables) is a contiguous block of the file
+
+    The data file is opened as a numpy memmap, so opening a store does not read the values: the values of a unit are
+    read from the disk (and cached by the operating system) only when they are used. getCell returns the weather array
+    of a unit as float64 values, the type used by the model: a view of the memory-mapped array for a float64 store, a
+    float64 copy of the unit for a float32 store (the values are the float32 values of the store). The array has the
+    columns in the order of the variables and can be passed to ModelEngine.initialize with the dictionary returned by
+    getWeatherColumnForVariable (the units of measure are the ones of the store):
+
+    - store = WeatherStore('weather')
+    - weather = store.getCell(x, y)
+    - status = model.initialize(weather, store.getWeatherColumnForVariable(), ...)
+
+    The stores are built with write_weather_store (from an array), csv_to_weather_store and netcdf_to_weather_store, or
+    from the command line (python -m ecrops.weatherstore --help).
+    """
+
+    fileName = ''
+    """Path of the store, without extension"""
+
+    header = None
+    """Dictionary read from the header file"""
+
+    variables = None
+    """Names of the weather variables, in the order of the columns"""
+
+    units = None
+    """Units of measure of the weather variables (None when not known)"""
+
+    first_date = None
+    """Date (datetime.datetime) of the first day of the data"""
+
+    days = 0
+    """Number of days of the data"""
+
+    dimensions = None
+    """Names of the two dimensions of the grid of the units"""
+
+    shape = None
+    """Shape (nx, ny) of the grid of the units"""
+
+    coordinates = None
+    """Dictionary name -> numpy array of the coordinates of the grid (e.g. lon and lat)"""
+
+    data = None
+    """The memory-mapped array of the values, with shape (nx, ny, days, variables)"""
+
+    def __init__(self, fileName, mode='r'):
+        """Constructor: opens the store fileName (the path without extension, or the path of one of the two files).
+        The mode is the mode of the numpy memmap: 'r' (read only, default) or 'r+' (the values can be changed)"""
+        self.fileName = store_path(fileName)
+        with open(self.fileName + HEADER_EXTENSION) as f:
+            self.header = json.load(f)
+        if self.header.get('format') != FORMAT_NAME or self.header.get('version') != FORMAT_VERSION:
+            msg = 'The file ' + self.fileName + HEADER_EXTENSION + ' is not the header of a weather store (version ' + \
+                  str(FORMAT_VERSION) + ')'
+            print(msg)
+            raise Exception(msg)
+        self.variables = self.header['variables']
+        self.units = self.header['units']
+        self.first_date = datetime.datetime.strptime(self.header['first_date'], DATE_FORMAT)
+        self.days = self.header['days']
+        grid = self.header['grid']
+        self.dimensions = grid['dimensions']
+        self.shape = tuple(grid['shape'])
+        self.coordinates = {name: np.asarray(values) for name, values in grid['coordinates'].items()}
+        self.data = np.memmap(self.fileName + DATA_EXTENSION, dtype=self.header['dtype'], mode=mode,
+                              shape=self.shape + (self.days, len(self.variables)))
+
+    def getCell(self, x, y):
+        """Returns the float64 weather array (days, variables) of the unit (x, y) of the grid: a view of the store if
+        its values are float64 (no values are copied), otherwise a float64 copy of the values of the unit"""
+        cell = self.data[x, y]
+        return cell if cell.dtype == np.float64 else np.array(cell, dtype=np.float64)
+
+    def getUnit(self, index):
+        """Returns the float64 weather array (days, variables) of the unit with the given index, counting the units of
+        the grid in cell-major order (index = x * ny + y), see getCell"""
+        return self.getCell(*divmod(index, self.shape[1]))
+
+    def getNumberOfUnits(self):
+        """Returns the number of units of the store"""
+        return self.shape[0] * self.shape[1]
+
+    def getWeatherColumnForVariable(self):
+        """Returns the dictionary variable name -> column of the weather arrays"""
+        return {name: i for i, name in enumerate(self.variables)}
+
+    def getDayIndex(self, date):
+        """Returns the row of the weather arrays of a date (datetime.datetime or datetime.date)"""
+        return (datetime.datetime(date.year, date.month, date.day) - self.first_date).days
+
+    def flush(self):
+        """Writes to the disk the values changed in the store (mode 'r+' or 'w+')"""
+        self.data.flush()
+
+    def close(self):
+        """Writes the changed values (mode 'r+') and releases the memory-mapped array of the store. The file is closed
+        when the views returned by getCell are released too"""
+        if self.data is not None:
+            if self.data.mode != 'r':
+                self.data.flush()
+            self.data = None
+
+
+def store_path(fileName):
+    """Returns the path of a store without the extension of the header or of the data file"""
+    for extension in (HEADER_EXTENSION, DATA_EXTENSION):
+        if fileName.endswith(extension):
+            return fileName[:-len(extension)]
+    return fileName
+
+
+def create_weather_store(fileName, shape, days, variables, first_date, units=None, dimensions=('x', 'y'),
+                         coordinates=None, dtype=DTYPE):
+    """
+    Creates an empty store (all the values are NaN) and returns it opened in mode 'r+', to be filled by the caller
+    (e.g. a unit or a variable at a time) and closed. Existing files are overwritten.
+
+    :param fileName: path of the store, without extension
+    :param shape: shape (nx, ny) of the grid of the units
+    :param days: number of days
+    :param variables: names of the weather variables
+    :param first_date: date of the first day
+    :param units: units of measure of the variables (optional)
+    :param dimensions: names of the two dimensions of the grid
+    :param coordinates: optional dictionary name -> list of the coordinates of the grid (e.g. {'lon': [...], 'lat':
+    [...]})
+    :param dtype: type of the values of the data file, one of DTYPES
+    :return: the WeatherStore
+    """
+    fileName = store_path(fileName)
+    if dtype not in DTYPES:
+        msg = 'Unsupported type ' + str(dtype) + ' of the values of a weather store, use one of ' + ', '.join(DTYPES)
+        print(msg)
+        raise Exception(msg)
+    if len(shape) != 2 or len(dimensions) != 2:
+        msg = 'The grid of a weather store must have two dimensions, found shape ' + str(shape)
+        print(msg)
+        raise Exception(msg)
+    if units is not None and len(units) != len(variables):
+        msg = 'The weather store has ' + str(len(variables)) + ' variables and ' + str(len(units)) + ' units'
+        print(msg)
+        raise Exception(msg)
+    header = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'dtype': dtype,
+        'layout': [dimensions[0], dimensions[1], 'day', 'variable'],
+        'variables': list(variables),
+        'units': list(units) if units is not None else [None] * len(variables),
+        'first_date': first_date.strftime(DATE_FORMAT),
+        'days': int(days),
+        'grid': {
+            'dimensions': list(dimensions),
+            'shape': [int(shape[0]), int(shape[1])],
+            'coordinates': {name: np.asarray(values, dtype=float).tolist() for name, values in
+                            (coordinates or {}).items()},
+        },
+    }
+    data = np.memmap(fileName + DATA_EXTENSION, dtype=dtype, mode='w+',
+                     shape=(int(shape[0]), int(shape[1]), int(days), len(variables)))
+    data[:] = np.nan
+    data.flush()
+    del data
+    with open(fileName + HEADER_EXTENSION, 'w') as f:
+        json.dump(header, f, indent=1)
+    return WeatherStore(fileName, mode='r+')
+
+
+def write_weather_store(fileName, data, variables, first_date, units=None, dimensions=('x', 'y'), coordinates=None,
+                        dtype=DTYPE):
+    """
+    Writes a store from the weather array of the units.
+
+    :param fileName: path of the store, without extension
+    :param data: the weather array with shape (nx, ny, days, variables), or (days, variables) for a single unit
+    :param dtype: type of the values of the data file, one of DTYPES
+    :return: the path of the store
+    """
+    data = np.asarray(data)
+    if data.ndim == 2:
+        data = data.reshape((1, 1) + data.shape)
+    if data.ndim != 4 or data.shape[3] != len(variables):
+        msg = 'The weather array must have shape (nx, ny, days, ' + str(len(variables)) + '), found ' + str(
+            data.shape)
+        print(msg)
+        raise Exception(msg)
+    store = create_weather_store(fileName, data.shape[0:2], data.shape[2], variables, first_date, units, dimensions,
+                                 coordinates, dtype)
+    store.data[:] = data
+    store.close()
+    return store.fileName
+
+
+def csv_to_weather_store(csvFileNames, fileName, first_date, variables=None, units=None, delimiter=';', dtype=DTYPE):
+    """
+    Builds a store from weather CSV files, like the sample file SampleWeatherSantaLucia1959-2019.csv of
+    EcropsWofostExampleConsole: a header line with the names of the columns, then one line per day. The empty values
+    are saved as NaN. Every file is a unit of the grid, with shape (number of files, 1) and dimensions ('station',
+    'y'): the files must have the same number of days and the same columns.
+
+    :param csvFileNames: path of the CSV file, or list of paths
+    :param fileName: path of the store, without extension
+    :param first_date: date of the first line of the files
+    :param variables: names of the variables in the store (default: the names of the header of the files)
+    :param units: units of measure of the variables (optional)
+    :param delimiter: delimiter of the columns
+    :param dtype: type of the values of the data file, one of DTYPES
+    :return: the path of the store
+    """
+    if isinstance(csvFileNames, str):
+        csvFileNames = [csvFileNames]
+    store = None
+    for i, csvFileName in enumerate(csvFileNames):
+        with open(csvFileName) as f:
+            columns = [c.strip() for c in f.readline().strip().split(delimiter)]
+        data = np.genfromtxt(csvFileName, delimiter=delimiter, skip_header=1, dtype=float, ndmin=2)
+        if store is None:
+            names = list(variables) if variables is not None else columns
+            if len(names) != len(columns):
+                msg = 'The file ' + csvFileName + ' has ' + str(len(columns)) + ' columns, ' + str(
+                    len(names)) + ' variable names were given'
+                print(msg)
+                raise Exception(msg)
+            store = create_weather_store(fileName, (len(csvFileNames), 1), data.shape[0], names, first_date, units,
+                                         ('station', 'y'), dtype=dtype)
+        if data.shape != store.data.shape[2:]:
+            store.close()
+            msg = 'The file ' + csvFileName + ' has shape ' + str(data.shape) + ', expected ' + str(
+                store.data.shape[2:])
+            print(msg)
+            raise Exception(msg)
+        store.data[i, 0] = data
+    store.close()
+    return store.fileName
+
+
+def netcdf_to_weather_store(netcdfFileName, fileName, variables, names=None, first_date=None, day_from=0, days=None,
+                            coordinateVariables=('lon', 'lat'), dtype=DTYPE):
+    """
+    Builds a store from a NetCDF file, like the sample file weatherSample_2003.nc of EcropsWofostExampleConsole: the
+    weather variables have dimensions (time, x, y). The file is opened once and the variables are read one slice of the
+    first grid dimension at a time, so the memory used does not depend on the size of the grid. The masked values are
+    saved as NaN. Requires the netCDF4 package.
+
+    :param netcdfFileName: path of the NetCDF file
+    :param fileName: path of the store, without extension
+    :param variables: names of the variables in the NetCDF file
+    :param names: names of the variables in the store (default: the names in the NetCDF file)
+    :param first_date: date of the first day read. If None, it is read from the 'units' attribute of the time
+    variable (e.g. 'days since 2003-01-01') and the value of the time variable at day_from
+    :param day_from: index of the first day read
+    :param days: number of days read (default: all the days from day_from)
+    :param coordinateVariables: names of the variables of the coordinates of the grid, saved in the header if they
+    exist in the file (one dimensional, with the length of the grid dimensions)
+    :param dtype: type of the values of the data file, one of DTYPES
+    :return: the path of the store
+    """
+    if Dataset is None:
+        raise Exception('Building a weather store from a NetCDF file requires the netCDF4 package, which is not '
+                        'installed')
+    names = list(names) if names is not None else list(variables)
+    rootgrp = Dataset(netcdfFileName, 'r')
+    store = None
+    try:
+        first = rootgrp.variables[variables[0]]
+        timeDimension, xDimension, yDimension = first.dimensions
+        if days is None:
+            days = first.shape[0] - day_from
+        if first_date is None:
+            first_date = get_netcdf_date(rootgrp, timeDimension, day_from)
+        coordinates = {}
+        for name in coordinateVariables:
+            if name in rootgrp.variables and len(rootgrp.variables[name].shape) == 1 and \
+                    rootgrp.variables[name].shape[0] in first.shape[1:]:
+                coordinates[name] = np.ma.filled(rootgrp.variables[name][:].astype(float), np.nan)
+        units = [getattr(rootgrp.variables[v], 'units', None) for v in variables]
+        store = create_weather_store(fileName, first.shape[1:], days, names, first_date, units,
+                                     (xDimension, yDimension), coordinates, dtype)
+        for i, variable in enumerate(variables):
+            print('Reading ' + variable + ' from ' + netcdfFileName)
+            ncVariable = rootgrp.variables[variable]
+            if ncVariable.dimensions != first.dimensions:
+                msg = 'The variable ' + variable + ' has dimensions ' + str(ncVariable.dimensions) + ', expected ' + \
+                      str(first.dimensions)
+                print(msg)
+                raise Exception(msg)
+            for x in range(store.shape[0]):
+                values = ncVariable[day_from:day_from + days, x, :]
+                store.data[x, :, :, i] = np.ma.filled(values.astype(store.data.dtype), np.nan).T
+    finally:
+        rootgrp.close()
+        if store is not None:
+            store.close()
+    return store.fileName
+
+
+def get_netcdf_date(rootgrp, timeDimension, dayIndex):
+    """Returns the date of a day of a NetCDF file, from the time variable (the variable named as the time dimension, or
+    'time') and its units (days since a date)"""
+    timeVariable = None
+    for name in (timeDimension, 'time'):
+        if name in rootgrp.variables:
+            timeVariable = rootgrp.variables[name]
+            break
+    units = getattr(timeVariable, 'units', '') if timeVariable is not None else ''
+    if not units.startswith('days since'):
+        msg = 'Cannot read the dates of the NetCDF file: set the first date of the weather store'
+        print(msg)
+        raise Exception(msg)
+    reference = datetime.datetime.strptime(units[len('days since'):].strip().split(' ')[0].split('T')[0], DATE_FORMAT)
+    return reference + datetime.timedelta(days=int(timeVariable[dayIndex]))
+
+
+def main(argv=None):
+    """Command line converter of the CSV and NetCDF weather files to weather stores"""
+    parser = argparse.ArgumentParser(description='Builds an ecrops weather store from CSV or NetCDF weather files')
+    parser.add_argument('source', choices=['csv', 'netcdf'], help='type of the input files')
+    parser.add_argument('store', help='path of the store, without extension')
+    parser.add_argument('inputs', nargs='+', help='input files (one NetCDF file, or one or more CSV files)')
+    parser.add_argument('--first-date', help='date of the first day, YYYY-MM-DD (required for the CSV files)')
+    parser.add_argument('--variables', nargs='+', help='NetCDF variables to read (required for NetCDF files)')
+    parser.add_argument('--names', nargs='+', help='names of the variables in the store')
+    parser.add_argument('--units', nargs='+', help='units of measure of the CSV variables')
+    parser.add_argument('--dtype', choices=DTYPES, default=DTYPE,
+                        help='type of the values of the store (default float64, ' + DTYPES[1] + ' for float32)')
+    args = parser.parse_args(argv)
+    first_date = datetime.datetime.strptime(args.first_date, DATE_FORMAT) if args.first_date else None
+    if args.source == 'csv':
+        if first_date is None:
+            parser.error('--first-date is required for the CSV files')
+        path = csv_to_weather_store(args.inputs, args.store, first_date, args.names, args.units, dtype=args.dtype)
+    else:
+        if args.variables is None or len(args.inputs) != 1:
+            parser.error('one NetCDF file and --variables are required')
+        path = netcdf_to_weather_store(args.inputs[0], args.store, args.variables, args.names, first_date,
+                                       dtype=args.dtype)
+    store = WeatherStore(path)
+    print('Weather store ' + path + ': ' + str(store.getNumberOfUnits()) + ' unit(s), ' + str(store.days) +
+          ' days from ' + store.header['first_date'] + ', variables ' + ', '.join(store.variables))
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,7 +10,7 @@ from math import pi
 import ecrops.wofost_util.Afgen
 from ..Printable import Printable
 from collections import deque
-from ecrops.Step import Step
+from ecrops.Step import Step, ACTIVITY_EMERGENCE_TO_MATURITY
 
 def totass(DAYL, AMAX, EFF, LAI, KDIF, AVRAD, DIFPP, DSINBE, SINLD, COSLD):
     """ This routine calculates the daily total gross CO2 assimilation by performing a Gaussian integration over
@@ -171,6 +171,9 @@ class WOFOST_Assimilation(Step):
     =======  =================================== =================  ============
     """
 
+    activity_window = ACTIVITY_EMERGENCE_TO_MATURITY
+    """The runstep is executed only after emergence and before maturity"""
+
     def getparameterslist(self):
         return {
             "AMAXTB": {"Description": "Max. leaf CO2 assim. rate as a function of DVS", "Type": "Array",
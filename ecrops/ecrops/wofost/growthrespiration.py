@@ -7,11 +7,14 @@
 
 
 from ..Printable import Printable
-from ecrops.Step import Step
+from ecrops.Step import Step, ACTIVITY_EMERGENCE_TO_MATURITY
 
 class WOFOST_GrowthRespiration(Step):
     """This step implements a growth respiration model for the WOFOST crop model."""
 
+    activity_window = ACTIVITY_EMERGENCE_TO_MATURITY
+    """The runstep is executed only after emergence and before maturity"""
+
     def getparameterslist(self):
         return {
             "CVL": {"Description": "Conversion factor for assimilates to leaves", "Type": "Number", "Mandatory": "True",
@@ -7,7 +7,7 @@
 
 import ecrops.wofost_util.Afgen
 from ..Printable import Printable
-from ecrops.Step import Step
+from ecrops.Step import Step, ACTIVITY_EMERGENCE_TO_MATURITY
 
 class WOFOST_Maintenance_Respiration(Step):
     """Maintenance respiration in WOFOST
@@ -65,6 +65,9 @@ class WOFOST_Maintenance_Respiration(Step):
 
     """
 
+    activity_window = ACTIVITY_EMERGENCE_TO_MATURITY
+    """The runstep is executed only after emergence and before maturity"""
+
     def getparameterslist(self):
         return {
             "Q10": {